@@ -1,28 +1,90 @@
 import os
-import uuid
+import sys
 import subprocess
 import json
-from flask import Flask, request, jsonify, send_from_directory
-from werkzeug.utils import secure_filename
+import asyncio
+import queue
+import threading
+import time
+from flask import (Flask, Request, request, jsonify, send_from_directory, Response,
+                   stream_with_context, url_for)
 from PIL import Image
 import base64
 from io import BytesIO
 
 app = Flask(__name__, static_folder='../frontend')
 
-# 配置上传文件夹和允许的文件类型
+# 配置上传文件夹（支持的图片类型由 uploads.sniff_image_type 根据文件头判断）
 UPLOAD_FOLDER = 'image'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 
 # 确保上传文件夹存在
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# 请求体大小上限（字节），超出时 werkzeug 停止接收并返回 413
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_BYTES', 16 * 1024 * 1024))
+# 为 false 时上传内容只保存在内存中直接交给图片处理流程，不写入上传文件夹
+app.config['SAVE_UPLOADS'] = os.environ.get('SAVE_UPLOADS', 'true').lower() != 'false'
 
-# 检查文件扩展名是否允许
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+# 将 src 目录加入模块搜索路径，以便使用 mcp_llm_bridge 等模块
+SRC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+if SRC_FOLDER not in sys.path:
+    sys.path.insert(0, SRC_FOLDER)
+
+from uploads import IncomingUpload, UploadStore  # noqa: E402  src 需要先加入 sys.path
+
+
+def job_uploads():
+    """排队中和执行中的后台任务引用的上传文件，任务结束前清理线程不能删除"""
+    from job_queue import JobStore
+    store = JobStore(JOB_DB_PATH)
+    try:
+        return store.active_payload_values('image_path')
+    finally:
+        store.close()
+
+# 上传目录按内容摘要分片保存并去重，后台线程清理过期文件并限制总大小
+UPLOAD_JANITOR_INTERVAL = float(os.environ.get('UPLOAD_JANITOR_INTERVAL', 300))
+upload_store = UploadStore(
+    UPLOAD_FOLDER,
+    max_age_seconds=float(os.environ.get('UPLOAD_MAX_AGE_SECONDS', 24 * 3600)),
+    max_total_bytes=int(os.environ.get('UPLOAD_MAX_TOTAL_BYTES', 1024 ** 3)),
+    dedup=os.environ.get('UPLOAD_DEDUP', 'true').lower() != 'false',
+    pinned=job_uploads
+)
+
+
+class UploadRequest(Request):
+    """
+    multipart 解析时把每个上传文件直接写入 IncomingUpload：请求体到达的同时嗅探文件头、
+    计算摘要，并写入上传目录（SAVE_UPLOADS 为 false 时写入内存），不再先落到临时文件再复制一遍。
+    请求体总大小仍由 MAX_CONTENT_LENGTH 在读取时限制。
+    请求结束时关闭这里创建的全部文件：请求体被截断或解析失败时，已写入一半的文件
+    不会出现在 request.files 中，也要在这里删除。
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        stream = upload_store.incoming() if app.config['SAVE_UPLOADS'] else IncomingUpload()
+        self.__dict__.setdefault('_incoming_uploads', []).append(stream)
+        return stream
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for stream in self.__dict__.pop('_incoming_uploads', ()):
+                stream.close()
+
+
+app.request_class = UploadRequest
+
+
+def receive_file(file, save):
+    """取出 multipart 解析时已接收完的上传；save 为 True 时移动到上传目录的分片位置"""
+    upload = file.stream.finish()
+    return upload_store.commit(upload) if save else upload
 
 # 皮肤类型列表
 SKIN_TYPES = ["干性皮肤", "油性皮肤", "中性皮肤", "混合型皮肤", "敏感性皮肤"]
@@ -61,67 +123,84 @@ RECOMMENDATIONS = {
     ]
 }
 
+# 通用建议
+GENERAL_RECOMMENDATIONS = [
+    "保持良好的生活习惯，饮食均衡，充足睡眠",
+    "注意防晒，减少紫外线对皮肤的伤害",
+    "定期清洁皮肤，保持毛孔通畅"
+]
+
+# 皮肤类型对应的建议
+SKIN_TYPE_RECOMMENDATIONS = {
+    "干性皮肤": "dry",
+    "油性皮肤": "oily",
+    "中性皮肤": "normal",
+    "混合型皮肤": "combination",
+    "敏感性皮肤": "sensitive"
+}
+
+def random_skin_metrics():
+    """随机生成的示例指标（local_analysis.engine 为 random 时使用）"""
+    import random
+    from datetime import datetime
+    random.seed(datetime.now().timestamp())  # 使用当前时间作为随机种子，确保每次结果不同
+    
+    # 随机选择皮肤类型，随机生成各项指标 (0-100)
+    metrics = {
+        "skin_type": random.choice(SKIN_TYPES),
+        "moisture_level": random.randint(20, 90),
+        "oil_level": random.randint(20, 90),
+        "pigmentation_level": random.randint(5, 40),
+        "sensitivity_level": random.randint(10, 70)
+    }
+    # 从通用建议中随机选择1-2条
+    general = random.sample(GENERAL_RECOMMENDATIONS, random.randint(1, 2))
+    return metrics, general
+
 def analyze_skin(image_path):
     """
     分析皮肤图像并返回分析结果
     
-    在实际应用中，这里应该包含真正的皮肤分析算法
-    例如使用计算机视觉技术分析皮肤纹理、颜色等特征
+    默认使用 skin_metrics 在本地计算颜色和纹理统计指标（NumPy 向量化，仅用CPU），
+    配置 local_analysis.engine 为 random 时返回随机示例数据。
     
     参数:
-        image_path: 图像文件路径
+        image_path: 图像文件路径或图片字节
     
     返回:
         包含分析结果的字典
     """
-    # 模拟分析过程
-    print(f"开始分析图像: {image_path}")
+    from config_loader import get_app_config
+    app_cfg = get_app_config()
     
-    # 随机生成分析结果
-    import random
-    from datetime import datetime
-    random.seed(datetime.now().timestamp())  # 使用当前时间作为随机种子，确保每次结果不同
-    
-    # 随机选择皮肤类型
-    skin_type = random.choice(SKIN_TYPES)
+    if isinstance(image_path, str):
+        print(f"开始分析图像: {image_path}")
     
-    # 随机生成各项指标 (0-100)
-    moisture_level = random.randint(20, 90)
-    oil_level = random.randint(20, 90)
-    pigmentation_level = random.randint(5, 40)
-    sensitivity_level = random.randint(10, 70)
-    
-    # 根据皮肤类型选择建议
-    if skin_type == "干性皮肤":
-        recommendations = RECOMMENDATIONS["dry"]
-    elif skin_type == "油性皮肤":
-        recommendations = RECOMMENDATIONS["oily"]
-    elif skin_type == "中性皮肤":
-        recommendations = RECOMMENDATIONS["normal"]
-    elif skin_type == "混合型皮肤":
-        recommendations = RECOMMENDATIONS["combination"]
-    else:  # 敏感性皮肤
-        recommendations = RECOMMENDATIONS["sensitive"]
-    
-    # 添加一些通用建议
-    general_recommendations = [
-        "保持良好的生活习惯，饮食均衡，充足睡眠",
-        "注意防晒，减少紫外线对皮肤的伤害",
-        "定期清洁皮肤，保持毛孔通畅"
-    ]
+    if app_cfg.local_analysis_engine == 'random':
+        metrics, general = random_skin_metrics()
+    else:
+        if app_cfg.local_analysis_crop_face:
+            import face_roi
+            metrics = face_roi.analyze_face(image_path, app_cfg.local_analysis_max_long_edge,
+                                            app_cfg.local_analysis_face_padding)
+        else:
+            import skin_metrics
+            metrics = skin_metrics.analyze_image(image_path, app_cfg.local_analysis_max_long_edge)
+        # 按指标选择通用建议，结果可复现
+        general = [GENERAL_RECOMMENDATIONS[0]]
+        if metrics["pigmentation_level"] >= 40:
+            general.append(GENERAL_RECOMMENDATIONS[1])
+        if metrics["oil_level"] >= 50 or metrics["texture_level"] >= 60:
+            general.append(GENERAL_RECOMMENDATIONS[2])
     
-    # 从通用建议中随机选择1-2条添加到特定建议中
-    recommendations += random.sample(general_recommendations, random.randint(1, 2))
+    # 根据皮肤类型选择建议（复制一份，避免修改全局建议列表）
+    recommendations = list(RECOMMENDATIONS[SKIN_TYPE_RECOMMENDATIONS[metrics["skin_type"]]])
+    recommendations += general
     
     # 构建结果字典
-    results = {
-        "skin_type": skin_type,
-        "moisture_level": moisture_level,
-        "oil_level": oil_level,
-        "pigmentation_level": pigmentation_level,
-        "sensitivity_level": sensitivity_level,
-        "recommendations": recommendations
-    }
+    results = dict(metrics)
+    results["recommendations"] = recommendations
+    results["engine"] = app_cfg.local_analysis_engine
     
     return results
 
@@ -132,7 +211,7 @@ def index():
 
 # 执行分析
 @app.route('/analyze', methods=['POST'])
-def analyze():
+async def analyze():
     # 检查请求中是否有文件
     if 'image' not in request.files:
         return jsonify({'success': False, 'message': '没有文件部分'}), 400
@@ -143,32 +222,391 @@ def analyze():
     if file.filename == '':
         return jsonify({'success': False, 'message': '没有选择文件'}), 400
     
-    # 检查文件是否有效
-    if file and allowed_file(file.filename):
-        # 生成唯一文件名
-        filename = secure_filename(f"{uuid.uuid4()}.{file.filename.rsplit('.', 1)[1].lower()}")
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    from uploads import UnsupportedImageError
+
+    # 文件类型和内容摘要在接收请求体时已经得到
+    try:
+        upload = await asyncio.to_thread(receive_file, file, app.config['SAVE_UPLOADS'])
+    except UnsupportedImageError:
+        return jsonify({'success': False, 'message': '不支持的文件类型'}), 400
+    
+    try:
+        import skin_core_llm
+        from config_loader import get_app_config
+
+        if get_app_config().local_analysis_call_api:
+            # 本地分析与皮肤分析API并发执行（相同内容的上传直接命中缓存，不重复转换和调用API）
+            results, api_result = await asyncio.gather(
+                asyncio.to_thread(analyze_skin, upload.source),
+                run_in_async_loop(limit_analysis(skin_core_llm.analyze_skin_with_api_async(
+                    upload.source, content_digest=upload.digest)))
+            )
+        else:
+            results = await asyncio.to_thread(analyze_skin, upload.source)
+            api_result = None
         
-        # 保存文件
-        file.save(file_path)
+        return jsonify({
+            'success': True,
+            'results': results,
+            'api_result': json.loads(api_result) if api_result else None
+        }), 200
         
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'分析过程出错: {str(e)}'
+        }), 500
+
+# 一次批量分析请求中允许的最大图片数
+MAX_BATCH_IMAGES = int(os.environ.get('MAX_BATCH_IMAGES', 10))
+
+# 批量分析多张图片（如左右脸颊、前后对比照片）
+@app.route('/analyze/batch', methods=['POST'])
+async def analyze_batch():
+    files = [file for file in request.files.getlist('images') if file.filename != '']
+    if not files:
+        return jsonify({'success': False, 'message': '没有选择文件'}), 400
+    if len(files) > MAX_BATCH_IMAGES:
+        message = f'一次最多分析 {MAX_BATCH_IMAGES} 张图片'
+        return jsonify({'success': False, 'message': message}), 400
+
+    from uploads import UnsupportedImageError
+
+    async def receive(file):
         try:
-            # 分析皮肤
-            results = analyze_skin(file_path)
-            
-            return jsonify({
-                'success': True,
-                'results': results
-            }), 200
-            
+            return await asyncio.to_thread(receive_file, file, app.config['SAVE_UPLOADS'])
+        except UnsupportedImageError:
+            return None
+
+    uploads = await asyncio.gather(*(receive(file) for file in files))
+    accepted = [upload for upload in uploads if upload is not None]
+
+    try:
+        import skin_core_llm
+        from config_loader import get_app_config
+
+        local_analyses = asyncio.gather(
+            *(asyncio.to_thread(analyze_skin, upload.source) for upload in accepted)
+        )
+        if get_app_config().local_analysis_call_api:
+            # 整批请求占用一个全局分析名额，批内按 batch_max_concurrency 并发调用API
+            local_results, report = await asyncio.gather(
+                local_analyses,
+                run_in_async_loop(limit_analysis(skin_core_llm.analyze_many_async(
+                    [upload.source for upload in accepted],
+                    content_digests=[upload.digest for upload in accepted])))
+            )
+        else:
+            started = time.perf_counter()
+            local_results = await local_analyses
+            report = {'items': None, 'elapsed_seconds': round(time.perf_counter() - started, 3),
+                      'total_item_seconds': None}
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'分析过程出错: {str(e)}'
+        }), 500
+
+    api_items = iter(report['items'] or ())
+    local_items = iter(local_results)
+    items = []
+    for file, upload in zip(files, uploads):
+        if upload is None:
+            items.append({'filename': file.filename, 'success': False,
+                          'message': '不支持的文件类型'})
+            continue
+        if report['items'] is None:
+            items.append({'filename': file.filename, 'success': True, 'results': next(local_items)})
+            continue
+        api_item = next(api_items)
+        item = {
+            'filename': file.filename,
+            'success': api_item['success'],
+            'results': next(local_items),
+            'elapsed_seconds': api_item['elapsed_seconds']
+        }
+        if api_item['success']:
+            item['api_result'] = api_item['result']
+        else:
+            item['message'] = api_item['error']
+        items.append(item)
+
+    succeeded = sum(1 for item in items if item['success'])
+    return jsonify({
+        'success': True,
+        'items': items,
+        'succeeded': succeeded,
+        'failed': len(items) - succeeded,
+        'elapsed_seconds': report['elapsed_seconds'],
+        'total_item_seconds': report['total_item_seconds']
+    }), 200
+
+# 上传超过 MAX_CONTENT_LENGTH
+@app.errorhandler(413)
+def upload_too_large(e):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+    return jsonify({'success': False, 'message': f'文件过大，最大支持 {limit_mb:g} MB'}), 413
+
+# MCP 会话池中的服务器进程需要常驻同一个事件循环，因此所有异步任务都在这个后台线程的循环中运行
+MCP_POOL_SIZE = int(os.environ.get('MCP_POOL_SIZE', 2))
+_async_loop = None
+_async_loop_lock = threading.Lock()
+
+def get_async_loop():
+    """获取（必要时启动）常驻后台线程中的事件循环"""
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            _async_loop = asyncio.new_event_loop()
+            threading.Thread(target=_async_loop.run_forever, daemon=True).start()
+    return _async_loop
+
+def run_in_async_loop(coro):
+    """
+    把协程提交到常驻后台循环执行，返回可在任意事件循环中 await 的 Future。
+
+    Flask 的异步视图为每个请求单独创建事件循环，而共享的 HTTP 连接池和
+    MCP 会话池都绑定在后台循环上，所以实际的网络调用统一在后台循环中完成。
+    """
+    return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, get_async_loop()))
+
+# 同时进行的皮肤分析API请求上限，超出的请求在后台循环中排队等待
+ANALYZE_MAX_CONCURRENCY = int(os.environ.get('ANALYZE_MAX_CONCURRENCY', 8))
+_analysis_semaphore = None
+
+async def limit_analysis(coro):
+    """在后台循环中以全局并发上限运行分析协程"""
+    global _analysis_semaphore
+    if _analysis_semaphore is None:
+        _analysis_semaphore = asyncio.Semaphore(ANALYZE_MAX_CONCURRENCY)
+    async with _analysis_semaphore:
+        return await coro
+
+def iterate_async(async_gen_factory):
+    """
+    在后台事件循环中运行异步生成器，并以同步生成器的形式逐项产出结果。
+
+    MCP 的 stdio 会话要求在同一个任务中进入和退出，因此整个异步生成器
+    必须在一个事件循环任务内跑完，不能逐项调用 run_until_complete。
+    同步生成器被关闭时取消该任务。
+    """
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_gen_factory():
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_async_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # 客户端提前断开时 Flask 会关闭本生成器，取消后台任务以停止读取模型输出和工具调用，
+        # 并让 async with 退出、归还占用的 MCP 会话
+        future.cancel()
+
+def sse_event(data, event=None):
+    """按 Server-Sent Events 格式编码一条消息"""
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+# 流式返回大模型分析结果 (SSE)
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.get_json(silent=True) or {}
+    analysis_result = data.get('analysis')
+    if analysis_result is None:
+        return jsonify({'success': False, 'message': '缺少皮肤分析数据'}), 400
+
+    from mcp_demo import build_bridge_config, prompt
+    from mcp_llm_bridge.bridge import BridgeManager
+    from mcp_llm_bridge.session_pool import get_session_pool
+
+    message = data.get('message') or prompt()
+    config = build_bridge_config(analysis_result)
+
+    async def stream_response():
+        session_pool = get_session_pool(config.mcp_server_params, size=MCP_POOL_SIZE)
+        async with BridgeManager(config, session_pool=session_pool) as bridge:
+            async for delta in bridge.process_message_stream(message):
+                yield delta
+
+    def generate():
+        try:
+            for delta in iterate_async(stream_response):
+                yield sse_event({'delta': delta})
+            yield sse_event({}, event='done')
         except Exception as e:
-            return jsonify({
-                'success': False,
-                'message': f'分析过程出错: {str(e)}'
-            }), 500
+            yield sse_event({'message': f'分析过程出错: {str(e)}'}, event='error')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# 后台任务：完整分析流程（皮肤分析API → 大模型 + 网络搜索工具）耗时较长，
+# 通过 POST /jobs 提交后在后台循环中执行，客户端轮询 GET /jobs/<id> 或等待回调
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join(SRC_FOLDER, 'cache', 'jobs.db'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_QUEUE_MAX_PENDING = int(os.environ.get('JOB_QUEUE_MAX_PENDING', 50))
+JOB_TIMEOUT_SECONDS = float(os.environ.get('JOB_TIMEOUT_SECONDS', 600))
+# 允许的任务回调主机（逗号分隔）；不设置时只允许解析到公网地址的主机
+JOB_WEBHOOK_ALLOWED_HOSTS = (
+    {host.strip().lower() for host in os.environ['JOB_WEBHOOK_ALLOWED_HOSTS'].split(',')
+     if host.strip()}
+    if os.environ.get('JOB_WEBHOOK_ALLOWED_HOSTS') else None
+)
+_job_queue_task = None
+
+async def run_full_analysis(payload):
+    """执行一个完整分析任务，返回皮肤数据和大模型的回复"""
+    import skin_core_llm
+    from config_loader import get_app_config
+    from mcp_demo import build_bridge_config, prompt
+    from mcp_llm_bridge.bridge import BridgeManager
+    from mcp_llm_bridge.session_pool import get_session_pool
+
+    if get_app_config().local_analysis_call_api:
+        analysis_result = await limit_analysis(skin_core_llm.analyze_skin_with_api_async(
+            payload['image_path'], content_digest=payload.get('content_digest')))
+        if analysis_result is None:
+            raise RuntimeError('皮肤分析API调用失败')
     else:
+        # 不调用付费API时，大模型基于本地指标给出建议
+        analysis_result = json.dumps(await asyncio.to_thread(analyze_skin, payload['image_path']),
+                                     ensure_ascii=False)
+
+    config = build_bridge_config(analysis_result)
+    session_pool = get_session_pool(config.mcp_server_params, size=MCP_POOL_SIZE)
+    async with BridgeManager(config, session_pool=session_pool) as bridge:
+        response = await bridge.process_message(payload.get('message') or prompt())
+    return {'analysis': json.loads(analysis_result), 'response': response}
+
+async def _run_job(payload):
+    return await run_full_analysis(payload)
+
+async def _start_job_queue():
+    from job_queue import JobQueue, JobStore
+    job_queue = JobQueue(JobStore(JOB_DB_PATH), _run_job, workers=JOB_WORKERS,
+                         max_pending=JOB_QUEUE_MAX_PENDING, job_timeout=JOB_TIMEOUT_SECONDS,
+                         webhook_allowed_hosts=JOB_WEBHOOK_ALLOWED_HOSTS)
+    await job_queue.start()
+    return job_queue
+
+async def get_job_queue():
+    """获取（必要时启动）后台循环中的任务队列，只能在后台循环中调用"""
+    global _job_queue_task
+    if _job_queue_task is None:
+        _job_queue_task = asyncio.ensure_future(_start_job_queue())
+    return await asyncio.shield(_job_queue_task)
+
+def start_job_queue():
+    """在服务启动时恢复数据库中未完成的任务"""
+    return asyncio.run_coroutine_threadsafe(get_job_queue(), get_async_loop()).result()
+
+async def _stop_job_queue():
+    global _job_queue_task
+    task, _job_queue_task = _job_queue_task, None
+    if task is None:
+        return
+    try:
+        job_queue = await task
+    except Exception:
+        return
+    await job_queue.stop()
+    job_queue.store.close()
+
+def stop_job_queue():
+    """服务退出时停止任务队列：执行中的任务放回队列，由下次启动的进程继续执行"""
+    if _async_loop is not None:
+        asyncio.run_coroutine_threadsafe(_stop_job_queue(), _async_loop).result()
+
+async def _close_async_resources():
+    import skin_core_llm
+    from mcp_llm_bridge.llm_client import close_shared_http_clients
+    from mcp_llm_bridge.session_pool import close_session_pools
+
+    await close_session_pools()
+    await close_shared_http_clients()
+    await skin_core_llm.default_client.aclose()
+
+def close_async_resources():
+    """服务退出时在后台循环中关闭 MCP 会话池（及其服务器子进程）和共享的 HTTP 连接池"""
+    if _async_loop is not None:
+        asyncio.run_coroutine_threadsafe(_close_async_resources(), _async_loop).result()
+
+# 提交完整分析任务
+@app.route('/jobs', methods=['POST'])
+async def create_job():
+    if 'image' not in request.files or request.files['image'].filename == '':
+        return jsonify({'success': False, 'message': '没有选择文件'}), 400
+
+    from job_queue import JobQueueFull, webhook_error
+    from uploads import UnsupportedImageError
+
+    webhook_url = request.form.get('webhook_url') or None
+    if webhook_url:
+        error = await asyncio.to_thread(webhook_error, webhook_url, JOB_WEBHOOK_ALLOWED_HOSTS)
+        if error is not None:
+            return jsonify({'success': False, 'message': error}), 400
+
+    # 任务可能在进程重启后才执行，上传的图片总是保存到磁盘
+    try:
+        upload = await asyncio.to_thread(receive_file, request.files['image'], True)
+    except UnsupportedImageError:
         return jsonify({'success': False, 'message': '不支持的文件类型'}), 400
 
-# 运行应用
+    payload = {
+        'image_path': upload.source,
+        'content_digest': upload.digest,
+        'message': request.form.get('message') or None
+    }
+
+    async def submit():
+        job_queue = await get_job_queue()
+        return await job_queue.submit(payload, webhook_url)
+
+    try:
+        job_id = await run_in_async_loop(submit())
+    except JobQueueFull as e:
+        message = f'服务繁忙，请稍后重试（{e}）'
+        return jsonify({'success': False, 'message': message}), 429, {'Retry-After': '30'}
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('get_job', job_id=job_id)
+    }), 202
+
+# 查询任务状态和结果
+@app.route('/jobs/<job_id>', methods=['GET'])
+async def get_job(job_id):
+    from job_queue import public_job
+
+    job_queue = await run_in_async_loop(get_job_queue())
+    job = await asyncio.to_thread(job_queue.store.get, job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    return jsonify({'success': True, 'job': public_job(job)}), 200
+
+# 运行应用（开发服务器；生产环境通过 asgi.py 由 uvicorn 启动）
 if __name__ == '__main__':
+    from config_loader import install_reload_signal_handler
+    install_reload_signal_handler()
+    # debug 模式下 app.run 先启动只负责监视代码改动的父进程，再由它启动实际处理请求的
+    # 子进程（WERKZEUG_RUN_MAIN=true）；清理线程和任务队列只在子进程中启动
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        upload_store.start_janitor(UPLOAD_JANITOR_INTERVAL)
+        start_job_queue()
     app.run(debug=True)    
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+ASGI 入口，供 uvicorn / gunicorn 部署使用：
+
+    uvicorn asgi:asgi_app --host 0.0.0.0 --port 5000 --workers 2
+    gunicorn asgi:asgi_app -k uvicorn.workers.UvicornWorker -w 2
+
+也可以直接运行 `python asgi.py`，参数从环境变量读取：
+    HOST / PORT        监听地址，默认 127.0.0.1:5000
+    WEB_WORKERS        进程数，默认 1
+    WEB_THREADS        每个进程处理 Flask 视图的线程数，默认 32
+    ANALYZE_MAX_CONCURRENCY / MCP_POOL_SIZE / UPLOAD_* / JOB_* 见 app.py
+
+Flask 视图在线程池中运行，/analyze 等异步视图在等待皮肤分析API和
+大模型时不会占用事件循环，SSE 响应逐块推送给客户端。
+"""
+import asyncio
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import (
+    UPLOAD_JANITOR_INTERVAL,
+    app,
+    close_async_resources,
+    start_job_queue,
+    stop_job_queue,
+    upload_store,
+)
+from mcp_llm_bridge.tools import close_query_tools
+
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 32))
+
+wsgi_app = WSGIMiddleware(app, workers=WEB_THREADS)
+
+async def asgi_app(scope, receive, send):
+    """
+    在 WSGI 适配层外处理 ASGI lifespan 事件：每个工作进程启动时运行上传目录清理线程
+    （清理操作可以安全地并发执行），并恢复数据库中未完成的后台任务；
+    退出时停止任务队列（执行中的任务放回队列），关闭 MCP 会话池、HTTP 连接池
+    和数据库查询工具的连接池。
+    """
+    if scope['type'] != 'lifespan':
+        await wsgi_app(scope, receive, send)
+        return
+
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            upload_store.start_janitor(UPLOAD_JANITOR_INTERVAL)
+            await asyncio.to_thread(start_job_queue)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            upload_store.stop_janitor()
+            await asyncio.to_thread(stop_job_queue)
+            await asyncio.to_thread(close_async_resources)
+            close_query_tools()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+if __name__ == '__main__':
+    import uvicorn
+
+    from config_loader import install_reload_signal_handler
+
+    install_reload_signal_handler()
+    uvicorn.run('asgi:asgi_app',
+                host=os.environ.get('HOST', '127.0.0.1'),
+                port=int(os.environ.get('PORT', 5000)),
+                workers=int(os.environ.get('WEB_WORKERS', 1)))
@@ -0,0 +1,96 @@
+# benchmarks/local_metrics_benchmark.py
+"""
+测量本地皮肤指标引擎 (skin_metrics) 的吞吐量（张/秒）。
+
+用法:
+    python benchmarks/local_metrics_benchmark.py [图片或目录 ...] [--repeat N]
+        [--max-long-edge PX ...] [--crop-face]
+
+默认使用 src/image 下的示例图片，分别报告"读取+缩小"和"指标计算"两个阶段的中位耗时，
+以及端到端的吞吐量。可以传入多个 --max-long-edge 比较不同分辨率下的速度和结果。
+加上 --crop-face 时额外测量先检测并裁剪人脸区域 (face_roi.analyze_face) 的端到端耗时。
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+from preprocess_benchmark import collect_images  # noqa: E402
+
+from face_roi import analyze_face  # noqa: E402
+from skin_metrics import analyze_array, load_rgb_array  # noqa: E402
+
+SCORE_KEYS = ('moisture_level', 'oil_level', 'pigmentation_level', 'sensitivity_level',
+              'texture_level')
+
+
+def time_stages(path, max_long_edge, repeat):
+    load_times = []
+    analyze_times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rgb = load_rgb_array(path, max_long_edge)
+        loaded = time.perf_counter()
+        result = analyze_array(rgb)
+        load_times.append(loaded - start)
+        analyze_times.append(time.perf_counter() - loaded)
+    return rgb.shape, statistics.median(load_times), statistics.median(analyze_times), result
+
+
+def time_face(path, max_long_edge, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = analyze_face(path, max_long_edge)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', default=[os.path.join(SRC_DIR, 'image')])
+    parser.add_argument('--repeat', type=int, default=10, help='每张图片的重复次数，取中位数')
+    parser.add_argument('--max-long-edge', type=int, nargs='+', default=[512],
+                        help='计算前缩小到的长边像素数，可传多个值比较')
+    parser.add_argument('--crop-face', action='store_true', help='同时测量裁剪到人脸区域后的耗时')
+    args = parser.parse_args()
+
+    images = collect_images(args.paths)
+    print(f"{'图片':<28}{'长边':>6}{'尺寸':>12}{'读取(ms)':>10}{'计算(ms)':>10}"
+          f"  {'皮肤类型':<8}分数")
+    for max_long_edge in args.max_long_edge:
+        total = 0.0
+        face_total = 0.0
+        for path in images:
+            shape, load_seconds, analyze_seconds, result = time_stages(path, max_long_edge,
+                                                                       args.repeat)
+            total += load_seconds + analyze_seconds
+            scores = ' '.join(str(result[key]) for key in SCORE_KEYS)
+            print(f"{os.path.basename(path)[:26]:<28}{max_long_edge:>6}{f'{shape[1]}x{shape[0]}':>12}"
+                  f"{load_seconds * 1000:>10.1f}{analyze_seconds * 1000:>10.1f}"
+                  f"  {result['skin_type']:<8}{scores}")
+            if args.crop_face:
+                face_seconds, result = time_face(path, max_long_edge, args.repeat)
+                face_total += face_seconds
+                scores = ' '.join(str(result[key]) for key in SCORE_KEYS)
+                detected = '人脸' if result['face_detected'] else '未检测到人脸'
+                print(f"{'  └ 人脸裁剪':<28}{max_long_edge:>6}{detected:>12}"
+                      f"{face_seconds * 1000:>20.1f}"
+                      f"  {result['skin_type']:<8}{scores}")
+        if images:
+            print(f"长边 {max_long_edge}: {len(images) / total:.1f} 张/秒（单线程，读取+计算）")
+            if args.crop_face:
+                rate = len(images) / face_total
+                print(f"长边 {max_long_edge}: {rate:.1f} 张/秒（单线程，人脸检测+裁剪+计算）")
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/preprocess_benchmark.py
+"""
+比较上传前图片预处理对传输字节数、耗时和分析结果的影响。
+
+用法:
+    python benchmarks/preprocess_benchmark.py [图片或目录 ...] [--repeat N] [--api]
+
+默认使用 src/image 下的示例图片。加上 --api 时会真实调用皮肤分析接口（消耗配额），
+额外报告端到端延迟，以及预处理前后各项指标 value 一致的比例。
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+from config_loader import get_app_config  # noqa: E402
+from skin_core_llm import SkinAnalysisClient  # noqa: E402
+from to_jpg import normalize_to_jpeg  # noqa: E402
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp'}
+
+
+def collect_images(paths):
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+            )
+        else:
+            images.append(path)
+    return images
+
+
+def time_preprocessing(path, options, repeat):
+    timings = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = normalize_to_jpeg(path, **options)
+        timings.append(time.perf_counter() - start)
+    return output, statistics.median(timings)
+
+
+def agreement(baseline, candidate):
+    """两次分析结果中 value 相同的指标所占比例"""
+    keys = [key for key, item in baseline.items() if isinstance(item, dict) and 'value' in item]
+    if not keys:
+        return None
+    same = sum(1 for key in keys if candidate.get(key, {}).get('value') == baseline[key]['value'])
+    return same / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', default=[os.path.join(SRC_DIR, 'image')])
+    parser.add_argument('--repeat', type=int, default=5, help='每张图片预处理的重复次数，取中位数')
+    parser.add_argument('--api', action='store_true', help='真实调用皮肤分析接口，比较延迟和结果')
+    args = parser.parse_args()
+
+    app_cfg = get_app_config()
+    variants = {
+        '仅格式转换': {},
+        '预处理': dict(app_cfg.image_preprocessing, crop_face=False),
+        '人脸裁剪': dict(app_cfg.image_preprocessing, crop_face=True),
+    }
+    client = SkinAnalysisClient(app_cfg) if args.api else None
+
+    print(f"预处理参数: {app_cfg.image_preprocessing}\n")
+    header = f"{'图片':<28}{'方案':<10}{'原始字节':>12}{'上传字节':>12}{'预处理(ms)':>12}"
+    if args.api:
+        header += f"{'端到端(ms)':>12}{'结果一致率':>12}"
+    print(header)
+
+    totals = {name: 0 for name in variants}
+    for path in collect_images(args.paths):
+        original_bytes = os.path.getsize(path)
+        baseline_result = None
+        for name, options in variants.items():
+            output, seconds = time_preprocessing(path, options, args.repeat)
+            if output is None:
+                print(f"{os.path.basename(path):<28}{name:<10}转换失败")
+                continue
+            upload_bytes = len(output.getvalue())
+            totals[name] += upload_bytes
+            line = (f"{os.path.basename(path)[:26]:<28}{name:<10}{original_bytes:>12}"
+                    f"{upload_bytes:>12}{seconds * 1000:>12.1f}")
+            if client is not None:
+                start = time.perf_counter()
+                result = client.analyze(output)
+                elapsed = time.perf_counter() - start + seconds
+                if baseline_result is None:
+                    baseline_result = result
+                    match = 1.0
+                else:
+                    match = agreement(baseline_result, result)
+                match_text = f"{match:.0%}" if match is not None else "-"
+                line += f"{elapsed * 1000:>12.0f}{match_text:>12}"
+            print(line)
+
+    print()
+    for name, total in totals.items():
+        print(f"{name} 上传总字节: {total}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/query_tool_benchmark.py
+"""
+比较数据库查询工具每次查询新建连接与使用常驻只读连接池的吞吐量（次/秒）。
+
+用法:
+    python benchmarks/query_tool_benchmark.py [--rows N] [--seconds S] [--db PATH]
+
+默认在临时目录生成一张 N 行的 products 表（结构同 create_test_db.py），
+然后每类查询在 S 秒内轮流执行：按主键查找、按类别过滤、全表聚合。
+最后比较 SELECT * 的输出大小：改造前逐行字典的完整结果与分页后的列式结果第一页。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+from mcp_llm_bridge.tools import DatabaseQueryTool  # noqa: E402
+
+CATEGORIES = ['Electronics', 'Appliances', 'Sports', 'Outdoor', 'Home', 'Furniture', 'Stationery',
+              'Art']
+
+
+def create_products(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE products (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+        "description TEXT, price REAL NOT NULL, category TEXT, stock INTEGER DEFAULT 0, "
+        "created_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.execute("CREATE INDEX products_category ON products (category)")
+    rng = random.Random(0)
+    conn.executemany(
+        "INSERT INTO products (title, description, price, category, stock) VALUES (?, ?, ?, ?, ?)",
+        ((f"Product {i}", f"Description of product {i} " * 4, round(rng.uniform(5, 2000), 2),
+          rng.choice(CATEGORIES), rng.randint(0, 500)) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def workload(rows):
+    """模型反复发出的查询：每类少量不同的语句轮流执行"""
+    rng = random.Random(1)
+    return {
+        '主键查找': [f"SELECT * FROM products WHERE id = {rng.randint(1, rows)}"
+                     for _ in range(20)],
+        '类别过滤': [f"SELECT id, title, price FROM products WHERE category = '{category}' "
+                 f"ORDER BY price DESC LIMIT 10" for category in CATEGORIES],
+        '全表聚合': ["SELECT category, COUNT(*) AS n, AVG(price) AS avg_price FROM products "
+                     "GROUP BY category"],
+    }
+
+
+async def connect_per_query(db_path, query):
+    """改造前的做法：每次查询新建连接，结束后关闭"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+async def queries_per_second(execute, queries, seconds):
+    """在 seconds 秒内轮流执行 queries，返回每秒完成的查询数"""
+    for query in queries:
+        # 先完整跑一轮，让操作系统的文件缓存处于相同状态
+        await execute(query)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        await execute(queries[count % len(queries)])
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000, help='生成的商品行数')
+    parser.add_argument('--seconds', type=float, default=2.0,
+                        help='每类查询、每种方式的测量时长（秒）')
+    parser.add_argument('--db', help='使用已有的数据库文件（需包含 products 表），不生成临时数据')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(tmp_dir, 'products.db')
+            start = time.perf_counter()
+            create_products(db_path, args.rows)
+            print(f"生成 {args.rows} 行商品数据，用时 {time.perf_counter() - start:.1f} 秒")
+        rows = sqlite3.connect(db_path).execute("SELECT MAX(id) FROM products").fetchone()[0]
+
+        tool = DatabaseQueryTool(db_path, max_scan_rows=None)
+        try:
+            print(f"{'查询类型':<10}{'每次新建连接(次/秒)':>20}{'常驻连接池(次/秒)':>20}{'提升':>8}")
+            for name, queries in workload(rows).items():
+                before = asyncio.run(queries_per_second(
+                    lambda query: connect_per_query(db_path, query), queries, args.seconds))
+                after = asyncio.run(queries_per_second(
+                    lambda query: tool.execute({"query": query}), queries, args.seconds))
+                print(f"{name:<10}{before:>20.0f}{after:>20.0f}{after / before:>7.1f}x")
+
+            query = "SELECT * FROM products"
+            full = asyncio.run(connect_per_query(db_path, query))
+            page = asyncio.run(tool.execute({"query": query}))
+            print(f"\n{query}:")
+            full_size = len(json.dumps(full, ensure_ascii=False))
+            page_size = len(json.dumps(page, ensure_ascii=False))
+            print(f"  逐行字典（全部 {len(full)} 行）: {full_size:>12} 字节")
+            print(f"  列式分页（第一页 {page['row_count']} 行）: {page_size:>10} 字节")
+        finally:
+            tool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@
 import yaml
 import sys
 import os
+import signal
+import threading
 
 DEFAULT_CONFIG_FILENAME = 'config.yaml'
 
@@ -94,6 +96,26 @@ class AppConfig:
     def request_timeout_seconds(self):
         return self._config.get('api_settings', {}).get('request_timeout_seconds', 30)
 
+    @property
+    def max_retries(self):
+        """5xx 或超时时的最大重试次数"""
+        return self._config.get('api_settings', {}).get('max_retries', 2)
+
+    @property
+    def retry_backoff_seconds(self):
+        """重试退避的基础时间（秒），每次重试翻倍并加入随机抖动"""
+        return self._config.get('api_settings', {}).get('retry_backoff_seconds', 0.5)
+
+    @property
+    def pool_maxsize(self):
+        """连接池中保持的最大连接数"""
+        return self._config.get('api_settings', {}).get('pool_maxsize', 10)
+
+    @property
+    def batch_max_concurrency(self):
+        """批量分析时同时进行的最大请求数"""
+        return self._config.get('api_settings', {}).get('batch_max_concurrency', 4)
+
     @property
     def default_image_path(self):
         """
@@ -124,6 +146,78 @@ class AppConfig:
     def file_content_type(self):
         return self._config.get('file_upload_details', {}).get('content_type', 'application/octet-stream')
 
+    # 上传前的图片预处理
+    @property
+    def image_preprocessing(self):
+        """
+        返回传给 to_jpg.normalize_to_jpeg 的预处理参数。
+        image_preprocessing.enabled 为 false 时返回空字典，即只做格式转换。
+        """
+        settings = self._config.get('image_preprocessing') or {}
+        if not settings.get('enabled', True):
+            return {}
+        return {
+            'max_long_edge': settings.get('max_long_edge', 2048),
+            'quality': settings.get('jpeg_quality', 75),
+            'progressive': settings.get('progressive', True),
+            'optimize': settings.get('optimize', True),
+            'fix_orientation': settings.get('fix_orientation', True),
+            'draft': settings.get('draft_decode', True),
+            'crop_face': settings.get('crop_face', False),
+            'face_padding': settings.get('face_padding', 0.3),
+        }
+
+    # 本地皮肤指标
+    @property
+    def local_analysis_engine(self):
+        """'metrics' 使用 skin_metrics 计算本地指标，'random' 返回随机示例数据"""
+        return self._config.get('local_analysis', {}).get('engine', 'metrics')
+
+    @property
+    def local_analysis_max_long_edge(self):
+        return self._config.get('local_analysis', {}).get('max_long_edge', 512)
+
+    @property
+    def local_analysis_call_api(self):
+        """/analyze、/analyze/batch 和 /jobs 是否调用远程皮肤分析API"""
+        return self._config.get('local_analysis', {}).get('call_api', True)
+
+    @property
+    def local_analysis_crop_face(self):
+        """计算本地指标前是否裁剪到人脸区域，并使用缓存的面部区域掩码"""
+        return self._config.get('local_analysis', {}).get('crop_face', False)
+
+    @property
+    def local_analysis_face_padding(self):
+        return self._config.get('local_analysis', {}).get('face_padding', 0.3)
+
+    # 分析结果缓存
+    @property
+    def analysis_cache_enabled(self):
+        return self._config.get('analysis_cache', {}).get('enabled', True)
+
+    @property
+    def analysis_cache_ttl_seconds(self):
+        return self._config.get('analysis_cache', {}).get('ttl_seconds', 7 * 24 * 3600)
+
+    @property
+    def analysis_cache_memory_max_entries(self):
+        return self._config.get('analysis_cache', {}).get('memory_max_entries', 256)
+
+    @property
+    def analysis_cache_db_path(self):
+        """SQLite持久层的绝对路径，未配置时返回None。相对路径相对于 config.yaml 所在目录。"""
+        raw_path = self._config.get('analysis_cache', {}).get('db_path')
+        if not raw_path:
+            return None
+        if os.path.isabs(raw_path):
+            return os.path.normpath(raw_path)
+        return os.path.normpath(os.path.join(self._config_dir, raw_path))
+
+    @property
+    def analysis_cache_db_max_entries(self):
+        return self._config.get('analysis_cache', {}).get('db_max_entries', 10000)
+
     # 通用设置
     @property
     def default_encoding(self):
@@ -138,13 +232,83 @@ class AppConfig:
         return self._config.get('general_settings', {}).get('json_ensure_ascii', False)
 
 
+# 已加载的配置缓存: 配置文件绝对路径 -> (文件修改时间, AppConfig)
+_config_cache = {}
+_config_cache_lock = threading.Lock()
+
+
+def _config_mtime(config_path):
+    try:
+        return os.stat(config_path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_app_config(config_path, mtime):
+    """加载、校验并缓存配置。已有旧配置时，重新加载失败会保留旧配置而不是退出进程。"""
+    cached = _config_cache.get(config_path)
+    try:
+        app_config = AppConfig(load_raw_config_dict(config_path))
+    except SystemExit:
+        if cached is None:
+            raise
+        print(f"警告: 重新加载配置文件 {config_path} 失败，继续使用上一次的有效配置。")
+        # 记录新的修改时间，避免每次调用都重复尝试同一个错误的文件
+        _config_cache[config_path] = (mtime, cached[1])
+        return cached[1]
+    _config_cache[config_path] = (mtime, app_config)
+    return app_config
+
+
 def get_app_config(config_path=None):
     """
     加载并返回一个AppConfig实例。
     这是外部模块应该使用的主要函数来获取配置。
+
+    配置在进程内只加载和校验一次，之后仅当配置文件的修改时间变化时才重新加载。
+    新配置整体替换旧配置，调用方拿到的实例在使用期间不会被修改。
     """
-    raw_dict = load_raw_config_dict(config_path)
-    return AppConfig(raw_dict)
+    if config_path is None:
+        config_path = get_config_path()
+    config_path = os.path.abspath(config_path)
+    mtime = _config_mtime(config_path)
+
+    cached = _config_cache.get(config_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _config_cache_lock:
+        # 其他线程可能已经完成了重新加载
+        cached = _config_cache.get(config_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        return _load_app_config(config_path, mtime)
+
+
+def reload_app_config(config_path=None):
+    """忽略修改时间，强制重新加载配置文件。"""
+    if config_path is None:
+        config_path = get_config_path()
+    config_path = os.path.abspath(config_path)
+    with _config_cache_lock:
+        return _load_app_config(config_path, _config_mtime(config_path))
+
+
+def install_reload_signal_handler(config_path=None):
+    """
+    收到 SIGHUP 时重新加载配置文件（仅支持提供 SIGHUP 的平台，且须在主线程调用）。
+    返回是否成功安装。
+    """
+    if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def handle_sighup(signum, frame):
+        print("收到 SIGHUP，重新加载配置文件。")
+        # 信号处理函数可能打断持有锁的线程，放到新线程中执行以免死锁
+        threading.Thread(target=reload_app_config, args=(config_path,), daemon=True).start()
+
+    signal.signal(signal.SIGHUP, handle_sighup)
+    return True
 
 
 # 测试块
@@ -158,10 +322,17 @@ if __name__ == '__main__':
         print(f"API Key: {app_configuration.api_key}")
         print(f"API Key Header: {app_configuration.api_key_header_name}")
         print(f"Timeout: {app_configuration.request_timeout_seconds}")
+        print(f"Max Retries: {app_configuration.max_retries}")
+        print(f"Retry Backoff: {app_configuration.retry_backoff_seconds}")
+        print(f"Pool Max Size: {app_configuration.pool_maxsize}")
+        print(f"Batch Max Concurrency: {app_configuration.batch_max_concurrency}")
         print(f"Default Image: {app_configuration.default_image_path}")
         print(f"Form Field: {app_configuration.file_form_field_name}")
         print(f"Sent Filename: {app_configuration.file_sent_filename_placeholder}")
         print(f"Content Type: {app_configuration.file_content_type}")
+        print(f"Image Preprocessing: {app_configuration.image_preprocessing}")
+        print(f"Local Analysis Engine: {app_configuration.local_analysis_engine}")
+        print(f"Local Analysis Crop Face: {app_configuration.local_analysis_crop_face}")
         print(f"Default Encoding: {app_configuration.default_encoding}")
         print(f"JSON Indent: {app_configuration.json_indent}")
         print(f"JSON Ensure ASCII: {app_configuration.json_ensure_ascii}")
@@ -0,0 +1,227 @@
+# face_roi.py
+"""
+人脸区域 (ROI) 检测与裁剪：上传和本地指标计算只处理人脸及其周围一圈边距，
+不再处理整幅画面的背景，减少上传字节数和逐像素计算量。
+
+检测只用CPU：安装了 OpenCV 时使用它自带的 Haar 级联分类器；未安装时退化为
+按皮肤颜色掩码的行列投影粗略估计人脸范围。
+
+裁剪框是以人脸为中心的正方形与原图的交集，人脸在正方形中的相对位置固定：
+额头、两颊等区域掩码只取决于正方形的边长，按边长缓存后，每张图片只需取出
+与裁剪结果对应的切片，可供任何本地指标计算直接复用。
+"""
+import sys
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+from PIL import Image
+
+import skin_metrics
+
+try:
+    import cv2
+except ImportError:  # OpenCV 是可选依赖: pip install opencv-python-headless
+    cv2 = None
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+# 检测前把图片缩小到的长边像素数，人脸检测不需要高分辨率
+DETECT_LONG_EDGE = 320
+# 裁剪框在人脸框四周各留出的边距，按人脸边长的比例计算
+DEFAULT_PADDING = 0.3
+# 人脸边长至少占检测图短边的比例，更小的候选视为误检
+MIN_FACE_RATIO = 0.1
+# 皮肤颜色检测时，行/列中皮肤像素比例不低于最大值的这一比例才算人脸范围
+SKIN_PROFILE_THRESHOLD = 0.35
+# 皮肤颜色检测得到的人脸高度上限（相对宽度），避免把脖子算进人脸
+MAX_FACE_ASPECT = 1.25
+
+# 各面部区域相对于人脸框的位置 (上, 下, 左, 右)，0-1 为人脸框内，可以延伸到边距中
+FACE_REGION_BOXES = {
+    'forehead': (-0.1, 0.2, 0.2, 0.8),
+    'left_cheek': (0.45, 0.8, 0.1, 0.4),
+    'right_cheek': (0.45, 0.8, 0.6, 0.9),
+    'nose': (0.3, 0.7, 0.4, 0.6),
+    'jaw': (0.8, 1.05, 0.25, 0.75),
+}
+
+# 人脸框在原图中的像素坐标（右、下边界不包含在内）
+FaceBox = namedtuple('FaceBox', ['left', 'top', 'right', 'bottom'])
+
+# CascadeClassifier 不保证线程安全，每个线程各自加载一份
+_local = threading.local()
+
+
+def _cascade():
+    cascade = getattr(_local, 'cascade', None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        _local.cascade = cascade
+    return cascade
+
+
+def _detect_haar(small):
+    gray = np.asarray(small.convert('L'))
+    min_side = max(1, int(min(gray.shape) * MIN_FACE_RATIO))
+    faces = _cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5,
+                                        minSize=(min_side, min_side))
+    if len(faces) == 0:
+        return None
+    # 多个候选时取面积最大的
+    x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+    return x, y, x + w, y + h
+
+
+def _longest_run(flags):
+    """布尔序列中最长的连续 True 段，返回 (起点, 终点)，没有时返回None"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+    if edges.size == 0:
+        return None
+    starts, ends = edges[::2], edges[1::2]
+    longest = int(np.argmax(ends - starts))
+    return int(starts[longest]), int(ends[longest])
+
+
+def _detect_skin(small):
+    mask = skin_metrics.skin_mask(np.asarray(small, dtype=np.float32) / 255.0)
+    columns = mask.mean(axis=0)
+    if columns.max() == 0:
+        return None
+    left, right = _longest_run(columns >= SKIN_PROFILE_THRESHOLD * columns.max())
+    rows = mask[:, left:right].mean(axis=1)
+    top, bottom = _longest_run(rows >= SKIN_PROFILE_THRESHOLD * rows.max())
+    bottom = min(bottom, top + int(MAX_FACE_ASPECT * (right - left)))
+    if min(right - left, bottom - top) < MIN_FACE_RATIO * min(mask.shape):
+        return None
+    return left, top, right, bottom
+
+
+def detect_face(image, detector='auto'):
+    """
+    检测图片中最大的人脸。
+
+    参数:
+    image (PIL.Image.Image): RGB 图片。
+    detector (str): 'haar' 使用 OpenCV 级联分类器，'skin' 使用皮肤颜色投影，
+        'auto' 在安装了 OpenCV 时使用 'haar'，否则使用 'skin'。
+
+    返回:
+    FaceBox or None: 原图坐标下的人脸框，未检测到人脸时返回None。
+    """
+    scale = min(1.0, DETECT_LONG_EDGE / max(image.size))
+    small = image
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        small = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+    if detector == 'auto':
+        detector = 'haar' if cv2 is not None else 'skin'
+    if detector == 'haar':
+        if cv2 is None:
+            raise RuntimeError('haar 检测需要安装 opencv-python-headless')
+        box = _detect_haar(small)
+    elif detector == 'skin':
+        box = _detect_skin(small)
+    else:
+        raise ValueError(f'未知的人脸检测方式: {detector}')
+
+    if box is None:
+        return None
+    return FaceBox(*(int(round(value / scale)) for value in box))
+
+
+def roi_box(face, padding=DEFAULT_PADDING):
+    """以人脸为中心、四周各留出 padding 倍人脸边长的正方形裁剪框 (左, 上, 右, 下)"""
+    side = max(face.right - face.left, face.bottom - face.top)
+    size = int(round(side * (1 + 2 * padding)))
+    left = int(round((face.left + face.right - size) / 2))
+    top = int(round((face.top + face.bottom - size) / 2))
+    return left, top, left + size, top + size
+
+
+def crop_to_face(image, padding=DEFAULT_PADDING, detector='auto'):
+    """
+    把图片裁剪为以人脸为中心、四周留出边距的正方形（超出原图的部分直接截掉，不做填充）。
+
+    返回:
+    tuple: (裁剪后的图片, 裁剪后图片坐标下的 FaceBox)；未检测到人脸时返回 (原图, None)。
+    """
+    face = detect_face(image, detector)
+    if face is None:
+        return image, None
+    left, top, right, bottom = roi_box(face, padding)
+    left, top = max(0, left), max(0, top)
+    right, bottom = min(image.width, right), min(image.height, bottom)
+    face = FaceBox(face.left - left, face.top - top, face.right - left, face.bottom - top)
+    return image.crop((left, top, right, bottom)), face
+
+
+@lru_cache(maxsize=32)
+def face_region_masks(size, padding=DEFAULT_PADDING):
+    """
+    边长为 size 的正方形人脸裁剪框中各面部区域的几何掩码。
+    结果按 (size, padding) 缓存，返回只读的 {区域名: 布尔数组}，调用方不能原地修改。
+    """
+    face_side = size / (1 + 2 * padding)
+    offset = padding * face_side
+
+    def clamp(value):
+        return min(size, max(0, int(round(offset + value * face_side))))
+
+    masks = {}
+    for name, (y0, y1, x0, x1) in FACE_REGION_BOXES.items():
+        region = np.zeros((size, size), dtype=bool)
+        region[clamp(y0):clamp(y1), clamp(x0):clamp(x1)] = True
+        region.setflags(write=False)
+        masks[name] = region
+    return MappingProxyType(masks)
+
+
+def face_masks(rgb, face, padding=DEFAULT_PADDING, scale=1.0):
+    """
+    对 crop_to_face 裁剪结果的数组计算皮肤掩码和各区域掩码，
+    格式与 skin_metrics.analyze_array 的 masks 参数相同。
+
+    参数:
+    rgb (np.ndarray): 裁剪结果（可能已缩小）的 (H, W, 3) 数组。
+    face (FaceBox): crop_to_face 返回的人脸框。
+    padding (float): 裁剪时使用的边距。
+    scale (float): 数组相对于裁剪结果的缩放比例。
+    """
+    height, width = rgb.shape[:2]
+    left, top, right, _ = roi_box(face, padding)
+    # 数组左上角在完整正方形中的位置；正方形被原图边界截掉的部分位于数组之外
+    x, y = int(round(-left * scale)), int(round(-top * scale))
+    size = max(int(round((right - left) * scale)), x + width, y + height)
+
+    skin = skin_metrics.skin_mask(rgb)
+    masks = {'skin': skin}
+    for name, region in face_region_masks(size, padding).items():
+        masks[name] = region[y:y + height, x:x + width] & skin
+    return masks
+
+
+def analyze_face(image, max_long_edge=skin_metrics.DEFAULT_MAX_LONG_EDGE,
+                 padding=DEFAULT_PADDING, detector='auto'):
+    """
+    先裁剪到人脸区域再计算本地皮肤指标，未检测到人脸时按整幅图片计算。
+    裁剪结果按整幅图片缩小到 max_long_edge 时的比例缩小，人脸的分辨率和纹理、色斑
+    窗口对应的实际尺寸与不裁剪时相同，只是不再计算背景像素。
+    返回值同 skin_metrics.analyze_array，另加 face_detected 字段。
+    """
+    image = skin_metrics.open_rgb_image(image, max_long_edge)
+    roi, face = crop_to_face(image, padding, detector)
+    if max_long_edge is not None and face is not None:
+        max_long_edge = max(1, round(max(roi.size) * min(1.0, max_long_edge / max(image.size))))
+    rgb = skin_metrics.load_rgb_array(roi, max_long_edge)
+    if face is None:
+        result = skin_metrics.analyze_array(rgb)
+    else:
+        masks = face_masks(rgb, face, padding, rgb.shape[1] / roi.width)
+        result = skin_metrics.analyze_array(rgb, masks)
+    result['face_detected'] = face is not None
+    return result
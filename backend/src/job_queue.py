@@ -0,0 +1,368 @@
+# job_queue.py
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+
+import httpx
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class JobQueueFull(Exception):
+    """排队中的任务数已达到上限"""
+
+
+def _process_start(pid):
+    """进程的启动时间（Linux 上取 /proc/<pid>/stat 中的 starttime 字段），无法获取时返回None"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # 进程名字段可能包含空格，从最后一个右括号之后开始计数
+    return stat[stat.rindex(b')') + 2:].split()[19].decode()
+
+
+# 本进程的启动标识：容器重启后主机名和进程号（常常是 1）可能与之前完全相同，
+# 只凭主机名和进程号会把上一个进程遗留的任务误认为仍在执行
+_START_TOKEN = _process_start(os.getpid()) or uuid.uuid4().hex[:12]
+
+
+def worker_id():
+    """当前进程的标识（主机名:进程号:启动标识），记录在执行中的任务上"""
+    return f"{socket.gethostname()}:{os.getpid()}:{_START_TOKEN}"
+
+
+def _worker_alive(owner):
+    """判断执行任务的进程是否仍在运行；其他主机上的进程无法判断，视为仍在运行"""
+    host, pid, token = ((owner or '').split(':') + [None, None])[:3]
+    if not host or not pid or not pid.isdigit():
+        return False
+    if host != socket.gethostname():
+        return True
+    pid = int(pid)
+    if pid == os.getpid():
+        # 进程号相同但启动标识不同（或是不带启动标识的旧记录），说明是重启前的进程
+        return token == _START_TOKEN
+    start = _process_start(pid)
+    if start is not None and token is not None:
+        # 进程号已被新进程复用时启动时间不同
+        return start == token
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def webhook_error(url, allowed_hosts=None):
+    """
+    检查任务回调地址，避免客户端借回调让服务器请求内网地址或云平台元数据接口。
+
+    参数:
+    url (str): 回调地址。
+    allowed_hosts (collection of str, optional): 允许的主机名；设置后只接受这些主机，
+        不再检查解析出的地址。为None时接受任何解析到公网地址的主机。
+
+    返回:
+    str or None: 拒绝的原因，地址可以使用时返回None。
+    """
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return '回调地址必须是 http(s) URL'
+    host = parsed.hostname.lower()
+    if allowed_hosts is not None:
+        return None if host in allowed_hosts else f'回调地址的主机 {host} 不在允许列表中'
+
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    except (ValueError, OSError):
+        return f'无法解析回调地址的主机 {host}'
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            return f'回调地址不能指向内网、本机或保留地址（{ip}）'
+    return None
+
+
+class JobStore:
+    """
+    持久化到 SQLite 的任务状态，进程或工作协程重启后排队中的任务不会丢失。
+    多个进程可以共用同一个数据库，任务通过原子的状态更新领取，不会被重复执行。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, webhook_url TEXT, owner TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def create(self, payload, webhook_url=None):
+        """新建排队中的任务，返回任务ID"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, payload, webhook_url, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False), webhook_url, time.time()),
+            )
+            self._conn.commit()
+        return job_id
+
+    def get(self, job_id):
+        """返回任务的全部字段（payload 和 result 已解析为对象），不存在时返回None"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def claim(self, job_id, owner):
+        """把排队中的任务标记为执行中；任务已被其他进程领取时返回False"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, started_at = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, owner, time.time(), job_id, QUEUED),
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def finish(self, job_id, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (SUCCEEDED if error is None else FAILED,
+                 json.dumps(result, ensure_ascii=False) if error is None else None,
+                 error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def queued_ids(self):
+        """按提交顺序返回排队中的任务ID"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def active_payload_values(self, key):
+        """返回排队中和执行中任务的 payload[key]（如任务引用的上传文件路径）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT json_extract(payload, '$.' || ?) FROM jobs WHERE status IN (?, ?)",
+                (key, QUEUED, RUNNING),
+            ).fetchall()
+        return {row[0] for row in rows if row[0] is not None}
+
+    def recover(self, max_attempts):
+        """
+        把执行进程已经退出的任务重新放回队列，已尝试 max_attempts 次的任务直接标记为失败。
+        返回重新排队的任务数。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, owner, attempts FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            requeued = 0
+            for job_id, owner, attempts in rows:
+                if _worker_alive(owner):
+                    continue
+                if attempts >= max_attempts:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                        (FAILED, f'执行进程中断，已尝试 {attempts} 次', time.time(), job_id),
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, owner = NULL WHERE id = ?", (QUEUED, job_id)
+                    )
+                    requeued += 1
+            self._conn.commit()
+        return requeued
+
+    def release(self, owner):
+        """把 owner 执行中的任务放回队列（工作协程被主动停止时调用）"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL WHERE status = ? AND owner = ?",
+                (QUEUED, RUNNING, owner),
+            )
+            self._conn.commit()
+
+    def purge(self, max_age_seconds):
+        """删除结束时间早于 max_age_seconds 之前的已完成任务"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (SUCCEEDED, FAILED, time.time() - max_age_seconds),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    进程内的后台任务队列：若干 asyncio 工作协程从队列中取出任务执行，
+    任务状态写入 JobStore。排队任务数达到 max_pending 时拒绝新任务（JobQueueFull），
+    调用方据此返回 429。任务完成后可选地向 webhook_url POST 任务状态。
+    """
+
+    def __init__(self, store, handler, workers=2, max_pending=50, job_timeout=600.0,
+                 max_attempts=3, retention_seconds=7 * 24 * 3600, webhook_timeout=10.0,
+                 webhook_allowed_hosts=None):
+        """
+        参数:
+        store (JobStore): 任务状态存储。
+        handler (async callable): 接收任务 payload、返回可 JSON 序列化结果的协程函数。
+        workers (int): 工作协程数，即同时执行的任务数。
+        max_pending (int): 排队中（未开始执行）的任务数上限。
+        job_timeout (float): 单个任务的最长执行时间（秒）。
+        max_attempts (int): 因进程中断而重新执行的最大次数。
+        retention_seconds (float): 已完成任务在数据库中的保留时间（秒）。
+        webhook_timeout (float): 回调请求的超时时间（秒）。
+        webhook_allowed_hosts (collection of str, optional): 允许回调的主机名，见 webhook_error。
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self.webhook_timeout = webhook_timeout
+        self.webhook_allowed_hosts = webhook_allowed_hosts
+        self.owner = worker_id()
+        self._queue = None
+        self._tasks = []
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """恢复中断的任务和数据库中排队的任务，并启动工作协程（需在事件循环中调用）"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        await asyncio.to_thread(self.store.purge, self.retention_seconds)
+        requeued = await asyncio.to_thread(self.store.recover, self.max_attempts)
+        queued = await asyncio.to_thread(self.store.queued_ids)
+        for job_id in queued:
+            self._queue.put_nowait(job_id)
+        if queued:
+            print(f"任务队列恢复了 {len(queued)} 个排队中的任务"
+                  f"（其中 {requeued} 个因进程中断重新排队）")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, payload, webhook_url=None):
+        """提交任务并返回任务ID；队列已满时抛出 JobQueueFull"""
+        if self._queue is None:
+            raise RuntimeError('任务队列尚未启动')
+        if self._queue.qsize() >= self.max_pending:
+            raise JobQueueFull(f'排队中的任务已达到上限 {self.max_pending}')
+        job_id = await asyncio.to_thread(self.store.create, payload, webhook_url)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"任务 {job_id} 处理异常: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        # 同一个数据库可能被多个进程共用，只执行自己成功领取的任务
+        if not await asyncio.to_thread(self.store.claim, job_id, self.owner):
+            return
+        job = await asyncio.to_thread(self.store.get, job_id)
+        try:
+            result = await asyncio.wait_for(self.handler(job['payload']), timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            error = f'任务超时（超过 {self.job_timeout} 秒）'
+            await asyncio.to_thread(self.store.finish, job_id, None, error)
+        except Exception as e:
+            await asyncio.to_thread(self.store.finish, job_id, None, str(e) or type(e).__name__)
+        else:
+            await asyncio.to_thread(self.store.finish, job_id, result)
+
+        if job['webhook_url']:
+            await self._notify(await asyncio.to_thread(self.store.get, job_id))
+
+    async def _notify(self, job):
+        """向任务的 webhook_url 推送最终状态，失败只记录日志"""
+        # 提交时已检查过，发送前按当前的 DNS 解析结果再检查一次
+        error = await asyncio.to_thread(webhook_error, job['webhook_url'],
+                                        self.webhook_allowed_hosts)
+        if error is not None:
+            print(f"任务 {job['id']} 不回调 {job['webhook_url']}: {error}")
+            return
+        try:
+            async with httpx.AsyncClient(timeout=self.webhook_timeout) as client:
+                response = await client.post(job['webhook_url'], json=public_job(job))
+                response.raise_for_status()
+        except Exception as e:
+            print(f"任务 {job['id']} 回调 {job['webhook_url']} 失败: {e}")
+
+    async def stop(self):
+        """停止工作协程；执行中的任务会在下次启动时重新排队"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.release, self.owner)
+
+
+def public_job(job):
+    """返回给客户端的任务字段（不包含 payload 和内部字段）"""
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+    }
@@ -8,7 +8,6 @@ from mcp_llm_bridge.bridge import BridgeManager
 import colorlog
 import logging
 
-from langchain.prompts import PromptTemplate
 import skin_core_llm 
 
 
@@ -21,23 +20,15 @@ def prompt():
     return prompt_template_content
 
 
-async def main():
-    # Load environment variables
-    load_dotenv()
-
-    print("--- 开始执行皮肤分析脚本 ---")
-    analysis_result = skin_core_llm.analyze_skin_with_api()
-    user_input = prompt()
+def build_bridge_config(analysis_result):
+    """根据皮肤分析结果构建桥接配置，供脚本和Web服务共用。"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
 
-    # Get the project root directory (where test.db is located)
-    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    db_path = os.path.join(project_root, "test.db")
-    
-    # Configure bridge
-    config = BridgeConfig(
+    return BridgeConfig(
         mcp_server_params=StdioServerParameters(
             command="python",
-            args=["web_search.py", user_input],
+            # 服务器参数不随请求变化，才能复用会话池中的进程
+            args=[os.path.join(current_dir, "web_search.py")],
             env=None
         ),
         llm_config=LLMConfig(
@@ -63,10 +54,25 @@ async def main():
         4. 围绕核心锚点，绝对客观，超越表面，逻辑清晰，问题澄清与深化
         """
     )
+
+
+async def main():
+    # Load environment variables
+    load_dotenv()
+
+    print("--- 开始执行皮肤分析脚本 ---")
+    analysis_result = await skin_core_llm.analyze_skin_with_api_async()
+    user_input = prompt()
+
+    # Get the project root directory (where test.db is located)
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    db_path = os.path.join(project_root, "test.db")
+    
+    config = build_bridge_config(analysis_result)
     async with BridgeManager(config) as bridge:
         try: 
             response = await bridge.process_message(user_input)
-            print(f"皮肤数据如下\n{skin_core_llm.analyze_skin_with_api()}")
+            print(f"皮肤数据如下\n{analysis_result}")
             print(f"\nResponse: {response}")
         except Exception as e:
             logger.error(f"\nError occurred: {e}")
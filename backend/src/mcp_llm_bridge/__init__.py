@@ -3,5 +3,9 @@ from .mcp_client import MCPClient
 from .bridge import MCPLLMBridge, BridgeManager
 from .config import BridgeConfig, LLMConfig
 from .llm_client import LLMClient
+from .history import HistoryManager
+from .session_pool import MCPSessionPool, get_session_pool
+from .tool_dispatch import LocalTool
 
-__all__ = ['MCPClient', 'MCPLLMBridge', 'BridgeManager', 'BridgeConfig', 'LLMConfig', 'LLMClient']
\ No newline at end of file
+__all__ = ['MCPClient', 'MCPLLMBridge', 'BridgeManager', 'BridgeConfig', 'LLMConfig', 'LLMClient',
+           'HistoryManager', 'MCPSessionPool', 'get_session_pool', 'LocalTool']
\ No newline at end of file
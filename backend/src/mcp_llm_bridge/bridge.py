@@ -1,15 +1,25 @@
 # src/mcp_llm_bridge/bridge.py
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, AsyncIterator, Awaitable, Callable, Optional
 from dataclasses import dataclass
 from mcp import ClientSession, StdioServerParameters
 from mcp_llm_bridge.mcp_client import MCPClient
+from mcp_llm_bridge.session_pool import MCPSessionPool
 from mcp_llm_bridge.llm_client import LLMClient
 import asyncio
+import functools
 import json
-from mcp_llm_bridge.config import BridgeConfig
+import time
+from mcp_llm_bridge.config import BridgeConfig, server_params_key
+from mcp_llm_bridge.tool_catalog import (
+    convert_tools_to_openai_format,
+    extract_tools_list,
+    sanitize_tool_name,
+    tool_catalog_cache,
+)
 import logging
 import colorlog
-from mcp_llm_bridge.tools import DatabaseQueryTool
+from mcp_llm_bridge.tools import get_query_tool
+from mcp_llm_bridge.tool_dispatch import LocalTool, ToolLatency
 
 handler = colorlog.StreamHandler()
 handler.setFormatter(colorlog.ColoredFormatter(
@@ -34,11 +44,12 @@ logger.setLevel(logging.INFO)
 class MCPLLMBridge:
     """Bridge between MCP protocol and LLM client"""
     
-    def __init__(self, config: BridgeConfig):
+    def __init__(self, config: BridgeConfig, session_pool: Optional[MCPSessionPool] = None):
         self.config = config
-        self.mcp_client = MCPClient(config.mcp_server_params)
+        self.mcp_client = MCPClient(config.mcp_server_params, pool=session_pool)
         self.llm_client = LLMClient(config.llm_config)
-        self.query_tool = DatabaseQueryTool("test.db")  # Initialize database query tool
+        # Shared database query tool and its connection pool
+        self.query_tool = get_query_tool("test.db")
         
         # Combine system prompt with schema information
         schema_prompt = f"""
@@ -57,6 +68,21 @@ When querying the database:
             
         self.available_tools: List[Any] = []
         self.tool_name_mapping: Dict[str, str] = {}  # Maps OpenAI tool names to MCP tool names
+        self.local_tools: Dict[str, LocalTool] = {}  # Maps OpenAI tool names to in-process tools
+        self.tool_latency: Dict[str, ToolLatency] = {}
+        self._tool_semaphore = asyncio.Semaphore(config.max_concurrent_tool_calls)
+
+        self.register_local_tool(
+            LocalTool.from_spec(self.query_tool.get_tool_spec(), self.query_tool.execute)
+        )
+
+    def register_local_tool(self, tool: LocalTool):
+        """Register a tool that is executed in-process rather than through MCP.
+
+        Call before ``initialize`` so the tool is advertised to the model.
+        A local tool shadows an MCP tool with the same OpenAI name.
+        """
+        self.local_tools[sanitize_tool_name(tool.name)] = tool
 
     async def initialize(self):
         """Initialize both clients and set up tools"""
@@ -64,19 +90,33 @@ When querying the database:
             # Connect MCP client
             await self.mcp_client.connect()
             
-            # Get available tools from MCP and add our database tool
-            mcp_tools = await self.mcp_client.get_available_tools()
-            if hasattr(mcp_tools, 'tools'):
-                self.available_tools = [*mcp_tools.tools, self.query_tool.get_tool_spec()]
-            else:
-                self.available_tools = [*mcp_tools, self.query_tool.get_tool_spec()]
-            
-            logger.debug(f"MCP Tools received: {self.available_tools}")
-            
-            # Convert and register tools with LLM client
-            converted_tools = self._convert_mcp_tools_to_openai_format(self.available_tools)
-            logger.debug(f"Converted tools for OpenAI: {converted_tools}")
-            self.llm_client.tools = converted_tools
+            # Tools and their OpenAI schemas are listed and converted once per server
+            server_key = server_params_key(self.config.mcp_server_params)
+            catalog = tool_catalog_cache.get(server_key)
+            if catalog is None:
+                # Only the server's tools are cached; local tools differ per bridge
+                mcp_tools = await self.mcp_client.get_available_tools()
+                catalog = tool_catalog_cache.put(server_key, extract_tools_list(mcp_tools))
+                logger.debug("Cached tool catalogue %s with %d tools",
+                             catalog.digest, len(catalog.tools))
+
+            # Local tools shadow MCP tools with the same OpenAI name
+            local_openai_tools, _ = convert_tools_to_openai_format(list(self.local_tools.values()))
+            self.available_tools = [
+                *(tool for tool in catalog.tools
+                  if sanitize_tool_name(getattr(tool, 'name', '')) not in self.local_tools),
+                *self.local_tools.values(),
+            ]
+            self.tool_name_mapping.update(
+                (openai_name, mcp_name)
+                for openai_name, mcp_name in catalog.tool_name_mapping.items()
+                if openai_name not in self.local_tools
+            )
+            self.llm_client.tools = [
+                *(tool for tool in catalog.openai_tools
+                  if tool["function"]["name"] not in self.local_tools),
+                *local_openai_tools,
+            ]
             
             return True
         except Exception as e:
@@ -85,62 +125,13 @@ When querying the database:
 
     def _convert_mcp_tools_to_openai_format(self, mcp_tools: List[Any]) -> List[Dict[str, Any]]:
         """Convert MCP tool format to OpenAI tool format"""
-        openai_tools = []
-        
-        logger.debug(f"Input mcp_tools type: {type(mcp_tools)}")
-        logger.debug(f"Input mcp_tools: {mcp_tools}")
-        
-        # Extract tools from the response
-        if hasattr(mcp_tools, 'tools'):
-            tools_list = mcp_tools.tools
-            logger.debug("Found ListToolsResult, extracting tools attribute")
-        elif isinstance(mcp_tools, dict):
-            tools_list = mcp_tools.get('tools', [])
-            logger.debug("Found dict, extracting 'tools' key")
-        else:
-            tools_list = mcp_tools
-            logger.debug("Using mcp_tools directly as list")
-            
-        logger.debug(f"Tools list type: {type(tools_list)}")
-        logger.debug(f"Tools list: {tools_list}")
-        
-        # Process each tool in the list
-        if isinstance(tools_list, list):
-            logger.debug(f"Processing {len(tools_list)} tools")
-            for tool in tools_list:
-                logger.debug(f"Processing tool: {tool}, type: {type(tool)}")
-                if hasattr(tool, 'name') and hasattr(tool, 'description'):
-                    openai_name = self._sanitize_tool_name(tool.name)
-                    self.tool_name_mapping[openai_name] = tool.name
-                    logger.debug(f"Tool has required attributes. Name: {tool.name}")
-                    
-                    tool_schema = getattr(tool, 'inputSchema', {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    })
-                    
-                    openai_tool = {
-                        "type": "function",
-                        "function": {
-                            "name": openai_name,
-                            "description": tool.description,
-                            "parameters": tool_schema
-                        }
-                    }
-                    openai_tools.append(openai_tool)
-                    logger.debug(f"Converted tool {tool.name} to OpenAI format")
-                else:
-                    logger.debug(f"Tool missing required attributes: has name = {hasattr(tool, 'name')}, has description = {hasattr(tool, 'description')}")
-        else:
-            logger.debug(f"Tools list is not a list, it's a {type(tools_list)}")
-        
+        openai_tools, tool_name_mapping = convert_tools_to_openai_format(mcp_tools)
+        self.tool_name_mapping.update(tool_name_mapping)
         return openai_tools
 
     def _sanitize_tool_name(self, name: str) -> str:
         """Sanitize tool name for OpenAI compatibility"""
-        # Replace any characters that might cause issues
-        return name.replace("-", "_").replace(" ", "_").lower()
+        return sanitize_tool_name(name)
 
     async def process_message(self, message: str) -> str:
         """Process a user message through the bridge"""
@@ -168,56 +159,124 @@ When querying the database:
             logger.error(f"Error processing message: {str(e)}", exc_info=True)
             return f"Error processing message: {str(e)}"
 
+    async def process_message_stream(self, message: str) -> AsyncIterator[str]:
+        """Process a user message through the bridge, yielding content deltas as they arrive"""
+        try:
+            logger.debug(f"Streaming message to LLM: {message}")
+            stream = self.llm_client.invoke_stream_with_prompt(message)
+
+            while True:
+                async for delta in stream:
+                    yield delta
+
+                response = stream.response
+                logger.debug(f"Streamed LLM response: {response.get_message()}")
+                if not response.is_tool_call or not response.tool_calls:
+                    break
+
+                logger.debug(f"Tool calls detected: {response.tool_calls}")
+                tool_responses = await self._handle_tool_calls(response.tool_calls)
+                logger.debug(f"Tool responses: {tool_responses}")
+
+                # Resume streaming with the tool results
+                stream = self.llm_client.invoke_stream(tool_responses)
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}", exc_info=True)
+            yield f"Error processing message: {str(e)}"
+
     async def _handle_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Handle tool calls through MCP"""
-        tool_responses = []
+        """Handle tool calls, local or through MCP, running them concurrently.
+
+        Results are returned in the order of ``tool_calls``; a failing call
+        produces an ``"Error: ..."`` output without affecting the others.
+        """
+        return list(await asyncio.gather(
+            *(self._handle_tool_call(tool_call) for tool_call in tool_calls)
+        ))
+
+    async def _handle_tool_call(self, tool_call: Any) -> Dict[str, Any]:
+        """Execute a single tool call, bounded by the bridge's concurrency cap and timeout"""
+        started = None
+        error = True
+        try:
+            async with self._tool_semaphore:
+                # Latency excludes the wait for a free slot
+                started = time.perf_counter()
+                output = await asyncio.wait_for(
+                    self._execute_tool_call(tool_call),
+                    timeout=self.config.tool_call_timeout
+                )
+            error = False
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Tool call {tool_call.id} timed out after {self.config.tool_call_timeout}s"
+            )
+            output = f"Error: Tool call timed out after {self.config.tool_call_timeout}s"
+        except Exception as e:
+            logger.error(f"Tool execution failed: {str(e)}", exc_info=True)
+            output = f"Error: {str(e)}"
+        finally:
+            if started is not None:
+                self._record_latency(tool_call.function.name, time.perf_counter() - started, error)
+
+        return {
+            "tool_call_id": tool_call.id,
+            "output": output
+        }
+
+    def _record_latency(self, openai_name: str, seconds: float, error: bool):
+        # Only known tools are counted, so made-up names cannot grow the table
+        if openai_name in self.local_tools or openai_name in self.tool_name_mapping:
+            self.tool_latency.setdefault(openai_name, ToolLatency()).record(seconds, error)
+
+    def get_tool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool call counts and latencies, with the route each tool takes"""
+        return {
+            name: {"route": "local" if name in self.local_tools else "mcp", **latency.as_dict()}
+            for name, latency in self.tool_latency.items()
+        }
+
+    def _resolve_tool(self, openai_name: str) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """Look up how to run a tool: in-process for local tools, otherwise through MCP"""
+        local_tool = self.local_tools.get(openai_name)
+        if local_tool is not None:
+            return local_tool.handler
+
+        # Get original MCP tool name
+        mcp_name = self.tool_name_mapping.get(openai_name)
+        if not mcp_name:
+            raise ValueError(f"Unknown tool: {openai_name}")
+        return functools.partial(self.mcp_client.call_tool, mcp_name)
+
+    async def _execute_tool_call(self, tool_call: Any) -> str:
+        """Execute a tool call, locally or through MCP, and format its output"""
+        logger.debug(f"Processing tool call: {tool_call}")
+        call = self._resolve_tool(tool_call.function.name)
         
-        for tool_call in tool_calls:
-            try:
-                logger.debug(f"Processing tool call: {tool_call}")
-                # Get original MCP tool name
-                openai_name = tool_call.function.name
-                mcp_name = self.tool_name_mapping.get(openai_name)
-                
-                if not mcp_name:
-                    raise ValueError(f"Unknown tool: {openai_name}")
-                
-                # Parse arguments
-                arguments = json.loads(tool_call.function.arguments)
-                logger.debug(f"Tool arguments: {arguments}")
-                
-                # Execute through MCP
-                result = await self.mcp_client.call_tool(mcp_name, arguments)
-                logger.debug(f"Raw MCP result: {result}")
-                
-                # Format response - handle both string and structured results
-                if isinstance(result, str):
-                    output = result
-                elif hasattr(result, 'content') and isinstance(result.content, list):
-                    # Handle MCP CallToolResult format
-                    output = " ".join(
-                        content.text for content in result.content 
-                        if hasattr(content, 'text')
-                    )
-                else:
-                    output = str(result)  # Use str() instead of json.dumps()
-                
-                logger.debug(f"Formatted output: {output}")
-                
-                # Format response
-                tool_responses.append({
-                    "tool_call_id": tool_call.id,
-                    "output": output
-                })
-                
-            except Exception as e:
-                logger.error(f"Tool execution failed: {str(e)}", exc_info=True)
-                tool_responses.append({
-                    "tool_call_id": tool_call.id,
-                    "output": f"Error: {str(e)}"
-                })
+        # Parse arguments
+        arguments = json.loads(tool_call.function.arguments)
+        logger.debug(f"Tool arguments: {arguments}")
+        
+        result = await call(arguments)
+        logger.debug(f"Raw tool result: {result}")
+        
+        # Format response - handle string, structured and local tool results
+        if isinstance(result, str):
+            output = result
+        elif hasattr(result, 'content') and isinstance(result.content, list):
+            # Handle MCP CallToolResult format
+            output = " ".join(
+                content.text for content in result.content 
+                if hasattr(content, 'text')
+            )
+        elif isinstance(result, (dict, list)):
+            # Local tools return plain Python objects; give the model JSON
+            output = json.dumps(result, ensure_ascii=False, default=str)
+        else:
+            output = str(result)
         
-        return tool_responses
+        logger.debug(f"Formatted output: {output}")
+        return output
 
     async def close(self):
         """Clean up resources"""
@@ -226,13 +285,14 @@ When querying the database:
 class BridgeManager:
     """Manager class for handling the bridge lifecycle"""
     
-    def __init__(self, config: BridgeConfig):
+    def __init__(self, config: BridgeConfig, session_pool: Optional[MCPSessionPool] = None):
         self.config = config
+        self.session_pool = session_pool
         self.bridge: Optional[MCPLLMBridge] = None
 
     async def __aenter__(self) -> MCPLLMBridge:
         """Context manager entry"""
-        self.bridge = MCPLLMBridge(self.config)
+        self.bridge = MCPLLMBridge(self.config, session_pool=self.session_pool)
         await self.bridge.initialize()
         return self.bridge
         
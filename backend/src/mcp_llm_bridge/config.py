@@ -1,6 +1,6 @@
 # src/mcp_llm_bridge/config.py
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 from mcp import StdioServerParameters
 
 @dataclass
@@ -11,10 +11,30 @@ class LLMConfig:
     base_url: Optional[str] = None
     temperature: float = 0.7
     max_tokens: int = 2000
+    # HTTP transport settings, shared by every client with the same values
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 120.0
+    # Conversation history limits, None to disable
+    context_token_budget: Optional[int] = 16000
+    max_tool_output_chars: Optional[int] = 8000
 
 @dataclass
 class BridgeConfig:
     """Configuration for the MCP-LLM Bridge"""
     mcp_server_params: StdioServerParameters
     llm_config: LLMConfig
-    system_prompt: Optional[str] = None
\ No newline at end of file
+    system_prompt: Optional[str] = None
+    max_concurrent_tool_calls: int = 4
+    tool_call_timeout: Optional[float] = 60.0  # Seconds per tool call, None to disable
+
+def server_params_key(server_params: StdioServerParameters) -> Tuple:
+    """Hashable identity of an MCP server's launch parameters"""
+    return (
+        server_params.command,
+        tuple(server_params.args),
+        tuple(sorted((server_params.env or {}).items())),
+        str(getattr(server_params, "cwd", None)),
+    )
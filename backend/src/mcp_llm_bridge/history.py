@@ -0,0 +1,192 @@
+# src/mcp_llm_bridge/history.py
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import colorlog
+
+handler = colorlog.StreamHandler()
+handler.setFormatter(colorlog.ColoredFormatter(
+    "%(log_color)s%(levelname)s%(reset)s:     %(cyan)s%(name)s%(reset)s - %(message)s",
+    datefmt=None,
+    reset=True,
+    log_colors={
+        'DEBUG': 'cyan',
+        'INFO': 'green',
+        'WARNING': 'yellow',
+        'ERROR': 'red',
+        'CRITICAL': 'red,bg_white',
+    },
+    secondary_log_colors={},
+    style='%'
+))
+
+logger = colorlog.getLogger(__name__)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: ~4 ASCII characters per token, one token per other character (CJK)"""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+def message_size(message: Dict[str, Any]) -> Tuple[int, int]:
+    """Return the (bytes, estimated tokens) a message adds to a request"""
+    text = json.dumps(message, ensure_ascii=False, default=_json_default)
+    return len(text.encode("utf-8")), estimate_tokens(text)
+
+@dataclass
+class RequestMetrics:
+    """Size of a single request sent to the LLM"""
+    messages: int
+    bytes: int
+    estimated_tokens: int
+    dropped_messages: int
+
+class HistoryManager:
+    """Keeps the conversation sent to the LLM within a token budget.
+
+    Messages are grouped into units that must stay together: an assistant
+    message that requested tools is kept with all of its tool results. When
+    the budget is exceeded the oldest units are dropped, but the latest user
+    message and everything after it are always kept.
+
+    Messages passed to ``add`` are measured once and kept in a running total,
+    so checking a conversation that fits the budget costs nothing per turn.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None,
+                 max_tool_output_chars: Optional[int] = None):
+        self.token_budget = token_budget
+        self.max_tool_output_chars = max_tool_output_chars
+        self.last_request: Optional[RequestMetrics] = None
+        self.total_requests = 0
+        self.total_bytes = 0
+        self.total_estimated_tokens = 0
+        # id(message) -> (message, bytes, tokens); the message is kept so its id cannot be reused
+        self._sizes: Dict[int, Tuple[Dict[str, Any], int, int]] = {}
+        self.history_bytes = 0
+        self.history_tokens = 0
+        self._system_size: Tuple[Optional[str], Tuple[int, int]] = (None, (0, 0))
+
+    def add(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Measure a message as it joins the conversation and return it"""
+        size_bytes, tokens = message_size(message)
+        self._sizes[id(message)] = (message, size_bytes, tokens)
+        self.history_bytes += size_bytes
+        self.history_tokens += tokens
+        return message
+
+    def forget(self, message: Dict[str, Any]):
+        """Remove a message dropped from the conversation from the running total"""
+        entry = self._sizes.get(id(message))
+        if entry is not None and entry[0] is message:
+            del self._sizes[id(message)]
+            self.history_bytes -= entry[1]
+            self.history_tokens -= entry[2]
+
+    def size(self, message: Dict[str, Any]) -> Tuple[int, int]:
+        """The (bytes, estimated tokens) of a message, measured once for added messages"""
+        entry = self._sizes.get(id(message))
+        if entry is not None and entry[0] is message:
+            return entry[1], entry[2]
+        return message_size(message)
+
+    def _system_prompt_size(self, system_prompt: Optional[str]) -> Tuple[int, int]:
+        if not system_prompt:
+            return 0, 0
+        prompt, size = self._system_size
+        if prompt != system_prompt:
+            size = message_size({"role": "system", "content": system_prompt})
+            self._system_size = (system_prompt, size)
+        return size
+
+    def _all_added(self, messages: List[Dict[str, Any]]) -> bool:
+        """Whether the running total covers exactly these messages"""
+        if len(messages) != len(self._sizes):
+            return False
+        # Every message is added once, so matching counts and a matching newest message suffice
+        return not messages or self._sizes.get(id(messages[-1]), (None,))[0] is messages[-1]
+
+    def cap_tool_output(self, output: str) -> str:
+        """Truncate a tool output to the configured maximum size"""
+        if self.max_tool_output_chars is None or len(output) <= self.max_tool_output_chars:
+            return output
+        omitted = len(output) - self.max_tool_output_chars
+        return f"{output[:self.max_tool_output_chars]}\n...[truncated {omitted} characters]"
+
+    def _group_units(self, messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Split messages into units that cannot be separated"""
+        units: List[List[Dict[str, Any]]] = []
+        for message in messages:
+            if message.get("role") == "tool" and units:
+                units[-1].append(message)
+            else:
+                units.append([message])
+        return units
+
+    def compact(self, system_prompt: Optional[str],
+                messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the most recent messages that fit in the token budget"""
+        if self.token_budget is None:
+            return messages
+
+        system_tokens = self._system_prompt_size(system_prompt)[1]
+        if self._all_added(messages) and system_tokens + self.history_tokens <= self.token_budget:
+            return messages
+        units = self._group_units(messages)
+
+        # Everything from the latest user message on is always sent
+        last_user = max(
+            (i for i, unit in enumerate(units) if unit[0].get("role") == "user"),
+            default=len(units) - 1
+        )
+        kept = units[last_user:]
+        used = system_tokens + sum(self.size(m)[1] for unit in kept for m in unit)
+
+        for unit in reversed(units[:last_user]):
+            unit_tokens = sum(self.size(m)[1] for m in unit)
+            if used + unit_tokens > self.token_budget:
+                break
+            kept.insert(0, unit)
+            used += unit_tokens
+
+        compacted = [message for unit in kept for message in unit]
+        dropped = len(messages) - len(compacted)
+        if dropped:
+            logger.debug(
+                f"Dropped {dropped} old messages to stay within {self.token_budget} tokens"
+            )
+        return compacted
+
+    def record(self, prepared_messages: List[Dict[str, Any]],
+               dropped_messages: int = 0) -> RequestMetrics:
+        """Record the size of a request about to be sent"""
+        size_bytes = 0
+        tokens = 0
+        for message in prepared_messages:
+            if message.get("role") == "system" and message.get("content") == self._system_size[0]:
+                message_bytes, message_tokens = self._system_size[1]
+            else:
+                message_bytes, message_tokens = self.size(message)
+            size_bytes += message_bytes
+            tokens += message_tokens
+
+        metrics = RequestMetrics(
+            messages=len(prepared_messages),
+            bytes=size_bytes,
+            estimated_tokens=tokens,
+            dropped_messages=dropped_messages
+        )
+        self.last_request = metrics
+        self.total_requests += 1
+        self.total_bytes += size_bytes
+        self.total_estimated_tokens += tokens
+        logger.debug(f"LLM request: {metrics}")
+        return metrics
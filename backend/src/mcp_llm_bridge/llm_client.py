@@ -1,7 +1,14 @@
 # src/mcp_llm_bridge/llm_client.py
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, AsyncIterator, Optional, Tuple
+from types import SimpleNamespace
+import asyncio
+import weakref
+import httpx
 import openai
+from openai.types.chat import ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
 from mcp_llm_bridge.config import LLMConfig
+from mcp_llm_bridge.history import HistoryManager
 import logging
 import colorlog
 
@@ -51,21 +58,153 @@ class LLMResponse:
             "tool_calls": self.tool_calls
         }
 
+    @classmethod
+    def from_stream(cls, content: str, tool_calls: List[ChatCompletionMessageToolCall],
+                    finish_reason: Optional[str]) -> "LLMResponse":
+        """Build a response from the pieces accumulated over a streamed completion"""
+        if tool_calls and finish_reason in (None, "stop"):
+            # Some OpenAI-compatible servers end a tool-calling stream with "stop"
+            finish_reason = "tool_calls"
+        message = SimpleNamespace(content=content or None, tool_calls=tool_calls or None)
+        choice = SimpleNamespace(message=message, finish_reason=finish_reason)
+        return cls(SimpleNamespace(choices=[choice]))
+
+class LLMStream:
+    """Async iterator over the content deltas of a streamed completion.
+
+    Tool call fragments are accumulated by their index as they arrive. Once
+    iteration finishes, ``response`` holds the complete LLMResponse and the
+    assistant message has been appended to the client's history.
+    """
+    def __init__(self, client: "LLMClient"):
+        self.client = client
+        self.response: Optional[LLMResponse] = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        stream = await self.client.client.chat.completions.create(
+            **self.client._completion_kwargs(),
+            stream=True
+        )
+        content_parts: List[str] = []
+        tool_call_parts: Dict[int, Dict[str, str]] = {}
+        finish_reason = None
+
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if delta is not None:
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield delta.content
+                for fragment in delta.tool_calls or []:
+                    parts = tool_call_parts.setdefault(
+                        fragment.index, {"id": "", "name": "", "arguments": ""}
+                    )
+                    if fragment.id:
+                        parts["id"] = fragment.id
+                    if fragment.function is not None:
+                        parts["name"] += fragment.function.name or ""
+                        parts["arguments"] += fragment.function.arguments or ""
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+
+        tool_calls = [
+            ChatCompletionMessageToolCall(
+                id=parts["id"],
+                type="function",
+                function=Function(name=parts["name"], arguments=parts["arguments"] or "{}")
+            )
+            for _, parts in sorted(tool_call_parts.items())
+        ]
+        self.response = LLMResponse.from_stream("".join(content_parts), tool_calls, finish_reason)
+        self.client.add_message(self.response.get_message())
+
+# One pooled HTTP client per event loop and transport settings. httpx connection
+# pools are bound to the loop they were first used on, so they cannot be shared
+# across loops (e.g. separate asyncio.run() calls).
+_http_clients: (
+    "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, httpx.AsyncClient]]"
+) = (
+    weakref.WeakKeyDictionary()
+)
+
+def _transport_key(config: LLMConfig) -> Tuple:
+    return (
+        config.max_connections,
+        config.max_keepalive_connections,
+        config.keepalive_expiry,
+        config.connect_timeout,
+        config.read_timeout,
+    )
+
+def get_shared_http_client(config: LLMConfig) -> httpx.AsyncClient:
+    """Get the pooled HTTP client for the running loop and the config's transport settings"""
+    loop = asyncio.get_running_loop()
+    clients = _http_clients.setdefault(loop, {})
+    key = _transport_key(config)
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        client = openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+        )
+        clients[key] = client
+        logger.debug(f"Created pooled HTTP client for transport settings {key}")
+    return client
+
+async def close_shared_http_clients():
+    """Close the pooled HTTP clients owned by the running loop"""
+    clients = _http_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
 class LLMClient:
     """Client for interacting with OpenAI-compatible LLMs"""
     
     def __init__(self, config: LLMConfig):
         self.config = config
-        self.client = openai.OpenAI(
-            api_key=config.api_key,
-            base_url=config.base_url
-        )
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
         self.tools = []
         self.messages = []
         self.system_prompt = None
+        self.history = HistoryManager(config.context_token_budget, config.max_tool_output_chars)
     
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """Async OpenAI client backed by the shared connection pool of the running loop"""
+        http_client = get_shared_http_client(self.config)
+        if self._client is None or self._http_client is not http_client:
+            self._http_client = http_client
+            self._client = openai.AsyncOpenAI(
+                api_key=self.config.api_key,
+                base_url=self.config.base_url,
+                http_client=http_client
+            )
+        return self._client
+
+    def add_message(self, message: Dict[str, Any]):
+        """Append a message to the conversation, measuring it once for the token budget"""
+        self.messages.append(self.history.add(message))
+
     def _prepare_messages(self) -> List[Dict[str, Any]]:
-        """Prepare messages for API call"""
+        """Prepare messages for API call, compacting history to the token budget"""
+        compacted = self.history.compact(self.system_prompt, self.messages)
+        dropped = len(self.messages) - len(compacted)
+        if dropped:
+            # Dropped turns only get further from the budget, so forget them for good
+            kept = {id(message) for message in compacted}
+            for message in self.messages:
+                if id(message) not in kept:
+                    self.history.forget(message)
+            self.messages[:] = compacted
+
         formatted_messages = []
         
         if self.system_prompt:
@@ -75,36 +214,60 @@ class LLMClient:
             })
             
         formatted_messages.extend(self.messages)
+        self.history.record(formatted_messages, dropped)
         return formatted_messages
     
     async def invoke_with_prompt(self, prompt: str) -> LLMResponse:
         """Send a single prompt to the LLM"""
-        self.messages.append({
+        self.add_message({
             "role": "user",
             "content": prompt
         })
         
         return await self.invoke([])
     
-    async def invoke(self, tool_results: Optional[List[Dict[str, Any]]] = None) -> LLMResponse:
-        """Invoke the LLM with optional tool results"""
+    def _append_tool_results(self, tool_results: Optional[List[Dict[str, Any]]]):
+        """Append tool results to the conversation history"""
         if tool_results:
             for result in tool_results:
-                self.messages.append({
+                self.add_message({
                     "role": "tool",
-                    "content": str(result.get("output", "")),  # Convert to string and provide default
+                    # Convert to string and provide default
+                    "content": self.history.cap_tool_output(str(result.get("output", ""))),
                     "tool_call_id": result["tool_call_id"]
                 })
+
+    def _completion_kwargs(self) -> Dict[str, Any]:
+        """Arguments shared by streamed and non-streamed completion requests"""
+        return {
+            "model": self.config.model,
+            "messages": self._prepare_messages(),
+            "tools": self.tools if self.tools else None,
+            "temperature": self.config.temperature,
+            "max_tokens": self.config.max_tokens
+        }
+
+    def invoke_stream_with_prompt(self, prompt: str) -> LLMStream:
+        """Stream the response to a single prompt"""
+        self.add_message({
+            "role": "user",
+            "content": prompt
+        })
+
+        return self.invoke_stream([])
+
+    def invoke_stream(self, tool_results: Optional[List[Dict[str, Any]]] = None) -> LLMStream:
+        """Stream the LLM response with optional tool results"""
+        self._append_tool_results(tool_results)
+        return LLMStream(self)
+
+    async def invoke(self, tool_results: Optional[List[Dict[str, Any]]] = None) -> LLMResponse:
+        """Invoke the LLM with optional tool results"""
+        self._append_tool_results(tool_results)
         
-        completion = self.client.chat.completions.create(
-            model=self.config.model,
-            messages=self._prepare_messages(),
-            tools=self.tools if self.tools else None,
-            temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens
-        )
+        completion = await self.client.chat.completions.create(**self._completion_kwargs())
         
         response = LLMResponse(completion)
-        self.messages.append(response.get_message())
+        self.add_message(response.get_message())
         
         return response
\ No newline at end of file
@@ -1,9 +1,12 @@
 # src/mcp_llm_bridge/mcp_client.py
 import logging
-from typing import Any, List
+from typing import Any, List, Optional
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 import colorlog
+from mcp_llm_bridge.config import server_params_key
+from mcp_llm_bridge.session_pool import MCPSessionPool, PooledSession
+from mcp_llm_bridge.tool_catalog import tools_changed_handler
 
 handler = colorlog.StreamHandler()
 handler.setFormatter(colorlog.ColoredFormatter(
@@ -28,10 +31,12 @@ logger.setLevel(logging.INFO)
 class MCPClient:
     """Client for interacting with MCP servers"""
     
-    def __init__(self, server_params: StdioServerParameters):
+    def __init__(self, server_params: StdioServerParameters, pool: Optional[MCPSessionPool] = None):
         self.server_params = server_params
+        self.pool = pool
         self.session = None
         self._client = None
+        self._lease: Optional[PooledSession] = None
         
     async def __aenter__(self):
         """Async context manager entry"""
@@ -40,6 +45,12 @@ class MCPClient:
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
+        if self._lease:
+            # Pooled sessions outlive the client, so only hand them back
+            self.pool.release(self._lease)
+            self._lease = None
+            self.session = None
+            return
         if self.session:
             await self.session.__aexit__(exc_type, exc_val, exc_tb)
         if self._client:
@@ -47,10 +58,20 @@ class MCPClient:
 
     async def connect(self):
         """Establishes connection to MCP server"""
+        if self.pool is not None:
+            logger.debug("Leasing MCP session from pool...")
+            self._lease = await self.pool.acquire()
+            self.session = self._lease.session
+            return
+
         logger.debug("Connecting to MCP server...")
         self._client = stdio_client(self.server_params)
         self.read, self.write = await self._client.__aenter__()
-        session = ClientSession(self.read, self.write)
+        session = ClientSession(
+            self.read,
+            self.write,
+            message_handler=tools_changed_handler(server_params_key(self.server_params))
+        )
         self.session = await session.__aenter__()
         await self.session.initialize()
         logger.debug("Connected to MCP server successfully")
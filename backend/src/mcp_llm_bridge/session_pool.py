@@ -0,0 +1,211 @@
+# src/mcp_llm_bridge/session_pool.py
+import asyncio
+import logging
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import colorlog
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from mcp_llm_bridge.config import server_params_key
+from mcp_llm_bridge.tool_catalog import tools_changed_handler
+
+handler = colorlog.StreamHandler()
+handler.setFormatter(colorlog.ColoredFormatter(
+    "%(log_color)s%(levelname)s%(reset)s:     %(cyan)s%(name)s%(reset)s - %(message)s",
+    datefmt=None,
+    reset=True,
+    log_colors={
+        'DEBUG': 'cyan',
+        'INFO': 'green',
+        'WARNING': 'yellow',
+        'ERROR': 'red',
+        'CRITICAL': 'red,bg_white',
+    },
+    secondary_log_colors={},
+    style='%'
+))
+
+logger = colorlog.getLogger(__name__)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+class PooledSession:
+    """A warm MCP server process and its initialized session.
+
+    The stdio transport and session are entered and exited inside one
+    background task, as anyio requires, so the session can be leased to
+    any number of bridges in turn on the same event loop.
+    """
+
+    def __init__(self, server_params: StdioServerParameters):
+        self.server_params = server_params
+        self.session: Optional[ClientSession] = None
+        self.last_used = time.monotonic()
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def start(self):
+        """Spawn the server process and wait for the MCP handshake to finish"""
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self):
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                message_handler = tools_changed_handler(server_params_key(self.server_params))
+                async with ClientSession(read, write, message_handler=message_handler) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            logger.error(f"MCP server session ended with error: {str(e)}")
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def ping(self, timeout: float) -> bool:
+        """Check that the server still answers"""
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP server ping failed: {str(e)}")
+            return False
+
+    async def close(self):
+        """Stop the session and its server process"""
+        self._stop.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+class MCPSessionPool:
+    """Pool of warm MCP server sessions for one set of server parameters.
+
+    Sessions are leased to one client at a time. Sessions idle for longer
+    than ``health_check_interval`` are pinged before being leased, and dead
+    ones are replaced with a freshly started server.
+    """
+
+    def __init__(self, server_params: StdioServerParameters, size: int = 2,
+                 health_check_interval: float = 30.0, ping_timeout: float = 5.0):
+        self.server_params = server_params
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self._idle: "asyncio.Queue[PooledSession]" = asyncio.Queue()
+        self._sessions: List[PooledSession] = []
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._closed = False
+
+    async def start(self):
+        """Start all server processes of the pool"""
+        async with self._start_lock:
+            if self._started:
+                return
+            results = await asyncio.gather(
+                *(self._spawn() for _ in range(self.size)), return_exceptions=True
+            )
+            sessions = [result for result in results if isinstance(result, PooledSession)]
+            if len(sessions) < len(results):
+                # Stop the servers that did start so a failed start leaks no processes
+                await asyncio.gather(*(session.close() for session in sessions))
+                for session in sessions:
+                    self._sessions.remove(session)
+                raise next(result for result in results if isinstance(result, BaseException))
+            for session in sessions:
+                self._idle.put_nowait(session)
+            self._started = True
+            logger.info(f"Started MCP session pool with {self.size} sessions "
+                        f"for '{self.server_params.command}'")
+
+    async def _spawn(self) -> PooledSession:
+        session = PooledSession(self.server_params)
+        await session.start()
+        self._sessions.append(session)
+        return session
+
+    async def _replace(self, session: PooledSession) -> PooledSession:
+        logger.warning("Restarting unhealthy MCP server session")
+        if session in self._sessions:
+            self._sessions.remove(session)
+        await session.close()
+        return await self._spawn()
+
+    async def acquire(self) -> PooledSession:
+        """Lease a healthy session, waiting if all sessions are in use"""
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed")
+        await self.start()
+        session = await self._idle.get()
+        try:
+            idle_for = time.monotonic() - session.last_used
+            if not session.alive or (
+                idle_for > self.health_check_interval and not await session.ping(self.ping_timeout)
+            ):
+                session = await self._replace(session)
+        except BaseException:
+            # Keep the pool at full size even if the restart failed
+            self._idle.put_nowait(session)
+            raise
+        return session
+
+    def release(self, session: PooledSession):
+        """Return a leased session to the pool"""
+        session.last_used = time.monotonic()
+        if self._closed:
+            asyncio.ensure_future(session.close())
+        else:
+            self._idle.put_nowait(session)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[PooledSession]:
+        """Lease a session for the duration of the context"""
+        session = await self.acquire()
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    async def close(self):
+        """Stop every server process of the pool"""
+        self._closed = True
+        await asyncio.gather(*(session.close() for session in self._sessions))
+        self._sessions.clear()
+
+# Pools are bound to the event loop their sessions run on
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, MCPSessionPool]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def get_session_pool(server_params: StdioServerParameters, size: int = 2,
+                     **kwargs: Any) -> MCPSessionPool:
+    """Get the shared session pool for the running loop and the given server parameters"""
+    pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    key = server_params_key(server_params)
+    pool = pools.get(key)
+    if pool is None or pool._closed:
+        pool = MCPSessionPool(server_params, size=size, **kwargs)
+        pools[key] = pool
+    return pool
+
+async def close_session_pools():
+    """Close every session pool owned by the running loop"""
+    pools = _pools.pop(asyncio.get_running_loop(), {})
+    await asyncio.gather(*(pool.close() for pool in pools.values()))
@@ -0,0 +1,156 @@
+# src/mcp_llm_bridge/tool_catalog.py
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import colorlog
+import mcp.types as types
+
+handler = colorlog.StreamHandler()
+handler.setFormatter(colorlog.ColoredFormatter(
+    "%(log_color)s%(levelname)s%(reset)s:     %(cyan)s%(name)s%(reset)s - %(message)s",
+    datefmt=None,
+    reset=True,
+    log_colors={
+        'DEBUG': 'cyan',
+        'INFO': 'green',
+        'WARNING': 'yellow',
+        'ERROR': 'red',
+        'CRITICAL': 'red,bg_white',
+    },
+    secondary_log_colors={},
+    style='%'
+))
+
+logger = colorlog.getLogger(__name__)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+DEFAULT_INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {},
+    "required": []
+}
+
+def sanitize_tool_name(name: str) -> str:
+    """Sanitize tool name for OpenAI compatibility"""
+    # Replace any characters that might cause issues
+    return name.replace("-", "_").replace(" ", "_").lower()
+
+def extract_tools_list(mcp_tools: Any) -> List[Any]:
+    """Extract the list of tools from a ListToolsResult, dict or plain list"""
+    if hasattr(mcp_tools, 'tools'):
+        return mcp_tools.tools
+    if isinstance(mcp_tools, dict):
+        return mcp_tools.get('tools', [])
+    return mcp_tools
+
+def convert_tools_to_openai_format(mcp_tools: Any) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """Convert MCP tools to OpenAI tool format.
+
+    Returns the OpenAI tool definitions and the mapping from OpenAI tool
+    names to MCP tool names.
+    """
+    openai_tools = []
+    tool_name_mapping = {}
+
+    tools_list = extract_tools_list(mcp_tools)
+    if not isinstance(tools_list, list):
+        logger.debug("Tools list is not a list, it's a %s", type(tools_list))
+        return openai_tools, tool_name_mapping
+
+    for tool in tools_list:
+        if not (hasattr(tool, 'name') and hasattr(tool, 'description')):
+            logger.debug("Skipping tool without name or description: %s", type(tool))
+            continue
+
+        openai_name = sanitize_tool_name(tool.name)
+        tool_name_mapping[openai_name] = tool.name
+        openai_tools.append({
+            "type": "function",
+            "function": {
+                "name": openai_name,
+                "description": tool.description,
+                "parameters": getattr(tool, 'inputSchema', DEFAULT_INPUT_SCHEMA)
+            }
+        })
+
+    logger.debug("Converted %d tools to OpenAI format", len(openai_tools))
+    return openai_tools, tool_name_mapping
+
+def tools_digest(tools: List[Any]) -> str:
+    """Stable hash of the names, descriptions and schemas of a tools list"""
+    described = [
+        {
+            "name": getattr(tool, 'name', None),
+            "description": getattr(tool, 'description', None),
+            "inputSchema": getattr(tool, 'inputSchema', None),
+        }
+        for tool in tools
+    ]
+    encoded = json.dumps(described, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+@dataclass(frozen=True)
+class ToolCatalog:
+    """Tools of a server together with their precomputed OpenAI schemas"""
+    tools: List[Any]
+    openai_tools: List[Dict[str, Any]]
+    tool_name_mapping: Dict[str, str]
+    digest: str
+
+class ToolCatalogCache:
+    """Process-wide cache of tool catalogues.
+
+    Catalogues are looked up by server identity, so only the first bridge
+    for a server lists and converts its tools. Servers exposing identical
+    tools share one catalogue through the tools-list digest.
+    """
+
+    def __init__(self):
+        self._by_server: Dict[Any, ToolCatalog] = {}
+        self._by_digest: Dict[str, ToolCatalog] = {}
+        self._lock = threading.Lock()
+
+    def get(self, server_key: Any) -> Optional[ToolCatalog]:
+        return self._by_server.get(server_key)
+
+    def put(self, server_key: Any, tools: List[Any]) -> ToolCatalog:
+        """Convert and store the catalogue of a server"""
+        digest = tools_digest(tools)
+        with self._lock:
+            catalog = self._by_digest.get(digest)
+            if catalog is None:
+                openai_tools, tool_name_mapping = convert_tools_to_openai_format(tools)
+                catalog = ToolCatalog(list(tools), openai_tools, tool_name_mapping, digest)
+                self._by_digest[digest] = catalog
+            self._by_server[server_key] = catalog
+        return catalog
+
+    def invalidate(self, server_key: Any):
+        """Forget the catalogue of a server, e.g. after a tools/list_changed notification"""
+        with self._lock:
+            catalog = self._by_server.pop(server_key, None)
+            if catalog is not None and catalog not in self._by_server.values():
+                self._by_digest.pop(catalog.digest, None)
+        logger.debug("Invalidated tool catalogue for %s", server_key)
+
+    def clear(self):
+        with self._lock:
+            self._by_server.clear()
+            self._by_digest.clear()
+
+tool_catalog_cache = ToolCatalogCache()
+
+def tools_changed_handler(server_key: Any) -> Callable[[Any], Awaitable[None]]:
+    """MCP message handler invalidating a server's catalogue when its tools change"""
+    async def handle_message(message: Any) -> None:
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            logger.info("Tool list of MCP server changed, invalidating cached catalogue")
+            tool_catalog_cache.invalidate(server_key)
+    return handle_message
@@ -0,0 +1,50 @@
+# src/mcp_llm_bridge/tool_dispatch.py
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict
+
+
+@dataclass(frozen=True)
+class LocalTool:
+    """A Python tool the bridge runs in-process instead of calling over MCP.
+
+    It exposes the same ``name``, ``description`` and ``inputSchema``
+    attributes as MCP tools, so tool catalogues convert both alike.
+    ``handler`` receives the parsed arguments and returns the result object.
+    """
+    name: str
+    description: str
+    inputSchema: Dict[str, Any]
+    handler: Callable[[Dict[str, Any]], Awaitable[Any]] = field(compare=False, repr=False)
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any],
+                  handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> "LocalTool":
+        """Build a local tool from an MCP-format tool specification dict"""
+        return cls(spec["name"], spec["description"], spec["inputSchema"], handler)
+
+@dataclass
+class ToolLatency:
+    """Call count and latency of one tool, errors and timeouts included"""
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, seconds: float, error: bool = False):
+        self.calls += 1
+        self.errors += int(error)
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_seconds": self.mean_seconds,
+            "max_seconds": self.max_seconds,
+            "total_seconds": self.total_seconds,
+        }
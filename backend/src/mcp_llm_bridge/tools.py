@@ -1,7 +1,19 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
+from urllib.request import pathname2url
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import re
 import sqlite3
 import logging
+import threading
+import time
 
 @dataclass
 class DatabaseSchema:
@@ -10,13 +22,294 @@ class DatabaseSchema:
     columns: Dict[str, str]
     description: str
 
+class ReadOnlyConnectionPool:
+    """Per-thread read-only SQLite connections kept open for the pool's lifetime.
+
+    Each thread lazily opens its own ``mode=ro`` connection and reuses it, so
+    the file open, schema parse and page cache warm-up are paid once per
+    thread instead of once per query. Connections keep sqlite3's prepared
+    statement cache, so repeated query text skips the SQL compiler too.
+    """
+
+    def __init__(self, db_path: str, cache_size_kib: int = 16384,
+                 mmap_size: int = 256 * 1024 * 1024, cached_statements: int = 256,
+                 wal: bool = True):
+        self.db_path = os.path.abspath(db_path)
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.logger = logging.getLogger(__name__)
+        self._wal = wal
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _enable_wal(self):
+        """Switch the file to WAL once so readers never block a concurrent writer.
+
+        The journal mode is stored in the database file, which a read-only
+        connection cannot change, so this uses a short-lived writable one.
+        """
+        try:
+            conn = sqlite3.connect(f"file:{pathname2url(self.db_path)}?mode=rw", uri=True)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not enable WAL on {self.db_path}: {e}")
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{pathname2url(self.db_path)}?mode=ro",
+            uri=True,
+            check_same_thread=False,  # only the owning thread queries it; close() may run elsewhere
+            cached_statements=self.cached_statements,
+        )
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        with self._lock:
+            if self._wal:
+                self._enable_wal()
+            conn = self._open()
+            self._wal = False
+            self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close every pooled connection; later calls to connection() reopen lazily"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+    @property
+    def size(self) -> int:
+        return len(self._connections)
+
+def _query_digest(query: str) -> str:
+    return hashlib.blake2b(query.encode("utf-8"), digest_size=6).hexdigest()
+
+def encode_cursor(query: str, offset: int) -> str:
+    """Opaque continuation token for the page of ``query`` starting at ``offset``"""
+    payload = json.dumps({"q": _query_digest(query), "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(query: str, cursor: str) -> int:
+    """Return the row offset stored in ``cursor``, which must come from the same query"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset = int(payload["o"])
+        digest = payload["q"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if digest != _query_digest(query) or offset < 0:
+        raise ValueError("Cursor does not belong to this query")
+    return offset
+
+def _value_size(value: Any) -> int:
+    """Cheap estimate of a value's size once serialised into the tool output"""
+    if isinstance(value, (str, bytes)):
+        return len(value) + 2
+    return 8
+
+def _truncate_value(value: Any, limit: int) -> Any:
+    """Cut a text or BLOB value down to about ``limit`` serialised bytes, marking the cut"""
+    if isinstance(value, str):
+        marker = f"... [truncated, {len(value)} characters in total]"
+        keep = max(0, limit - len(marker) - 2)
+        return value[:keep] + marker if keep + len(marker) < len(value) else value
+    if isinstance(value, bytes):
+        marker = f"[BLOB of {len(value)} bytes, truncated]"
+        return marker if len(marker) < len(value) else value
+    return value
+
+def _truncate_row(row: Tuple[Any, ...], max_bytes: int) -> Tuple[Any, ...]:
+    """Share ``max_bytes`` among a row's values, truncating those over their share"""
+    sizes = [_value_size(value) for value in row]
+    share = max_bytes // max(len(row), 1)
+    oversized = sum(1 for size in sizes if size > share)
+    if not oversized:
+        return row
+    limit = (max_bytes - sum(size for size in sizes if size <= share)) // oversized
+    return tuple(_truncate_value(value, limit) if size > share else value
+                 for value, size in zip(row, sizes))
+
+# "SCAN <table or alias>" steps in EXPLAIN QUERY PLAN output read every row
+_SCAN_STEP = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+# "FROM table [AS] alias" / "JOIN table [AS] alias", to map plan aliases back to tables
+_TABLE_REFERENCE = re.compile(
+    r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)[\"`\]]?(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE
+)
+_NOT_ALIASES = {
+    "where", "join", "on", "using", "left", "right", "full", "inner", "outer", "cross", "natural",
+    "group", "order", "limit", "having", "window", "union", "except", "intersect", "indexed", "not",
+}
+
+# Tokens that do not change what a query touches: numeric and BLOB literals are
+# replaced by "?", comments and runs of whitespace by a single space. Quoted
+# identifiers and single-quoted strings are kept, as SQLite also accepts
+# 'name' as a table or column name, so a string can change what is read.
+_FINGERPRINT_TOKENS = re.compile(
+    r"""(?P<ident>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|'(?:[^']|'')*')"""
+    r"""|(?P<literal>[xX]'[0-9a-fA-F]*'|\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)"""
+    r"""|(?P<space>(?:--[^\n]*|/\*.*?\*/|\s+)+)""",
+    re.DOTALL,
+)
+
+@lru_cache(maxsize=4096)
+def query_fingerprint(query: str) -> str:
+    """Normalised form of ``query`` shared by queries that differ only in numeric
+    literals, whitespace, comments or keyword case (memoised, as the model repeats itself)"""
+    def normalise(match):
+        if match.group("ident"):
+            return match.group("ident")
+        if match.group("literal"):
+            return "?"
+        return " "
+    return _FINGERPRINT_TOKENS.sub(normalise, query).strip().rstrip(";").strip().lower()
+
+class _VerdictCache:
+    """Thread-safe LRU of per-query verdicts: None when the query passed, else the reason"""
+
+    MISSING = object()
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return self.MISSING
+            if self.ttl is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                return self.MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, verdict: Optional[str]):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._entries[key] = (verdict, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Authorizer actions a read-only query may need
+_READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION,
+                 sqlite3.SQLITE_RECURSIVE}
+# Pragmas that only describe the schema
+_READ_ONLY_PRAGMAS = {"table_info", "table_xinfo", "index_list", "index_info", "index_xinfo",
+                      "foreign_key_list"}
+_ACTION_NAMES = {
+    getattr(sqlite3, name): name[len("SQLITE_"):]
+    for name in dir(sqlite3)
+    if name.startswith(("SQLITE_CREATE_", "SQLITE_DROP_"))
+    or name in ("SQLITE_INSERT", "SQLITE_UPDATE", "SQLITE_DELETE", "SQLITE_ALTER_TABLE",
+                "SQLITE_ATTACH", "SQLITE_DETACH", "SQLITE_TRANSACTION", "SQLITE_SAVEPOINT",
+                "SQLITE_REINDEX", "SQLITE_ANALYZE")
+}
+
+class _QueryControl:
+    """Lets the awaiting task stop a query that runs on a worker thread.
+
+    SQLite calls the progress handler every few hundred VM instructions,
+    including while rows are fetched, and aborts the statement once it
+    returns true; ``interrupt()`` stops it straight away on cancellation.
+    """
+
+    def __init__(self, timeout: Optional[float]):
+        self.timeout = timeout
+        self.deadline: Optional[float] = None
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def start(self, conn: sqlite3.Connection):
+        """Called on the worker thread; the time budget starts now, not when queued"""
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+        with self._lock:
+            self._conn = conn
+
+    def finish(self):
+        with self._lock:
+            self._conn = None
+
+    def timed_out(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def should_stop(self) -> int:
+        return 1 if self.cancelled.is_set() or self.timed_out() else 0
+
+    def cancel(self):
+        self.cancelled.set()
+        # Only interrupt while this query owns the connection, never the next one
+        with self._lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
 class DatabaseQueryTool:
-    """Tool for executing database queries with schema validation"""
+    """Tool for executing database queries with schema validation
+
+    Results are streamed with ``fetchmany`` and returned one page at a time
+    in a columnar format, capped at ``max_rows`` rows and roughly
+    ``max_bytes`` bytes, so a broad ``SELECT *`` neither loads the whole
+    table into memory nor floods the model's context. Text and BLOB values
+    of a row too wide for a page on its own are truncated with a marker.
+
+    Queries run on a bounded thread pool so a slow one never blocks the
+    event loop. Each is limited to ``timeout`` seconds of execution, is
+    interrupted when the awaiting task is cancelled, and is rejected up
+    front if its plan would scan a table of more than ``max_scan_rows`` rows.
+    """
+
+    # Seconds a looked-up table size, and a plan checked against it, is trusted
+    TABLE_SIZE_TTL = 60.0
+    # Query texts whose plan check verdict is remembered
+    PLAN_CACHE_SIZE = 256
+    # Query fingerprints whose validation verdict is remembered
+    VALIDATION_CACHE_SIZE = 1024
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pool: Optional[ReadOnlyConnectionPool] = None,
+                 max_rows: int = 100, max_bytes: int = 32 * 1024, fetch_size: int = 64,
+                 max_workers: int = 4, timeout: Optional[float] = 10.0,
+                 max_scan_rows: Optional[int] = 100_000, progress_steps: int = 1000):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
         self.schemas: Dict[str, DatabaseSchema] = {}
+        self.pool = pool or ReadOnlyConnectionPool(db_path)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.fetch_size = fetch_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_scan_rows = max_scan_rows
+        self.progress_steps = progress_steps
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._table_sizes: Dict[str, Tuple[Optional[int], float]] = {}
+        self._plan_verdicts = _VerdictCache(self.PLAN_CACHE_SIZE, ttl=self.TABLE_SIZE_TTL)
+        self._validation_verdicts = _VerdictCache(self.VALIDATION_CACHE_SIZE)
         
         # Register default product schema
         self.register_schema(DatabaseSchema(
@@ -36,6 +329,7 @@ class DatabaseQueryTool:
     def register_schema(self, schema: DatabaseSchema):
         """Register a database schema"""
         self.schemas[schema.table_name] = schema
+        self._validation_verdicts.clear()
     
     def get_tool_spec(self) -> Dict[str, Any]:
         """Get the tool specification in MCP format"""
@@ -47,13 +341,22 @@ class DatabaseQueryTool:
         
         return {
             "name": "query_database",
-            "description": f"Execute SQL queries against the database. Available schemas:\n{schema_desc}",
+            "description": (
+                f"Execute SQL queries against the database. Available schemas:\n{schema_desc}\n"
+                f"Results are returned as {{columns, rows, row_count, next_cursor}} with at most "
+                f"{self.max_rows} rows per page; when next_cursor is set, call again with the same "
+                f"query and that cursor to fetch the next page."
+            ),
             "inputSchema": {
                 "type": "object",
                 "properties": {
                     "query": {
                         "type": "string",
                         "description": "SQL query to execute"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from the previous page of the same query"
                     }
                 },
                 "required": ["query"]
@@ -72,35 +375,273 @@ class DatabaseQueryTool:
         return "\n\n".join(schema_parts)
     
     def validate_query(self, query: str) -> bool:
-        """Validate a query against registered schemas"""
-        query = query.lower()
-        for schema in self.schemas.values():
-            if schema.table_name in query:
-                # Check if query references any non-existent columns
-                for word in query.split():
-                    if '.' in word:
-                        table, column = word.split('.')
-                        if table == schema.table_name and column not in schema.columns:
-                            return False
-        return True
+        """Validate a query against registered schemas and read-only access.
+
+        Uses the calling thread's pooled connection; see ``query_error``.
+        """
+        return self.query_error(self.pool.connection(), query) is None
+
+    def query_error(self, conn: sqlite3.Connection, query: str,
+                    fingerprint: Optional[str] = None) -> Optional[str]:
+        """Why ``query`` is not allowed, or None if it is.
+
+        SQLite compiles the statement (``EXPLAIN``, so nothing runs) with an
+        authorizer that sees every table and column it reads, through
+        aliases, quoted identifiers, subqueries and CTEs alike. Columns of
+        registered tables must be in the registered schema, and anything
+        but reads is denied. The authorizer's verdicts are memoised by query
+        fingerprint, so a repeated query validates with one dictionary
+        lookup; other compile errors are not cached, as they may be
+        transient (e.g. an interrupted compile).
+        """
+        fingerprint = fingerprint or query_fingerprint(query)
+        verdict = self._validation_verdicts.get(fingerprint)
+        if verdict is not _VerdictCache.MISSING:
+            return verdict
+        if fingerprint.startswith("explain"):
+            verdict = "EXPLAIN statements are not supported; send the query itself"
+        else:
+            verdict, cacheable = self._authorize(conn, query)
+            if not cacheable:
+                return verdict
+        self._validation_verdicts.put(fingerprint, verdict)
+        return verdict
+
+    def _authorize(self, conn: sqlite3.Connection, query: str) -> Tuple[Optional[str], bool]:
+        """Compile ``query`` under the authorizer
+
+        Returns (error or None, whether the verdict may be cached).
+        """
+        columns = {name.lower(): {column.lower() for column in schema.columns}
+                   for name, schema in self.schemas.items()}
+        problems: List[str] = []
+
+        def authorizer(action, arg1, arg2, db_name, trigger):
+            if action == sqlite3.SQLITE_READ:
+                known = columns.get((arg1 or "").lower())
+                # An empty column name is a rowid read
+                if known is not None and arg2 and arg2.lower() not in known:
+                    problems.append(f"Query references invalid column {arg1}.{arg2}")
+                    return sqlite3.SQLITE_DENY
+                return sqlite3.SQLITE_OK
+            if action in _READ_ACTIONS:
+                return sqlite3.SQLITE_OK
+            if action == sqlite3.SQLITE_PRAGMA and (arg1 or "").lower() in _READ_ONLY_PRAGMAS:
+                return sqlite3.SQLITE_OK
+            if action == sqlite3.SQLITE_PRAGMA:
+                name = f"PRAGMA {arg1}"
+            else:
+                name = _ACTION_NAMES.get(action, str(action))
+            problems.append(f"Only read-only queries are allowed ({name})")
+            return sqlite3.SQLITE_DENY
+
+        conn.set_authorizer(authorizer)
+        try:
+            conn.execute(f"EXPLAIN {query}").close()
+        except sqlite3.Error as e:
+            if problems:
+                return problems[0], True
+            if isinstance(e, sqlite3.OperationalError) and str(e) == "interrupted":
+                # Timed out or cancelled while compiling; the caller reports that
+                raise
+            return f"Invalid query: {e}", False
+        finally:
+            conn.set_authorizer(None)
+        return None, True
     
-    async def execute(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Execute a SQL query and return results"""
+    async def execute(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a SQL query and return one page of results.
+
+        Returns ``{"columns": [...], "rows": [[...], ...], "row_count": n,
+        "next_cursor": token or None}``. Pages are addressed by row offset,
+        so the query is re-run and earlier rows skipped; give it an
+        ``ORDER BY`` for a stable order across pages.
+
+        Raises ``ValueError`` for queries that fail validation and
+        ``TimeoutError`` when the query runs longer than ``timeout``.
+        """
         query = params.get("query")
         if not query:
             raise ValueError("Query parameter is required")
+
+        # Known-bad queries fail here without a trip to a worker thread
+        fingerprint = query_fingerprint(query)
+        verdict = self._validation_verdicts.get(fingerprint)
+        if verdict is not _VerdictCache.MISSING and verdict is not None:
+            raise ValueError(verdict)
+
+        offset = decode_cursor(query, params["cursor"]) if params.get("cursor") else 0
             
-        if not self.validate_query(query):
-            raise ValueError("Query references invalid columns")
-            
-        conn = sqlite3.connect(self.db_path)
+        control = _QueryControl(self.timeout)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), self._fetch_page, query, fingerprint, offset, control
+            )
+        except asyncio.CancelledError:
+            # The worker thread cannot be cancelled; stop its statement instead
+            control.cancel()
+            raise
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers,
+                                                    thread_name_prefix="query-database")
+            return self._executor
+
+    def _table_rows(self, conn: sqlite3.Connection, table: str) -> Optional[int]:
+        """Approximate row count of ``table``, None if it is not a plain table"""
+        key = table.lower()
+        cached = self._table_sizes.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        rows = None
+        if conn.execute("SELECT 1 FROM sqlite_master "
+                        "WHERE type = 'table' AND name = ? COLLATE NOCASE",
+                        (table,)).fetchone():
+            try:
+                # Statistics from ANALYZE when present,
+                # otherwise the largest rowid (an index lookup)
+                stat = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? COLLATE NOCASE",
+                                    (table,)).fetchone()
+            except sqlite3.OperationalError:
+                stat = None
+            try:
+                if stat is not None:
+                    rows = int(stat[0].split()[0])
+                else:
+                    rows = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+            except sqlite3.OperationalError:
+                rows = None  # WITHOUT ROWID table
+        self._table_sizes[key] = (rows, time.monotonic() + self.TABLE_SIZE_TTL)
+        return rows
+
+    def _check_plan(self, conn: sqlite3.Connection, query: str):
+        """Reject queries whose plan reads every row of a large table.
+
+        The model tends to repeat the same query text, so the verdict is
+        cached per text for ``TABLE_SIZE_TTL`` seconds.
+        """
+        error = self._plan_verdicts.get(query)
+        if error is _VerdictCache.MISSING:
+            error = self._plan_error(conn, query)
+            self._plan_verdicts.put(query, error)
+        if error is not None:
+            raise ValueError(error)
+
+    def _plan_error(self, conn: sqlite3.Connection, query: str) -> Optional[str]:
+        aliases = {}
+        for table, alias in _TABLE_REFERENCE.findall(query):
+            aliases[table.lower()] = table
+            if alias and alias.lower() not in _NOT_ALIASES:
+                aliases[alias.lower()] = table
+
+        for step in conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall():
+            match = _SCAN_STEP.match(step[-1])
+            if not match:
+                continue
+            table = aliases.get(match.group(1).lower(), match.group(1))
+            rows = self._table_rows(conn, table)
+            if rows is not None and rows > self.max_scan_rows:
+                return (f"Query would scan all ~{rows} rows of table {table}; "
+                        f"filter on an indexed column such as the primary key instead")
+        return None
+
+    def _fetch_page(self, query: str, fingerprint: str, offset: int,
+                    control: _QueryControl) -> Dict[str, Any]:
+        """Validate ``query``, then collect one page on the worker thread's connection"""
+        conn = self.pool.connection()
+        control.start(conn)
+        conn.set_progress_handler(control.should_stop, self.progress_steps)
+        try:
+            error = self.query_error(conn, query, fingerprint)
+            if error is not None:
+                raise ValueError(error)
+            if self.max_scan_rows is not None:
+                self._check_plan(conn, query)
+            return self._read_page(conn, query, offset)
+        except sqlite3.OperationalError as e:
+            if control.timed_out():
+                raise TimeoutError(f"Query exceeded the {self.timeout}s time limit") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            control.finish()
+
+    def _read_page(self, conn: sqlite3.Connection, query: str, offset: int) -> Dict[str, Any]:
+        cursor = conn.cursor()
         try:
-            cursor = conn.cursor()
             cursor.execute(query)
+            if cursor.description is None:
+                return {"columns": [], "rows": [], "row_count": 0, "next_cursor": None}
             columns = [description[0] for description in cursor.description]
-            results = []
-            for row in cursor.fetchall():
-                results.append(dict(zip(columns, row)))
-            return results
+
+            skipped = 0
+            while skipped < offset:
+                chunk = cursor.fetchmany(min(self.fetch_size, offset - skipped))
+                if not chunk:
+                    break
+                skipped += len(chunk)
+
+            rows: List[List[Any]] = []
+            size = 0
+            has_more = False
+            while not has_more:
+                chunk = cursor.fetchmany(self.fetch_size)
+                if not chunk:
+                    break
+                for row in chunk:
+                    row_size = sum(_value_size(value) for value in row)
+                    if row_size > self.max_bytes:
+                        # A row that alone overflows the page has its wide values cut short
+                        row = _truncate_row(row, self.max_bytes)
+                        row_size = sum(_value_size(value) for value in row)
+                    # Always return at least one row so the caller can make progress
+                    if len(rows) >= self.max_rows or (rows and size + row_size > self.max_bytes):
+                        has_more = True
+                        break
+                    rows.append(list(row))
+                    size += row_size
+
+            return {
+                "columns": columns,
+                "rows": rows,
+                "row_count": len(rows),
+                "next_cursor": encode_cursor(query, offset + len(rows)) if has_more else None,
+            }
         finally:
-            conn.close()
\ No newline at end of file
+            cursor.close()
+
+    def close(self):
+        """Wait for running queries, then close the worker threads and pooled connections"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.pool.close()
+
+_shared_tools: Dict[str, DatabaseQueryTool] = {}
+_shared_tools_lock = threading.Lock()
+
+def get_query_tool(db_path: str) -> DatabaseQueryTool:
+    """Process-wide query tool for ``db_path``.
+
+    Bridges are created per request, so they share one tool (and its
+    connection pool) per database instead of each opening their own.
+    """
+    key = os.path.abspath(db_path)
+    with _shared_tools_lock:
+        tool = _shared_tools.get(key)
+        if tool is None:
+            tool = _shared_tools[key] = DatabaseQueryTool(db_path)
+        return tool
+
+def close_query_tools():
+    """Close the connection pools of every shared query tool"""
+    with _shared_tools_lock:
+        tools = list(_shared_tools.values())
+        _shared_tools.clear()
+    for tool in tools:
+        tool.close()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(query, **params):
+    """
+    根据规范化后的查询字符串和搜索参数生成缓存键。
+    查询会去掉首尾空白、合并连续空白并转为小写，参数按键名排序。
+    """
+    normalized_query = " ".join(query.split()).lower()
+    return json.dumps([normalized_query, params], sort_keys=True, ensure_ascii=False)
+
+
+class MemoryCache:
+    """带过期时间 (TTL) 的内存 LRU 缓存。"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    持久化到 SQLite 文件的缓存，进程重启后依然有效。
+    设置 max_entries 时，超出的条目按最早过期的顺序淘汰。
+    """
+
+    def __init__(self, db_path, ttl_seconds=3600, max_entries=None):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl_seconds),
+            )
+            if self.max_entries is not None:
+                self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    两层结果缓存：内存 LRU 作为第一层，可选的 SQLite 作为第二层。
+    记录命中/未命中次数，便于观察缓存效果。网络搜索结果和皮肤分析结果都使用它。
+    """
+
+    def __init__(self, memory=None, persistent=None):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.persistent = persistent
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                # 回填内存层，下次直接命中
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "persistent_entries": len(self.persistent) if self.persistent is not None else None,
+        }
+
+
+def search_cache_from_env():
+    """
+    根据环境变量创建搜索缓存：
+    WEB_SEARCH_CACHE_TTL（秒，默认3600）、WEB_SEARCH_CACHE_SIZE（内存条目数，默认1024）、
+    WEB_SEARCH_CACHE_DB（SQLite文件路径，留空则不启用持久化）。
+    """
+    ttl_seconds = float(os.getenv("WEB_SEARCH_CACHE_TTL", 3600))
+    max_entries = int(os.getenv("WEB_SEARCH_CACHE_SIZE", 1024))
+    db_path = os.getenv("WEB_SEARCH_CACHE_DB")
+    persistent = SQLiteCache(db_path, ttl_seconds) if db_path else None
+    return TieredCache(MemoryCache(max_entries, ttl_seconds), persistent)
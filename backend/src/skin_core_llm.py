@@ -1,76 +1,317 @@
 # skin_analysis/skin_core_llm.py
 import requests
+import httpx
+import asyncio
+import hashlib
+import random
+import threading
+import time
 import sys,os,json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
-from to_jpg import convert_to_jpg
+from to_jpg import normalize_to_jpeg
 from config_loader import get_app_config # 导入新的统一入口函数
+from result_cache import MemoryCache, SQLiteCache, TieredCache
 
 sys.stdout.reconfigure(encoding="utf-8")
 
+
+class SkinAnalysisClient:
+    """
+    可复用的皮肤分析API客户端。
+
+    同步调用复用带连接池的 requests.Session，异步调用复用 httpx.AsyncClient，
+    均保持长连接，避免每次请求重新进行 TCP+TLS 握手。
+    遇到 5xx、超时或连接错误时按 AppConfig 中的重试次数做带抖动的指数退避重试。
+    """
+
+    def __init__(self, app_cfg=None):
+        # 未指定配置时，每次请求都读取最新的应用配置
+        self._app_cfg = app_cfg
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._async_client = None
+
+    @property
+    def app_cfg(self):
+        return self._app_cfg if self._app_cfg is not None else get_app_config()
+
+    @property
+    def session(self):
+        """带连接池的同步会话（线程安全地延迟创建）"""
+        with self._session_lock:
+            if self._session is None:
+                pool_maxsize = self.app_cfg.pool_maxsize
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    @property
+    def async_client(self):
+        """带连接池的异步客户端（httpx 连接池绑定事件循环，请在同一个循环中使用）"""
+        if self._async_client is None or self._async_client.is_closed:
+            pool_maxsize = self.app_cfg.pool_maxsize
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=pool_maxsize,
+                                    max_keepalive_connections=pool_maxsize)
+            )
+        return self._async_client
+
+    def _request_parts(self, app_cfg, image):
+        if hasattr(image, 'seek'):
+            # 重试时从头重新发送同一个文件对象
+            image.seek(0)
+        files = [
+            (app_cfg.file_form_field_name,
+             (app_cfg.file_sent_filename_placeholder, image, app_cfg.file_content_type))
+        ]
+        headers = {
+            app_cfg.api_key_header_name: app_cfg.api_key
+        }
+        return files, headers
+
+    def _retry_delay(self, app_cfg, attempt):
+        base = app_cfg.retry_backoff_seconds * (2 ** attempt)
+        return base + random.uniform(0, base)
+
+    def analyze(self, image):
+        """
+        同步发送分析请求，返回响应中的 result 字段。
+        image 为JPEG字节或二进制文件对象（如 BytesIO）。
+        重试耗尽后抛出最后一次的 requests 异常。
+        """
+        app_cfg = self.app_cfg
+        for attempt in range(app_cfg.max_retries + 1):
+            files, headers = self._request_parts(app_cfg, image)
+            try:
+                response = self.session.post(app_cfg.api_url,
+                                             headers=headers,
+                                             files=files,
+                                             timeout=app_cfg.request_timeout_seconds)
+                if response.status_code < 500 or attempt == app_cfg.max_retries:
+                    response.raise_for_status()
+                    return response.json()['result']
+                print(f"服务器错误 {response.status_code}，准备第 {attempt + 1} 次重试...")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == app_cfg.max_retries:
+                    raise
+                print(f"请求失败（{e}），准备第 {attempt + 1} 次重试...")
+            time.sleep(self._retry_delay(app_cfg, attempt))
+
+    async def analyze_async(self, image):
+        """
+        异步发送分析请求，返回响应中的 result 字段。
+        image 为JPEG字节或二进制文件对象（如 BytesIO）。
+        重试耗尽后抛出最后一次的 httpx 异常。
+        """
+        app_cfg = self.app_cfg
+        for attempt in range(app_cfg.max_retries + 1):
+            files, headers = self._request_parts(app_cfg, image)
+            try:
+                response = await self.async_client.post(app_cfg.api_url,
+                                                        headers=headers,
+                                                        files=files,
+                                                        timeout=app_cfg.request_timeout_seconds)
+                if response.status_code < 500 or attempt == app_cfg.max_retries:
+                    response.raise_for_status()
+                    return response.json()['result']
+                print(f"服务器错误 {response.status_code}，准备第 {attempt + 1} 次重试...")
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                if attempt == app_cfg.max_retries:
+                    raise
+                print(f"请求失败（{e}），准备第 {attempt + 1} 次重试...")
+            await asyncio.sleep(self._retry_delay(app_cfg, attempt))
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def aclose(self):
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+# 进程内共享的默认客户端
+default_client = SkinAnalysisClient()
+
+# 按图片内容哈希缓存的分析结果，首次使用时按配置创建
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache(app_cfg=None):
+    """返回进程内共享的分析结果缓存；配置中关闭缓存时返回None"""
+    global _analysis_cache
+    app_cfg = app_cfg or get_app_config()
+    if not app_cfg.analysis_cache_enabled:
+        return None
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            ttl_seconds = app_cfg.analysis_cache_ttl_seconds
+            db_path = app_cfg.analysis_cache_db_path
+            persistent = None
+            if db_path:
+                persistent = SQLiteCache(db_path, ttl_seconds,
+                                         app_cfg.analysis_cache_db_max_entries)
+            _analysis_cache = TieredCache(
+                MemoryCache(app_cfg.analysis_cache_memory_max_entries, ttl_seconds), persistent
+            )
+        return _analysis_cache
+
+
+def image_digest(jpeg_stream):
+    """规范化后JPEG字节的 BLAKE2 摘要，作为分析结果缓存的键"""
+    return hashlib.blake2b(jpeg_stream.getvalue(), digest_size=20).hexdigest()
+
+
+def upload_cache_key(content_digest, app_cfg):
+    """
+    由原始上传内容的摘要和当前预处理参数得到缓存键。
+    接收上传时已经边读边算好摘要，命中缓存时无需再解码和转换图片。
+    """
+    options = json.dumps(app_cfg.image_preprocessing, sort_keys=True)
+    key = f"{content_digest}:{options}".encode("utf-8")
+    return hashlib.blake2b(key, digest_size=20).hexdigest()
+
+
+def _cached_result(cache, key):
+    if cache is None:
+        return None
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"命中分析结果缓存: {key}")
+        return json.loads(cached)
+    return None
+
+
+def _store_result(cache, key, result):
+    if cache is not None:
+        cache.set(key, json.dumps(result, ensure_ascii=False))
+
+
+def _prepare_image(image, app_cfg):
+    """在内存中把输入图片规范化为JPEG，返回 BytesIO，失败时返回None"""
+    if image is None:
+        image = app_cfg.default_image_path
+
+    if isinstance(image, str):
+        print(f"使用的图片路径: {image}")
+    return normalize_to_jpeg(image, **app_cfg.image_preprocessing)
+
+
+def _format_result(result, app_cfg):
+    # 将JSON对象格式化输出
+    formatted_json = json.dumps(result,
+                                indent=app_cfg.json_indent,
+                                ensure_ascii=app_cfg.json_ensure_ascii)
+    print("\n--- API 响应 ---")
+    # print(formatted_json)
+    return formatted_json
+
+
+class ImageConversionError(ValueError):
+    """图片转换失败或文件不存在"""
+
+
+def fetch_analysis(image=None, client=None, content_digest=None):
+    """
+    分析一张图片并返回API响应中的 result 字典，优先使用分析结果缓存。
+    参数同 analyze_skin_with_api；失败时抛出 ImageConversionError 或 requests 异常。
+    """
+    client = client or default_client
+    app_cfg = client.app_cfg
+
+    cache = get_analysis_cache(app_cfg)
+    cache_key = upload_cache_key(content_digest, app_cfg) if content_digest else None
+    cached = _cached_result(cache, cache_key) if cache_key else None
+    if cached is not None:
+        return cached
+
+    jpeg_stream = _prepare_image(image, app_cfg)
+    if jpeg_stream is None:
+        raise ImageConversionError("图片转换失败或文件不存在")
+
+    if cache_key is None:
+        cache_key = image_digest(jpeg_stream)
+        cached = _cached_result(cache, cache_key)
+        if cached is not None:
+            return cached
+
+    print(f"向URL {app_cfg.api_url} 发送请求...")
+    result = client.analyze(jpeg_stream)
+    _store_result(cache, cache_key, result)
+    return result
+
+
+async def fetch_analysis_async(image=None, client=None, content_digest=None):
+    """
+    fetch_analysis 的异步版本，图片转换和缓存读写在线程池中执行，不阻塞事件循环。
+    失败时抛出 ImageConversionError 或 httpx 异常。
+    """
+    client = client or default_client
+    app_cfg = client.app_cfg
+
+    cache = await asyncio.to_thread(get_analysis_cache, app_cfg)
+    cache_key = upload_cache_key(content_digest, app_cfg) if content_digest else None
+    cached = await asyncio.to_thread(_cached_result, cache, cache_key) if cache_key else None
+    if cached is not None:
+        return cached
+
+    jpeg_stream = await asyncio.to_thread(_prepare_image, image, app_cfg)
+    if jpeg_stream is None:
+        raise ImageConversionError("图片转换失败或文件不存在")
+
+    if cache_key is None:
+        cache_key = image_digest(jpeg_stream)
+        cached = await asyncio.to_thread(_cached_result, cache, cache_key)
+        if cached is not None:
+            return cached
+
+    print(f"向URL {app_cfg.api_url} 发送请求...")
+    result = await client.analyze_async(jpeg_stream)
+    await asyncio.to_thread(_store_result, cache, cache_key, result)
+    return result
+
+
 # --- 1. 将核心逻辑封装到函数中 ---
-def analyze_skin_with_api(image_path=None):
+def analyze_skin_with_api(image_path=None, client=None, content_digest=None):
     """
     加载配置，处理图片，向API发送皮肤分析请求，并返回JSON响应。
 
     Args:
-        image_path (str, optional): 输入图片的路径。如果为None，则使用配置文件中的默认路径。
+        image_path (str | bytes | 文件对象, optional): 输入图片的路径、字节或二进制文件对象。
+            如果为None，则使用配置文件中的默认路径。图片在内存中转换为JPEG，不产生临时文件。
+            相同内容的图片命中分析结果缓存时不会再次调用API。
+        client (SkinAnalysisClient, optional): 使用的API客户端，默认使用进程内共享的客户端。
+        content_digest (str, optional): 原始图片字节的摘要（如接收上传时计算的 BLAKE2），
+            提供时直接用它查缓存，命中则跳过图片转换。
 
     Returns:
-        dict or None: 如果请求成功并解析到JSON，则返回JSON响应字典；否则返回None。
+        str or None: 如果请求成功并解析到JSON，则返回格式化后的JSON字符串；否则返回None。
     """
+    client = client or default_client
     # --- 1. 加载应用配置 ---
-    app_cfg = get_app_config()
-
-    # --- 2. 获取并处理输入图片路径 ---
-    if image_path is None:
-        file_path = app_cfg.default_image_path
-    else:
-        file_path = image_path
-
-    print(f"使用的图片路径: {file_path}")
-    to_jpg_path = convert_to_jpg(file_path)
-
-    if not to_jpg_path:
-        print("图片转换失败或文件不存在，程序将退出。")
-        return None # 或者 sys.exit(1) 如果希望失败时终止程序
-
-    # --- 4. 准备API请求 ---
-    payload={}
-    files=[
-      (app_cfg.file_form_field_name,
-       (app_cfg.file_sent_filename_placeholder, open(to_jpg_path,'rb'), app_cfg.file_content_type)
-      )
-    ]
-    headers = {
-      app_cfg.api_key_header_name: app_cfg.api_key
-    }
-
-    response_json = None # 初始化响应变量
+    app_cfg = client.app_cfg
 
     try:
-        print(f"向URL {app_cfg.api_url} 发送请求...")
-        response = requests.request("POST",
-                                    app_cfg.api_url,
-                                    headers=headers,
-                                    data=payload,
-                                    files=files,
-                                    timeout=app_cfg.request_timeout_seconds)
-        response.raise_for_status() # 如果HTTP请求返回了失败的状态码 (4xx or 5xx)，则抛出HTTPError异常
-
-        response_json = response.json()['result']
-        # 将JSON对象格式化输出
-        formatted_json = json.dumps(response_json,
-                                    indent=app_cfg.json_indent,
-                                    ensure_ascii=app_cfg.json_ensure_ascii)
-        print("\n--- API 响应 ---")
-        # print(formatted_json)
-        return formatted_json
+        # --- 2. 获取并处理输入图片，发送请求 ---
+        result = fetch_analysis(image_path, client, content_digest)
+        return _format_result(result, app_cfg)
 
+    except ImageConversionError:
+        print("图片转换失败或文件不存在，程序将退出。")
     except requests.exceptions.HTTPError as e:
         print(f"HTTP 错误: {e}")
-        if 'response' in locals() and response is not None: # 确保response对象存在
-            print(f"响应状态码: {response.status_code}")
-            print(f"响应内容: {response.text}")
+        if e.response is not None:
+            print(f"响应状态码: {e.response.status_code}")
+            print(f"响应内容: {e.response.text}")
     except requests.exceptions.ConnectionError as e:
         print(f"连接错误: {e}")
     except requests.exceptions.Timeout:
@@ -79,26 +320,131 @@ def analyze_skin_with_api(image_path=None):
         print(f"请求发生错误: {e}")
     except json.JSONDecodeError:
         print("无法解析响应为JSON。")
-        if 'response' in locals() and response is not None: # 确保response对象存在
-            print(f"原始响应内容 (状态码 {response.status_code}):\n{response.text}")
     except Exception as e: # 捕获其他意外错误
         print(f"在API请求或处理过程中发生未知错误: {e}")
-    finally:
 
-        for _, (_, file_obj, _) in files:
-             pass
+    return None
+
+
+async def analyze_skin_with_api_async(image_path=None, client=None, content_digest=None):
+    """
+    analyze_skin_with_api 的异步版本，供异步桥接和异步 Web 服务调用。
+    图片转换在线程池中执行，不阻塞事件循环。
+    """
+    client = client or default_client
+    app_cfg = client.app_cfg
+
+    try:
+        result = await fetch_analysis_async(image_path, client, content_digest)
+        return _format_result(result, app_cfg)
+
+    except ImageConversionError:
+        print("图片转换失败或文件不存在。")
+    except httpx.HTTPStatusError as e:
+        print(f"HTTP 错误: {e}")
+        print(f"响应状态码: {e.response.status_code}")
+        print(f"响应内容: {e.response.text}")
+    except httpx.TimeoutException:
+        print(f"请求超时（超过 {app_cfg.request_timeout_seconds} 秒）。")
+    except httpx.TransportError as e:
+        print(f"连接错误: {e}")
+    except json.JSONDecodeError:
+        print("无法解析响应为JSON。")
+    except Exception as e:
+        print(f"在API请求或处理过程中发生未知错误: {e}")
+
+    return None
+
+
+def _describe_error(error, app_cfg):
+    """批量分析中单张图片失败时返回给调用方的错误描述"""
+    if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException)):
+        return f"请求超时（超过 {app_cfg.request_timeout_seconds} 秒）"
+    if (isinstance(error, (requests.exceptions.HTTPError, httpx.HTTPStatusError))
+            and error.response is not None):
+        return f"HTTP 错误: {error.response.status_code}"
+    return str(error) or type(error).__name__
+
+
+def _batch_item(index, started, result=None, error=None, app_cfg=None):
+    item = {'index': index, 'success': error is None,
+            'elapsed_seconds': round(time.perf_counter() - started, 4)}
+    if error is None:
+        item['result'] = result
+    else:
+        item['error'] = _describe_error(error, app_cfg)
+    return item
+
+
+def _batch_report(items, started):
+    """汇总批量分析的逐张结果和耗时"""
+    succeeded = sum(1 for item in items if item['success'])
+    return {
+        'items': items,
+        'succeeded': succeeded,
+        'failed': len(items) - succeeded,
+        # 总耗时（墙钟时间）与逐张耗时之和的比值即并发带来的加速
+        'elapsed_seconds': round(time.perf_counter() - started, 4),
+        'total_item_seconds': round(sum(item['elapsed_seconds'] for item in items), 4),
+    }
+
+
+def analyze_many(images, client=None, max_concurrency=None, content_digests=None):
+    """
+    并发分析多张图片（如左右脸颊、前后对比照片），单张失败不影响其他图片。
 
-        if to_jpg_path and to_jpg_path != file_path and os.path.exists(to_jpg_path):
+    Args:
+        images (list): 图片路径、字节或二进制文件对象的列表。
+        client (SkinAnalysisClient, optional): 使用的API客户端，默认使用进程内共享的客户端。
+        max_concurrency (int, optional): 同时进行的请求数，
+            默认取配置 api_settings.batch_max_concurrency。
+        content_digests (list, optional): 与 images 一一对应的原始内容摘要，用于直接命中缓存。
+
+    Returns:
+        dict: items 为按输入顺序排列的逐张结果（success、result 或 error、elapsed_seconds），
+        以及成功数、失败数、总耗时和逐张耗时之和。
+    """
+    client = client or default_client
+    app_cfg = client.app_cfg
+    max_concurrency = max_concurrency or app_cfg.batch_max_concurrency
+    content_digests = content_digests or [None] * len(images)
+    started = time.perf_counter()
+
+    def run(index):
+        item_started = time.perf_counter()
+        try:
+            result = fetch_analysis(images[index], client, content_digests[index])
+        except Exception as e:
+            print(f"第 {index + 1} 张图片分析失败: {e}")
+            return _batch_item(index, item_started, error=e, app_cfg=app_cfg)
+        return _batch_item(index, item_started, result=result)
+
+    # 线程数不超过连接池大小，请求复用 requests.Session 中的长连接
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(images)))) as executor:
+        items = list(executor.map(run, range(len(images))))
+    return _batch_report(items, started)
+
+
+async def analyze_many_async(images, client=None, max_concurrency=None, content_digests=None):
+    """analyze_many 的异步版本，用信号量限制同时进行的请求数"""
+    client = client or default_client
+    app_cfg = client.app_cfg
+    semaphore = asyncio.Semaphore(max_concurrency or app_cfg.batch_max_concurrency)
+    content_digests = content_digests or [None] * len(images)
+    started = time.perf_counter()
+
+    async def run(index):
+        async with semaphore:
+            item_started = time.perf_counter()
             try:
-                # 确保在关闭文件后再删除 (requests handles closing for files in the 'files' parameter)
-                print(f"尝试删除临时转换文件: {to_jpg_path}")
-                os.remove(to_jpg_path)
-                print(f"已删除临时转换文件: {to_jpg_path}")
-            except Exception as e_remove:
-                print(f"删除临时文件 {to_jpg_path} 失败: {e_remove}")
+                result = await fetch_analysis_async(images[index], client, content_digests[index])
+            except Exception as e:
+                print(f"第 {index + 1} 张图片分析失败: {e}")
+                return _batch_item(index, item_started, error=e, app_cfg=app_cfg)
+            return _batch_item(index, item_started, result=result)
 
-    # 返回API响应（如果成功）
-    return response_json
+    items = await asyncio.gather(*(run(index) for index in range(len(images))))
+    return _batch_report(list(items), started)
 
 def response_to_json(analysis_result):
     # 保存结果为JSON文件
@@ -117,10 +463,10 @@ if __name__ == "__main__":
 
     if analysis_result:
         print("\n--- 分析完成，成功获取响应 ---")
-        
+
         response_to_json(analysis_result)
     else:
         print("\n--- 皮肤分析失败 ---")
 
 
-print("脚本执行完毕。")
\ No newline at end of file
+print("脚本执行完毕。")
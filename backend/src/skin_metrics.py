@@ -0,0 +1,294 @@
+# skin_metrics.py
+"""
+本地皮肤指标提取：只依赖 NumPy 和 Pillow，在CPU上对整幅数组做向量化计算，
+不逐像素循环。可作为调用远程皮肤分析API之前的快速初筛，或在API不可用时的兜底。
+
+指标基于颜色和纹理统计，是相对量（0-100），用于排序和分档，不等同于医学测量：
+- 油性 oil_level：皮肤区域中镜面高光（高亮度、低饱和度）像素的比例
+- 纹理 texture_level：亮度通道局部方差（窗口标准差）的均值
+- 色素 pigmentation_level：亮度明显低于周围皮肤的斑点像素比例
+- 敏感 sensitivity_level：Lab 空间 a*（红色分量）的均值，即泛红指数
+- 水分 moisture_level：由纹理粗糙度和暗沉度反推的估计值
+"""
+import sys
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from to_jpg import flatten_to_rgb
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+# 计算前把图片缩小到的长边像素数；统计量对分辨率不敏感，缩小可大幅减少计算量
+DEFAULT_MAX_LONG_EDGE = 512
+# 局部方差的窗口边长
+TEXTURE_WINDOW = 7
+# 色斑检测时比较的周围区域窗口边长，以及判定为色斑的亮度差 (L*)
+SPOT_WINDOW = 15
+SPOT_CONTRAST = 10.0
+# 皮肤掩码补洞的窗口边长：邻域内过半是皮肤的像素也算作皮肤，
+# 这样颜色不符合皮肤阈值的高光点和小色斑仍然参与统计
+SKIN_FILL_WINDOW = 15
+HISTOGRAM_BINS = 16
+
+# 皮肤区域相对于皮肤包围盒的位置 (上, 下, 左, 右)，取值为 0-1 的比例
+REGION_BOXES = {
+    'forehead': (0.0, 0.3, 0.15, 0.85),
+    'left_cheek': (0.35, 0.75, 0.0, 0.45),
+    'right_cheek': (0.35, 0.75, 0.55, 1.0),
+    'nose': (0.3, 0.7, 0.4, 0.6),
+    'jaw': (0.75, 1.0, 0.15, 0.85),
+}
+
+
+def open_rgb_image(image, max_long_edge=DEFAULT_MAX_LONG_EDGE):
+    """
+    打开图片（路径、字节、文件对象或 PIL 图片）并转为 RGB 模式。
+    JPEG 在解码阶段按 max_long_edge 直接缩小（结果不小于目标尺寸），并按EXIF方向旋转。
+    """
+    if not isinstance(image, Image.Image):
+        if hasattr(image, 'read'):
+            image = image.read()
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            image = BytesIO(bytes(image))
+        image = Image.open(image)
+        if max_long_edge is not None and image.format == 'JPEG':
+            # JPEG 在解码阶段直接按比例缩小
+            image.draft('RGB', (max_long_edge, max_long_edge))
+        image = ImageOps.exif_transpose(image)
+    return flatten_to_rgb(image)
+
+
+def load_rgb_array(image, max_long_edge=DEFAULT_MAX_LONG_EDGE):
+    """
+    读取图片（路径、字节、文件对象或 PIL 图片）并缩小，返回取值 0-1 的 float32 RGB 数组 (H, W, 3)。
+    """
+    image = open_rgb_image(image, max_long_edge)
+    if max_long_edge is not None and max(image.size) > max_long_edge:
+        image.thumbnail((max_long_edge, max_long_edge), Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def _planes(rgb):
+    """把 (H, W, 3) 数组拆成三个连续存储的 (H, W) 通道，后续逐通道运算不再跨步访问内存"""
+    return tuple(np.ascontiguousarray(rgb.transpose(2, 0, 1)))
+
+
+def rgb_to_hsv(rgb):
+    """向量化的 RGB → HSV，输入取值 0-1，返回 (H, S, V) 三个取值 0-1 的 (H, W) 数组"""
+    r, g, b = _planes(rgb)
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    delta = maxc - minc
+    saturation = delta / np.maximum(maxc, np.float32(1e-6))
+
+    safe_delta = np.maximum(delta, np.float32(1e-6))
+    hue = (r - g) / safe_delta + np.float32(4.0)
+    hue = np.where(maxc == g, (b - r) / safe_delta + np.float32(2.0), hue)
+    hue = np.where(maxc == r, np.mod((g - b) / safe_delta, np.float32(6.0)), hue)
+    hue = np.where(delta > 0, hue / np.float32(6.0), np.float32(0.0))
+    return hue, saturation, maxc
+
+
+# sRGB 8 位取值到线性亮度的查找表
+_SRGB_TO_LINEAR = np.where(
+    np.arange(256) / 255.0 <= 0.04045,
+    np.arange(256) / 255.0 / 12.92,
+    ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4,
+).astype(np.float32)
+
+# 线性 RGB → 以 D65 白点归一化的 XYZ
+_RGB_TO_XYZ = (np.array([[0.4124, 0.3576, 0.1805],
+                         [0.2126, 0.7152, 0.0722],
+                         [0.0193, 0.1192, 0.9505]])
+               / np.array([[0.95047], [1.0], [1.08883]])).astype(np.float32)
+
+
+def _lab_f(t):
+    return np.where(t > 0.008856, np.cbrt(t), np.float32(7.787) * t + np.float32(16.0 / 116.0))
+
+
+def rgb_to_lab(rgb):
+    """
+    向量化的 sRGB → CIE Lab (D65)，返回 (L, a, b) 三个 (H, W) 数组，L 取值 0-100。
+    伽马校正用 256 项查找表代替幂运算。
+    """
+    r, g, b = (_SRGB_TO_LINEAR[np.rint(channel * 255.0).astype(np.uint8)]
+               for channel in _planes(rgb))
+    fx, fy, fz = (_lab_f(row[0] * r + row[1] * g + row[2] * b) for row in _RGB_TO_XYZ)
+    return 116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz)
+
+
+def skin_mask(rgb, fill_window=SKIN_FILL_WINDOW):
+    """
+    按 YCbCr 空间的经验阈值标记皮肤像素，并用邻域多数补上皮肤内部的高光和小斑点，
+    返回布尔数组 (H, W)。
+    """
+    r, g, b = _planes(rgb)
+    cb = 0.5 - 0.168736 * r - 0.331264 * g + 0.5 * b
+    cr = 0.5 + 0.5 * r - 0.418688 * g - 0.081312 * b
+    mask = (cb >= 77 / 255) & (cb <= 127 / 255) & (cr >= 133 / 255) & (cr <= 173 / 255)
+    if fill_window:
+        mask |= box_mean(mask, fill_window) >= 0.5
+    return mask
+
+
+def box_mean(channel, window):
+    """用积分图在 O(H*W) 内计算每个像素邻域窗口（边长 window，奇数）的均值"""
+    pad = window // 2
+    padded = np.pad(channel.astype(np.float64), pad, mode='reflect')
+    integral = np.pad(padded.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    total = (integral[window:, window:] - integral[:-window, window:]
+             - integral[window:, :-window] + integral[:-window, :-window])
+    return total / float(window * window)
+
+
+def local_std(channel, window=TEXTURE_WINDOW):
+    """每个像素邻域窗口内的标准差"""
+    mean = box_mean(channel, window)
+    mean_sq = box_mean(np.square(channel, dtype=np.float64), window)
+    return np.sqrt(np.maximum(mean_sq - mean * mean, 0.0)).astype(np.float32)
+
+
+def region_masks(mask, boxes=REGION_BOXES):
+    """
+    在皮肤像素的包围盒内按 boxes 划分区域，返回 {区域名: 布尔数组}。
+    没有检测到皮肤时返回空字典。
+    """
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return {}
+    top, bottom = rows[0], rows[-1] + 1
+    left, right = cols[0], cols[-1] + 1
+    height, width = bottom - top, right - left
+
+    masks = {}
+    for name, (y0, y1, x0, x1) in boxes.items():
+        region = np.zeros_like(mask)
+        region[top + int(y0 * height):top + int(y1 * height),
+               left + int(x0 * width):left + int(x1 * width)] = True
+        masks[name] = region & mask
+    return masks
+
+
+def _clip_score(value, low, high):
+    """把原始统计量线性映射到 0-100 的整数分数"""
+    return int(round(float(np.clip((value - low) / (high - low), 0.0, 1.0)) * 100))
+
+
+def _pixel_maps(rgb):
+    """整幅图片的逐像素特征图，各区域的统计量都由它们按掩码汇总"""
+    hue, saturation, value = rgb_to_hsv(rgb)
+    lightness, red_green, _ = rgb_to_lab(rgb)
+    return {
+        'hue': hue,
+        'lightness': lightness,
+        'redness': red_green,
+        'specular': (value > 0.9) & (saturation < 0.25),
+        'texture': local_std(lightness),
+        'spots': lightness < box_mean(lightness, SPOT_WINDOW) - SPOT_CONTRAST,
+    }
+
+
+def _region_stats(maps, mask):
+    """一个区域的原始统计量"""
+    count = int(mask.sum())
+    if count == 0:
+        return None
+    return {
+        'pixels': count,
+        'specular_ratio': float(maps['specular'][mask].mean()),
+        'texture': float(maps['texture'][mask].mean()),
+        'redness': float(maps['redness'][mask].mean()),
+        'lightness': float(maps['lightness'][mask].mean()),
+        'spot_ratio': float(maps['spots'][mask].mean()),
+    }
+
+
+def _scores(stats):
+    """由原始统计量计算 0-100 的各项分数"""
+    oil = _clip_score(stats['specular_ratio'], 0.0, 0.1)
+    texture = _clip_score(stats['texture'], 1.5, 6.0)
+    pigmentation = _clip_score(stats['spot_ratio'], 0.01, 0.12)
+    sensitivity = _clip_score(stats['redness'], 8.0, 28.0)
+    dullness = _clip_score(stats['lightness'], 80.0, 45.0)
+    moisture = int(round(100 - 0.6 * texture - 0.4 * dullness))
+    return {
+        'moisture_level': moisture,
+        'oil_level': oil,
+        'pigmentation_level': pigmentation,
+        'sensitivity_level': sensitivity,
+        'texture_level': texture,
+    }
+
+
+def classify_skin_type(overall, regions):
+    """根据整体分数和T区/两颊的油脂差异判断皮肤类型"""
+    if overall['sensitivity_level'] >= 65:
+        return '敏感性皮肤'
+    t_zone = [regions[name]['oil_level'] for name in ('forehead', 'nose') if name in regions]
+    cheeks = [regions[name]['oil_level'] for name in ('left_cheek', 'right_cheek')
+              if name in regions]
+    if t_zone and cheeks and max(t_zone) - np.mean(cheeks) >= 30:
+        return '混合型皮肤'
+    if overall['oil_level'] >= 60:
+        return '油性皮肤'
+    if overall['moisture_level'] <= 40:
+        return '干性皮肤'
+    return '中性皮肤'
+
+
+def _histogram(values, bins, value_range):
+    counts, _ = np.histogram(values, bins=bins, range=value_range)
+    total = counts.sum()
+    return (counts / total).round(4).tolist() if total else [0.0] * bins
+
+
+def analyze_array(rgb, masks=None):
+    """
+    对 RGB 数组计算皮肤指标。
+
+    参数:
+    rgb (np.ndarray): load_rgb_array 返回的 (H, W, 3) 数组。
+    masks (dict, optional): 预先计算好的 {区域名: 布尔数组}，需包含 'skin'；
+        未提供时用颜色阈值检测皮肤并按包围盒划分区域。
+
+    返回:
+    dict: 整体分数、皮肤类型、各区域分数、皮肤像素占比以及 HSV 色相和 Lab 亮度直方图。
+    """
+    maps = _pixel_maps(rgb)
+
+    if masks is None:
+        mask = skin_mask(rgb)
+        regions = region_masks(mask)
+    else:
+        mask = masks['skin']
+        regions = {name: region for name, region in masks.items() if name != 'skin'}
+    if not mask.any():
+        # 没有检测到皮肤时退化为整幅图片
+        mask = np.ones(mask.shape, dtype=bool)
+
+    overall = _scores(_region_stats(maps, mask))
+    region_scores = {}
+    for name, region in regions.items():
+        stats = _region_stats(maps, region)
+        if stats is not None:
+            region_scores[name] = _scores(stats)
+
+    return {
+        'skin_type': classify_skin_type(overall, region_scores),
+        **overall,
+        'regions': region_scores,
+        'skin_ratio': round(float(mask.mean()), 4),
+        'histograms': {
+            'hue': _histogram(maps['hue'][mask], HISTOGRAM_BINS, (0.0, 1.0)),
+            'lightness': _histogram(maps['lightness'][mask], HISTOGRAM_BINS, (0.0, 100.0)),
+        },
+    }
+
+
+def analyze_image(image, max_long_edge=DEFAULT_MAX_LONG_EDGE):
+    """读取图片并计算皮肤指标，参数和返回值见 load_rgb_array 与 analyze_array"""
+    return analyze_array(load_rgb_array(image, max_long_edge))
@@ -1,9 +1,127 @@
-from PIL import Image
+from PIL import Image, ImageOps
+from io import BytesIO
+import math
 import os
 import sys
 
 sys.stdout.reconfigure(encoding="utf-8")
 
+EXIF_ORIENTATION_TAG = 0x0112
+
+def flatten_to_rgb(img):
+    """
+    将图片转换为RGB模式。带透明通道的图片（RGBA、LA、带透明色的P模式）铺在白色背景上。
+    """
+    # 如果图像有alpha通道（例如PNG的透明度），转换为RGB
+    if img.mode == 'RGBA' or img.mode == 'LA' or (img.mode == 'P' and 'transparency' in img.info):
+        # 创建一个白色背景的图像
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        # 将原始图像粘贴到背景上（处理透明度）
+        # 如果img是P模式且有透明度，先转为RGBA
+        if img.mode == 'P' and 'transparency' in img.info:
+            img = img.convert("RGBA")
+
+        # 获取alpha通道作为mask
+        if img.mode == 'RGBA':
+            alpha_mask = img.split()[3]
+        elif img.mode == 'LA': # LA模式，第二个通道是alpha
+             alpha_mask = img.split()[1]
+        else: # 其他情况（如P模式转换后的RGBA）
+             alpha_mask = None # 或者根据具体情况处理
+
+        background.paste(img, mask=alpha_mask)
+        return background
+    # 如果已经是RGB或可以安全转换为RGB
+    return img.convert('RGB')
+
+def _original_bytes(source):
+    if isinstance(source, BytesIO):
+        return BytesIO(source.getvalue())
+    with open(source, 'rb') as f:
+        return BytesIO(f.read())
+
+def normalize_to_jpeg(source, max_long_edge=None, quality=None, progressive=False,
+                      optimize=False, fix_orientation=False, draft=False, crop_face=False,
+                      face_padding=0.3):
+    """
+    在内存中将图片规范化为JPEG，不产生任何临时文件。
+
+    参数:
+    source (str | bytes | 文件对象): 图片路径、图片字节或可读的二进制文件对象。
+    max_long_edge (int, optional): 长边的最大像素数，超过时等比缩小。
+    quality (int, optional): JPEG质量（1-95），None 使用 Pillow 默认值。
+    progressive (bool): 是否输出渐进式JPEG。
+    optimize (bool): 是否优化霍夫曼表以减小体积。
+    fix_orientation (bool): 是否按EXIF方向信息旋转图片。
+    draft (bool): 缩小JPEG时是否使用 Pillow 的 draft() 在解码阶段直接按比例缩小，加快解码。
+    crop_face (bool): 是否裁剪到以人脸为中心的正方形区域（见 face_roi），
+        未检测到人脸时保留整幅图片。
+    face_padding (float): 裁剪时人脸四周各留出的边距，按人脸边长的比例计算。
+
+    返回:
+    BytesIO: 指针位于开头的JPEG数据，可直接作为 multipart 上传的文件对象；失败时返回None。
+    已经是JPEG且无需缩放、旋转、裁剪的图片不重新编码，直接返回原始字节；
+    无需缩放和旋转的JPEG重新编码（如裁剪）后反而比原图大时，也返回原始字节。
+    """
+    try:
+        if hasattr(source, 'read'):
+            # 从文件对象当前位置读取剩余内容
+            source = source.read()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = BytesIO(bytes(source))
+
+        with Image.open(source) as img:
+            orientation = img.getexif().get(EXIF_ORIENTATION_TAG, 1) if fix_orientation else 1
+            too_large = max_long_edge is not None and max(img.size) > max_long_edge
+            unchanged = img.format == 'JPEG' and not too_large and orientation == 1
+
+            if unchanged and not crop_face:
+                return _original_bytes(source)
+
+            if draft and too_large and img.format == 'JPEG':
+                # 解码时直接按 1/2、1/4、1/8 缩小，结果不小于目标尺寸
+                scale = max_long_edge / max(img.size)
+                img.draft('RGB', (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+
+            if orientation != 1:
+                img = ImageOps.exif_transpose(img)
+            img_to_save = flatten_to_rgb(img)
+
+        if crop_face:
+            # 先裁剪再缩放，背景像素不参与缩放和编码
+            from face_roi import crop_to_face
+            cropped, _ = crop_to_face(img_to_save, face_padding)
+            if unchanged and cropped.size == img_to_save.size:
+                # 人脸区域覆盖整幅图片（如自拍特写），无需重新编码
+                return _original_bytes(source)
+            img_to_save = cropped
+
+        if max_long_edge is not None and max(img_to_save.size) > max_long_edge:
+            img_to_save.thumbnail((max_long_edge, max_long_edge), Image.LANCZOS)
+
+        save_options = {}
+        if quality is not None:
+            save_options['quality'] = quality
+        if progressive:
+            save_options['progressive'] = True
+        if optimize:
+            save_options['optimize'] = True
+
+        output = BytesIO()
+        img_to_save.save(output, "JPEG", **save_options)
+        if unchanged:
+            original = _original_bytes(source)
+            if len(original.getvalue()) <= len(output.getvalue()):
+                return original
+        output.seek(0)
+        return output
+    except FileNotFoundError:
+        print(f"错误: 文件未找到 {source}")
+        return None
+    except Exception as e:
+        print(f"转换过程中发生错误: {e}")
+        return None
+
 def convert_to_jpg(file_path):
     """
     将给定路径的图片转换为JPG格式。
@@ -30,29 +148,8 @@ def convert_to_jpg(file_path):
         # 构建输出文件名，将扩展名更改为 .jpg
         output_path = file_name + ".jpg"
         
-        # 如果图像有alpha通道（例如PNG的透明度），转换为RGB
-        if img.mode == 'RGBA' or img.mode == 'LA' or (img.mode == 'P' and 'transparency' in img.info):
-            # 创建一个白色背景的图像
-            background = Image.new("RGB", img.size, (255, 255, 255))
-            # 将原始图像粘贴到背景上（处理透明度）
-            # 如果img是P模式且有透明度，先转为RGBA
-            if img.mode == 'P' and 'transparency' in img.info:
-                img = img.convert("RGBA")
-            
-            # 获取alpha通道作为mask
-            if img.mode == 'RGBA':
-                alpha_mask = img.split()[3]
-            elif img.mode == 'LA': # LA模式，第二个通道是alpha
-                 alpha_mask = img.split()[1]
-            else: # 其他情况（如P模式转换后的RGBA）
-                 alpha_mask = None # 或者根据具体情况处理
-
-            background.paste(img, mask=alpha_mask)
-            img_to_save = background
-        else:
-            # 如果已经是RGB或可以安全转换为RGB
-            img_to_save = img.convert('RGB')
-            
+        img_to_save = flatten_to_rgb(img)
+
         img_to_save.save(output_path, "JPEG")
         print(f"图片已成功转换为JPG格式并保存到: {output_path}")
         return output_path
@@ -0,0 +1,358 @@
+# uploads.py
+import hashlib
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import namedtuple
+from io import BytesIO
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+# 每次从上传流中读取的字节数
+CHUNK_SIZE = 64 * 1024
+
+# 接收完成的上传：source 为保存的文件路径或内存中的图片字节，
+# digest 为原始字节的 BLAKE2 摘要（可作为分析结果缓存的键），image_type 为嗅探出的格式
+Upload = namedtuple('Upload', ['source', 'digest', 'size', 'image_type'])
+
+
+class UnsupportedImageError(ValueError):
+    """上传内容不是支持的图片格式"""
+
+
+def sniff_image_type(head):
+    """
+    根据文件头的魔数判断图片格式，不依赖文件扩展名。
+
+    返回:
+    str or None: 'jpg'、'png'、'webp'，无法识别时返回None。
+    """
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+# 嗅探图片格式需要的文件头字节数
+SNIFF_BYTES = 12
+
+
+class IncomingUpload:
+    """
+    边到达边处理的上传文件：每个数据块到达时即计算摘要并写入磁盘或内存，
+    文件头一到就嗅探格式。实现了 write/seek/close，可直接作为 werkzeug
+    multipart 解析的文件流（见 app.UploadRequest），请求体读完时摘要也已算好，
+    内容只写入一次。文件头不是支持的图片格式时，后续数据直接丢弃。
+    """
+
+    def __init__(self, folder=None):
+        """
+        参数:
+        folder (str, optional): 写入目录；为None时内容只保存在内存中。
+        """
+        self.folder = folder
+        self.size = 0
+        self.image_type = None
+        self.rejected = False
+        self.path = None
+        self._head = b''
+        self._digest = hashlib.blake2b(digest_size=20)
+        self._sink = None
+        self._upload = None
+
+    def write(self, data):
+        if self.rejected:
+            return len(data)
+        self.size += len(data)
+        self._digest.update(data)
+        if self._sink is not None:
+            self._sink.write(data)
+        else:
+            self._head += data
+            if len(self._head) >= SNIFF_BYTES:
+                self._open()
+        return len(data)
+
+    def _open(self):
+        self.image_type = sniff_image_type(self._head)
+        if self.image_type is None:
+            self.rejected = True
+        else:
+            if self.folder is None:
+                self._sink = BytesIO()
+            else:
+                self.path = os.path.join(self.folder, f"{uuid.uuid4()}.{self.image_type}")
+                self._sink = open(self.path, 'wb')
+            self._sink.write(self._head)
+        self._head = b''
+
+    def seek(self, offset, whence=0):
+        # werkzeug 写完文件后会把流指针移回开头；内容由 finish() 取出，这里无需移动
+        return 0
+
+    def finish(self):
+        """
+        结束接收，返回 Upload（source 为写入的文件路径或内存中的图片字节），
+        文件的所有权随之交给调用方。
+
+        异常:
+        UnsupportedImageError: 文件头不是支持的图片格式。
+        """
+        if self._upload is not None:
+            return self._upload
+        if self._sink is None and not self.rejected:
+            # 整个文件比 SNIFF_BYTES 还短
+            self._open()
+        if self.rejected:
+            raise UnsupportedImageError('不支持的文件类型')
+
+        if self.folder is None:
+            source = self._sink.getvalue()
+        else:
+            self._sink.close()
+            source = self.path
+        self._upload = Upload(source, self._digest.hexdigest(), self.size, self.image_type)
+        return self._upload
+
+    def close(self):
+        """释放资源；未经 finish() 取走的文件（如请求中多余的文件字段）被删除"""
+        if self._sink is not None:
+            self._sink.close()
+        if self.path is not None and self._upload is None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def receive_upload(stream, upload_folder=None, chunk_size=CHUNK_SIZE):
+    """
+    分块接收上传流：先嗅探文件头，再边读边计算摘要，写入磁盘或内存。
+
+    参数:
+    stream: 可读的二进制流。
+    upload_folder (str, optional): 保存目录；为None时内容只保存在内存中（source 为 bytes），
+        可以同时交给多个图片处理流程，不产生中间文件。
+    chunk_size (int): 每次读取的字节数。
+
+    返回:
+    Upload: 接收结果。
+
+    异常:
+    UnsupportedImageError: 文件头不是支持的图片格式，此时不会继续读取剩余内容。
+    """
+    incoming = IncomingUpload(upload_folder)
+    try:
+        chunk = stream.read(chunk_size)
+        while chunk:
+            incoming.write(chunk)
+            if incoming.rejected:
+                break
+            chunk = stream.read(chunk_size)
+        return incoming.finish()
+    finally:
+        incoming.close()
+
+
+class UploadStore:
+    """
+    上传文件目录的生命周期管理。
+
+    文件按内容摘要的前几位分散到子目录（如 image/ab/cd/<摘要>.jpg），避免单个目录
+    文件过多；开启去重时相同内容只保存一份。后台清理线程定期删除超过最长保存时间
+    的文件，并在总大小超过上限时从最旧的文件开始删除，使磁盘占用保持稳定。
+    """
+
+    # 接收中的文件先写入这个子目录，接收完成后再移动到最终位置
+    INCOMING_DIR = '.incoming'
+
+    def __init__(self, root, max_age_seconds=24 * 3600, max_total_bytes=1024 ** 3,
+                 dedup=True, shard_depth=2, min_age_seconds=60, pinned=None):
+        """
+        参数:
+        root (str): 上传根目录。
+        max_age_seconds (float, optional): 文件最长保存时间，None 表示不按时间清理。
+        max_total_bytes (int, optional): 目录总大小上限，None 表示不限制。
+        dedup (bool): 是否按内容摘要去重。
+        shard_depth (int): 子目录层数，每层取摘要的两位十六进制字符。
+        min_age_seconds (float): 按总大小清理时跳过比这更新的文件，避免删掉正在分析的上传。
+        pinned (callable, optional): 返回当前不能删除的文件路径，如排队中的后台任务引用的上传；
+            清理时无论文件多旧都跳过它们。
+        """
+        self.root = os.path.abspath(root)
+        self.max_age_seconds = max_age_seconds
+        self.max_total_bytes = max_total_bytes
+        self.dedup = dedup
+        self.shard_depth = shard_depth
+        self.min_age_seconds = min_age_seconds
+        self.pinned = pinned
+        self._incoming = os.path.join(self.root, self.INCOMING_DIR)
+        os.makedirs(self._incoming, exist_ok=True)
+        self._janitor = None
+        self._stop = threading.Event()
+
+    def path_for(self, digest, image_type):
+        """根据内容摘要计算文件的保存路径"""
+        name = digest if self.dedup else uuid.uuid4().hex
+        shards = [name[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, *shards, f"{name}.{image_type}")
+
+    def incoming(self):
+        """在接收目录中新建一个 IncomingUpload，接收完后交给 commit()"""
+        return IncomingUpload(self._incoming)
+
+    def save(self, stream, chunk_size=CHUNK_SIZE):
+        """分块接收上传流并保存到分片目录，返回 Upload（source 为最终路径）"""
+        return self.commit(receive_upload(stream, self._incoming, chunk_size))
+
+    def commit(self, upload):
+        """
+        把接收完的上传移动（内存中的上传则写入）到分片目录，返回 source 为最终路径的 Upload。
+        开启去重时，已存在的相同内容只刷新修改时间，不再保存新文件。
+        """
+        path = self.path_for(upload.digest, upload.image_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        in_memory = isinstance(upload.source, bytes)
+        if self.dedup and os.path.exists(path):
+            try:
+                # 刷新修改时间，让清理线程把它当作新上传
+                os.utime(path)
+                if not in_memory:
+                    os.remove(upload.source)
+                return upload._replace(source=path)
+            except FileNotFoundError:
+                # 恰好被清理线程删除，改为保存这次上传的文件
+                pass
+        if in_memory:
+            incoming = os.path.join(self._incoming, f"{uuid.uuid4()}.{upload.image_type}")
+            with open(incoming, 'wb') as f:
+                f.write(upload.source)
+            os.replace(incoming, path)
+        else:
+            os.replace(upload.source, path)
+        return upload._replace(source=path)
+
+    def _files(self):
+        """列出目录中的全部文件 (路径, 大小, 修改时间)，包括旧版本直接放在根目录的上传"""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root and self.INCOMING_DIR in dirnames:
+                dirnames.remove(self.INCOMING_DIR)
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _remove_stale_incoming(self, now):
+        """删除接收目录中超过 min_age_seconds 未再写入的文件（如异常中断的请求留下的半个文件）"""
+        removed_files = 0
+        removed_bytes = 0
+        try:
+            names = os.listdir(self._incoming)
+        except FileNotFoundError:
+            return 0, 0
+        for name in names:
+            path = os.path.join(self._incoming, name)
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime < self.min_age_seconds:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed_files += 1
+            removed_bytes += stat.st_size
+        return removed_files, removed_bytes
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        # 顺便删除变空的分片目录
+        directory = os.path.dirname(path)
+        while directory != self.root and directory.startswith(self.root):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+        return True
+
+    def cleanup(self, now=None):
+        """
+        执行一次清理：先删除过期文件，再按修改时间从旧到新删除，直到总大小不超过上限；
+        接收目录中超过 min_age_seconds 未再写入的残留文件也一并删除。pinned 返回的文件不会被删除。
+
+        返回:
+        dict: 删除的文件数、释放的字节数以及清理后的文件数和总大小。
+        """
+        now = time.time() if now is None else now
+        pinned = {os.path.abspath(path) for path in self.pinned()} if self.pinned else set()
+        files = sorted(self._files(), key=lambda f: f[2])
+        removed_files, removed_bytes = self._remove_stale_incoming(now)
+
+        kept = []
+        for path, size, mtime in files:
+            if path in pinned:
+                kept.append((path, size, mtime))
+            elif self.max_age_seconds is not None and now - mtime > self.max_age_seconds:
+                if self._remove(path):
+                    removed_files += 1
+                    removed_bytes += size
+            else:
+                kept.append((path, size, mtime))
+
+        total_bytes = sum(size for _, size, _ in kept)
+        if self.max_total_bytes is not None:
+            remaining = []
+            for path, size, mtime in kept:
+                if (total_bytes > self.max_total_bytes and now - mtime >= self.min_age_seconds
+                        and path not in pinned):
+                    if self._remove(path):
+                        removed_files += 1
+                        removed_bytes += size
+                        total_bytes -= size
+                        continue
+                remaining.append((path, size, mtime))
+            kept = remaining
+
+        if removed_files:
+            print(f"上传目录清理: 删除 {removed_files} 个文件，释放 {removed_bytes} 字节")
+        return {
+            'removed_files': removed_files,
+            'removed_bytes': removed_bytes,
+            'files': len(kept),
+            'total_bytes': total_bytes,
+        }
+
+    def _run_janitor(self, interval_seconds):
+        while not self._stop.wait(interval_seconds):
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"上传目录清理失败: {e}")
+
+    def start_janitor(self, interval_seconds=300):
+        """启动后台清理线程（守护线程，重复调用无效）"""
+        if self._janitor is not None and self._janitor.is_alive():
+            return
+        self._stop.clear()
+        self._janitor = threading.Thread(target=self._run_janitor, args=(interval_seconds,),
+                                         name='upload-janitor', daemon=True)
+        self._janitor.start()
+
+    def stop_janitor(self):
+        self._stop.set()
+        if self._janitor is not None:
+            self._janitor.join()
+            self._janitor = None
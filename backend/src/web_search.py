@@ -1,13 +1,109 @@
 from typing import Any
+from contextlib import asynccontextmanager
+import asyncio
+import random
 import httpx
 from mcp.server.fastmcp import FastMCP
-from tavily import TavilyClient
 from dotenv import load_dotenv
 import os
 import json
+from result_cache import make_cache_key, search_cache_from_env
 load_dotenv()
+
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "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")
+# 同时发往 Tavily 的最大请求数，以及遇到 429/5xx 时的最大重试次数
+MAX_CONCURRENT_SEARCHES = int(os.getenv("WEB_SEARCH_MAX_CONCURRENCY", 4))
+MAX_RETRIES = int(os.getenv("WEB_SEARCH_MAX_RETRIES", 3))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("WEB_SEARCH_TIMEOUT", 60))
+
+
+class TavilySearcher:
+    """
+    在服务器整个生命周期内复用同一个异步 HTTP 客户端调用 Tavily 搜索接口。
+
+    - 相同的并发查询只发出一次上游请求，结果共享给所有等待者；
+    - 通过信号量限制同时进行的上游请求数；
+    - 遇到 429 或 5xx 时按指数退避（带抖动）重试，优先遵循 Retry-After。
+    """
+
+    def __init__(self, api_key, max_concurrency=4, max_retries=3, timeout=60.0):
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}
+
+    @property
+    def client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search(self, key, query, **params):
+        """执行搜索；key 相同的并发调用共享同一个上游请求"""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._search(query, **params))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield: 某个调用方被取消时不影响其他等待同一请求的调用方
+        return await asyncio.shield(task)
+
+    async def _search(self, query, **params):
+        payload = {"query": query, **params}
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                response = await self.client.post(TAVILY_SEARCH_URL, json=payload)
+            retryable = response.status_code == 429 or response.status_code >= 500
+            if not retryable or attempt == self.max_retries:
+                response.raise_for_status()
+                return response.json()
+            await asyncio.sleep(self._backoff_delay(response, attempt))
+
+    @staticmethod
+    def _backoff_delay(response, attempt):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return min(2 ** attempt, 30) + random.uniform(0, 1)
+
+
+searcher = TavilySearcher(TAVILY_API_KEY, MAX_CONCURRENT_SEARCHES, MAX_RETRIES,
+                          REQUEST_TIMEOUT_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(server):
+    try:
+        yield {}
+    finally:
+        await searcher.aclose()
+
 # 初始化 FastMCP 服务器
-mcp = FastMCP("web_search")
+mcp = FastMCP("web_search", lifespan=lifespan)
+
+# 搜索参数，同时作为缓存键的一部分
+SEARCH_PARAMS = {
+    "max_results": 5,
+    "search_depth": "advanced",
+    "include_answer": "advanced",
+}
+
+# 搜索结果缓存，相同的查询直接返回，不再消耗 Tavily 配额
+search_cache = search_cache_from_env()
 
 @mcp.tool()
 async def web_search(query: str) -> str:
@@ -22,18 +118,22 @@ async def web_search(query: str) -> str:
     Returns:
         str: 包含搜索结果的格式化字符串
     """
-    tavily_client = TavilyClient(api_key="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")
-    #response = tavily_client.search(query,max_results=5)
-    response = tavily_client.search(
-        query,
-        max_results=5,
-        search_depth="advanced",
-        include_answer="advanced"
-    )
+    cache_key = make_cache_key(query, **SEARCH_PARAMS)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = await searcher.search(cache_key, query, **SEARCH_PARAMS)
     #输出是一个字典，需要进行格式化成字符串
     response = json.dumps(response,indent=4)
+    search_cache.set(cache_key, response)
     return response
 
+@mcp.resource("cache://web_search/stats")
+def web_search_cache_stats() -> str:
+    """网络搜索结果缓存的命中/未命中统计"""
+    return json.dumps(search_cache.stats(), indent=4)
+
 if __name__ == "__main__":
     # 初始化并运行服务器
     mcp.run(transport='stdio')
\ No newline at end of file
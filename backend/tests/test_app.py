@@ -0,0 +1,230 @@
+# tests/test_app.py
+import asyncio
+import io
+import json
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from flask import request
+from PIL import Image
+
+import app as app_module
+import skin_core_llm
+from asgi import asgi_app
+from uploads import IncomingUpload, UploadStore
+
+
+def png_upload():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (200, 150, 120)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, 'upload_store', UploadStore(str(tmp_path)))
+    calls = {"active": 0, "peak": 0}
+
+    async def analyze_skin_with_api_async(image_path=None, client=None, content_digest=None):
+        calls["active"] += 1
+        calls["peak"] = max(calls["peak"], calls["active"])
+        await asyncio.sleep(0.2)
+        calls["active"] -= 1
+        return json.dumps({"acne": {"value": 1}})
+
+    monkeypatch.setattr(skin_core_llm, "analyze_skin_with_api_async", analyze_skin_with_api_async)
+    return calls
+
+def test_analyze_returns_local_and_api_results(fake_api):
+    client = app_module.app.test_client()
+    response = client.post('/analyze', data={'image': (io.BytesIO(png_upload()), 'face.png')},
+                           content_type='multipart/form-data')
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['api_result'] == {"acne": {"value": 1}}
+    assert 'skin_type' in body['results']
+
+def test_analyze_sniffs_content_instead_of_trusting_the_extension(fake_api, tmp_path):
+    client = app_module.app.test_client()
+    response = client.post('/analyze', data={'image': (io.BytesIO(b"MZ not an image"), 'face.png')},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert app_module.upload_store.cleanup()['files'] == 0
+
+def test_uploads_are_hashed_and_stored_while_the_form_is_parsed(fake_api):
+    with app_module.app.test_request_context('/analyze', method='POST', data={
+        'image': (io.BytesIO(png_upload()), 'face.png'),
+        'extra': (io.BytesIO(png_upload()), 'extra.png'),
+    }, content_type='multipart/form-data'):
+        stream = request.files['image'].stream
+        assert isinstance(stream, IncomingUpload)
+        assert stream.image_type == 'png' and stream.size == len(png_upload())
+        assert os.path.dirname(stream.path) == app_module.upload_store.incoming().folder
+        upload = app_module.receive_file(request.files['image'], save=True)
+
+    # 请求结束后未取走的文件被删除，取走的文件已移动到分片目录
+    assert os.listdir(os.path.dirname(stream.path)) == []
+    assert app_module.upload_store.cleanup()['files'] == 1
+    assert open(upload.source, 'rb').read() == png_upload()
+
+def test_truncated_multipart_bodies_leave_no_partial_files(fake_api):
+    boundary = 'boundary'
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; '
+            f'filename="face.png"\r\nContent-Type: image/png\r\n\r\n').encode() + png_upload()
+    client = app_module.app.test_client()
+    response = client.post('/analyze', data=body,
+                           content_type=f'multipart/form-data; boundary={boundary}')
+
+    assert response.status_code == 400
+    assert os.listdir(app_module.upload_store.incoming().folder) == []
+
+def test_analyze_rejects_oversized_uploads(fake_api, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'MAX_CONTENT_LENGTH', 1024)
+    client = app_module.app.test_client()
+    image = (io.BytesIO(png_upload() + b"\0" * 4096), 'face.png')
+    response = client.post('/analyze', data={'image': image},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 413
+    assert response.get_json()['success'] is False
+
+@pytest.mark.asyncio
+async def test_asgi_app_serves_analyses_concurrently(fake_api):
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def upload():
+            files = {'image': ('face.png', png_upload(), 'image/png')}
+            return await client.post('/analyze', files=files)
+
+        responses = await asyncio.gather(*(upload() for _ in range(4)))
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert fake_api["peak"] > 1
+
+def test_analyze_batch_reports_per_image_results(fake_api, monkeypatch):
+    async def fetch_analysis_async(image=None, client=None, content_digest=None):
+        await asyncio.sleep(0.05)
+        return {"digest": content_digest}
+
+    monkeypatch.setattr(skin_core_llm, "fetch_analysis_async", fetch_analysis_async)
+    client = app_module.app.test_client()
+    response = client.post('/analyze/batch', data={'images': [
+        (io.BytesIO(png_upload()), 'left.png'),
+        (io.BytesIO(b"not an image"), 'notes.txt'),
+        (io.BytesIO(png_upload()), 'right.png'),
+    ]}, content_type='multipart/form-data')
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [item['filename'] for item in body['items']] == ['left.png', 'notes.txt', 'right.png']
+    assert [item['success'] for item in body['items']] == [True, False, True]
+    assert body['items'][0]['api_result']['digest'] == body['items'][2]['api_result']['digest']
+    assert (body['succeeded'], body['failed']) == (2, 1)
+
+def test_jobs_endpoint_runs_full_analysis_in_background(fake_api, monkeypatch, tmp_path):
+    async def run_full_analysis(payload):
+        return {"response": f"analysed {payload['content_digest'][:8]}"}
+
+    monkeypatch.setattr(app_module, 'run_full_analysis', run_full_analysis)
+    monkeypatch.setattr(app_module, 'JOB_DB_PATH', str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(app_module, '_job_queue_task', None)
+    client = app_module.app.test_client()
+
+    response = client.post('/jobs', data={'image': (io.BytesIO(png_upload()), 'face.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+
+    for _ in range(100):
+        job = client.get(status_url).get_json()['job']
+        if job['status'] == 'succeeded':
+            break
+        time.sleep(0.02)
+    assert job['result']['response'].startswith('analysed ')
+    assert client.get('/jobs/missing').status_code == 404
+
+def test_jobs_reject_webhooks_to_internal_addresses(fake_api):
+    client = app_module.app.test_client()
+    response = client.post('/jobs', data={
+        'image': (io.BytesIO(png_upload()), 'face.png'),
+        'webhook_url': 'http://169.254.169.254/latest/meta-data/',
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_call_api_false_skips_the_api_on_every_path(fake_api, monkeypatch, tmp_path):
+    import config_loader
+
+    async def paid_api(*args, **kwargs):
+        raise AssertionError("call_api 为 false 时不应调用皮肤分析API")
+
+    monkeypatch.setattr(config_loader.AppConfig, 'local_analysis_call_api',
+                        property(lambda self: False))
+    monkeypatch.setattr(skin_core_llm, "analyze_skin_with_api_async", paid_api)
+    monkeypatch.setattr(skin_core_llm, "fetch_analysis_async", paid_api)
+    client = app_module.app.test_client()
+
+    images = [(io.BytesIO(png_upload()), 'left.png')]
+    response = client.post('/analyze/batch', data={'images': images},
+                           content_type='multipart/form-data')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['items'][0]['success'] is True and 'skin_type' in body['items'][0]['results']
+    assert 'api_result' not in body['items'][0]
+
+    payload = {'image_path': app_module.upload_store.save(io.BytesIO(png_upload())).source}
+    bridge = AsyncMock()
+    bridge.process_message.return_value = "建议"
+    with patch('mcp_llm_bridge.bridge.BridgeManager') as MockManager, \
+         patch('mcp_llm_bridge.session_pool.get_session_pool'):
+        MockManager.return_value.__aenter__.return_value = bridge
+        result = asyncio.run(app_module.run_full_analysis(payload))
+    assert result['response'] == "建议"
+    assert 'skin_type' in result['analysis']
+
+def test_closing_a_streamed_response_cancels_the_background_task():
+    import threading
+
+    stopped = threading.Event()
+    produced = []
+
+    async def endless():
+        try:
+            while True:
+                produced.append(len(produced))
+                yield "delta"
+                await asyncio.sleep(0.01)
+        finally:
+            stopped.set()
+
+    response = app_module.app.response_class(app_module.iterate_async(endless))
+    assert next(iter(response.response)) == "delta"
+    response.close()
+
+    assert stopped.wait(2)
+    count = len(produced)
+    time.sleep(0.05)
+    assert len(produced) == count
+
+def test_shutdown_closes_pools_on_the_background_loop():
+    from mcp import StdioServerParameters
+
+    from mcp_llm_bridge.config import LLMConfig
+    from mcp_llm_bridge.llm_client import get_shared_http_client
+    from mcp_llm_bridge.session_pool import get_session_pool
+
+    async def open_pools():
+        pool = get_session_pool(StdioServerParameters(command="python", args=["server.py"]))
+        return pool, get_shared_http_client(LLMConfig(api_key="key", model="model"))
+
+    loop = app_module.get_async_loop()
+    pool, http_client = asyncio.run_coroutine_threadsafe(open_pools(), loop).result()
+    app_module.close_async_resources()
+
+    assert pool._closed
+    assert http_client.is_closed
@@ -1,10 +1,22 @@
 # tests/test_bridge.py
 import pytest
 import os
+import asyncio
+import json
+import uuid
 from unittest.mock import AsyncMock, MagicMock, patch
 from mcp import StdioServerParameters
 from mcp_llm_bridge.config import BridgeConfig, LLMConfig
 from mcp_llm_bridge.bridge import MCPLLMBridge, BridgeManager
+from mcp_llm_bridge.tool_catalog import tool_catalog_cache
+from mcp_llm_bridge.tool_dispatch import LocalTool
+
+
+@pytest.fixture(autouse=True)
+def clear_tool_catalog():
+    tool_catalog_cache.clear()
+    yield
+    tool_catalog_cache.clear()
 
 @pytest.fixture
 def mock_mcp_tool():
@@ -195,4 +207,195 @@ async def test_bridge_cleanup(mock_config):
         
         # Test cleanup
         await bridge.close()
-        mock_mcp_instance.__aexit__.assert_called_once()
\ No newline at end of file
+        mock_mcp_instance.__aexit__.assert_called_once()
+
+
+class FakeStream:
+    """Stand-in for LLMStream yielding fixed deltas"""
+    def __init__(self, deltas, response):
+        self.deltas = deltas
+        self.final_response = response
+        self.response = None
+
+    async def __aiter__(self):
+        for delta in self.deltas:
+            yield delta
+        self.response = self.final_response
+
+@pytest.mark.asyncio
+async def test_message_streaming_with_tool_calls(mock_config, mock_llm_response):
+    with patch('mcp_llm_bridge.bridge.MCPClient') as MockMCPClient, \
+         patch('mcp_llm_bridge.bridge.LLMClient') as MockLLMClient:
+
+        mock_mcp_instance = AsyncMock()
+        mock_mcp_instance.call_tool.return_value = "tool_result"
+
+        mock_llm_response.is_tool_call = True
+        final_response = MagicMock(is_tool_call=False, tool_calls=None)
+
+        mock_llm_instance = MagicMock()
+        mock_llm_instance.invoke_stream_with_prompt.return_value = FakeStream(
+            ["Checking"], mock_llm_response
+        )
+        mock_llm_instance.invoke_stream.return_value = FakeStream(
+            ["Final ", "response"], final_response
+        )
+
+        MockMCPClient.return_value = mock_mcp_instance
+        MockLLMClient.return_value = mock_llm_instance
+
+        bridge = MCPLLMBridge(mock_config)
+        bridge.tool_name_mapping = {"test_tool": "test_tool"}
+
+        deltas = [delta async for delta in bridge.process_message_stream("Test message")]
+
+        assert deltas == ["Checking", "Final ", "response"]
+        mock_llm_instance.invoke_stream_with_prompt.assert_called_once_with("Test message")
+        mock_llm_instance.invoke_stream.assert_called_once_with(
+            [{"tool_call_id": "call_1", "output": "tool_result"}]
+        )
+
+def make_tool_call(call_id, arguments):
+    tool_call = MagicMock()
+    tool_call.id = call_id
+    tool_call.function = MagicMock()
+    tool_call.function.name = "test_tool"
+    tool_call.function.arguments = arguments
+    return tool_call
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls(mock_config):
+    mock_config.max_concurrent_tool_calls = 2
+    mock_config.tool_call_timeout = 0.5
+    with patch('mcp_llm_bridge.bridge.MCPClient') as MockMCPClient:
+        running = 0
+        max_running = 0
+
+        async def call_tool(name, arguments):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            try:
+                await asyncio.sleep(arguments["delay"])
+                if arguments.get("fail"):
+                    raise RuntimeError("boom")
+                return f"done {arguments['delay']}"
+            finally:
+                running -= 1
+
+        mock_mcp_instance = AsyncMock()
+        mock_mcp_instance.call_tool.side_effect = call_tool
+        MockMCPClient.return_value = mock_mcp_instance
+
+        bridge = MCPLLMBridge(mock_config)
+        bridge.tool_name_mapping = {"test_tool": "test_tool"}
+
+        tool_calls = [
+            make_tool_call("call_1", '{"delay": 0.05}'),
+            make_tool_call("call_2", '{"delay": 0.01, "fail": true}'),
+            make_tool_call("call_3", '{"delay": 5}'),
+            make_tool_call("call_4", '{"delay": 0.01}'),
+        ]
+        tool_responses = await bridge._handle_tool_calls(tool_calls)
+
+        tool_call_ids = [r["tool_call_id"] for r in tool_responses]
+        assert tool_call_ids == ["call_1", "call_2", "call_3", "call_4"]
+        assert tool_responses[0]["output"] == "done 0.05"
+        assert tool_responses[1]["output"] == "Error: boom"
+        assert tool_responses[2]["output"].startswith("Error: Tool call timed out")
+        assert tool_responses[3]["output"] == "done 0.01"
+        assert max_running == 2
+
+@pytest.mark.asyncio
+async def test_local_tools_run_in_process(mock_config, mock_mcp_tool):
+    with patch('mcp_llm_bridge.bridge.MCPClient') as MockMCPClient:
+        mock_mcp_instance = AsyncMock()
+        mock_mcp_instance.get_available_tools.return_value = [mock_mcp_tool]
+        MockMCPClient.return_value = mock_mcp_instance
+
+        async def echo(arguments):
+            return {"echo": arguments["text"], "rows": [[1, "é"]]}
+
+        bridge = MCPLLMBridge(mock_config)
+        bridge.register_local_tool(LocalTool(
+            "local-echo", "Echo the text",
+            {"type": "object", "properties": {"text": {"type": "string"}}}, echo
+        ))
+        assert await bridge.initialize()
+
+        advertised = {tool["function"]["name"] for tool in bridge.llm_client.tools}
+        assert advertised == {"test_tool", "query_database", "local_echo"}
+
+        tool_call = make_tool_call("call_1", '{"text": "hi"}')
+        tool_call.function.name = "local_echo"
+        responses = await bridge._handle_tool_calls([tool_call])
+
+        assert json.loads(responses[0]["output"]) == {"echo": "hi", "rows": [[1, "é"]]}
+        mock_mcp_instance.call_tool.assert_not_called()
+        assert bridge.get_tool_stats()["local_echo"]["route"] == "local"
+
+@pytest.mark.asyncio
+async def test_local_tool_shadows_mcp_tool(mock_config, mock_mcp_tool):
+    with patch('mcp_llm_bridge.bridge.MCPClient') as MockMCPClient:
+        mock_mcp_instance = AsyncMock()
+        mock_mcp_instance.get_available_tools.return_value = [mock_mcp_tool]
+        MockMCPClient.return_value = mock_mcp_instance
+
+        bridge = MCPLLMBridge(mock_config)
+        bridge.register_local_tool(
+            LocalTool("test-tool", "Local version", {"type": "object"}, AsyncMock())
+        )
+        assert await bridge.initialize()
+
+        names = [tool["function"]["name"] for tool in bridge.llm_client.tools]
+        assert names.count("test_tool") == 1
+
+@pytest.mark.asyncio
+async def test_tool_latency_counters(mock_config):
+    with patch('mcp_llm_bridge.bridge.MCPClient') as MockMCPClient:
+        mock_mcp_instance = AsyncMock()
+        mock_mcp_instance.call_tool.side_effect = ["ok", RuntimeError("boom")]
+        MockMCPClient.return_value = mock_mcp_instance
+
+        bridge = MCPLLMBridge(mock_config)
+        bridge.tool_name_mapping = {"test_tool": "test_tool"}
+        unknown = make_tool_call("call_3", "{}")
+        unknown.function.name = "made_up_tool"
+        await bridge._handle_tool_calls(
+            [make_tool_call("call_1", "{}"), make_tool_call("call_2", "{}"), unknown]
+        )
+
+        stats = bridge.get_tool_stats()
+        assert set(stats) == {"test_tool"}  # unknown names are not counted
+        assert stats["test_tool"]["route"] == "mcp"
+        assert stats["test_tool"]["calls"] == 2
+        assert stats["test_tool"]["errors"] == 1
+        assert 0 <= stats["test_tool"]["mean_seconds"] <= stats["test_tool"]["max_seconds"]
+
+@pytest.mark.asyncio
+async def test_each_bridge_advertises_its_own_local_tools(mock_config, mock_mcp_tool):
+    # A server key no other test uses, so the shared catalogue cache may hold anything
+    mock_config.mcp_server_params = StdioServerParameters(
+        command="uvx", args=["mcp-server-sqlite", "--db-path", f"{uuid.uuid4()}.db"], env=None
+    )
+    with patch('mcp_llm_bridge.bridge.MCPClient') as MockMCPClient:
+        mock_mcp_instance = AsyncMock()
+        mock_mcp_instance.get_available_tools.return_value = [mock_mcp_tool]
+        MockMCPClient.return_value = mock_mcp_instance
+
+        bridges = []
+        for name in ["alpha", "beta"]:
+            bridge = MCPLLMBridge(mock_config)
+            bridge.register_local_tool(
+                LocalTool(name, f"The {name} tool", {"type": "object"}, AsyncMock())
+            )
+            assert await bridge.initialize()
+            bridges.append(bridge)
+
+        mock_mcp_instance.get_available_tools.assert_called_once()
+        first, second = (
+            {tool["function"]["name"] for tool in bridge.llm_client.tools} for bridge in bridges
+        )
+        assert first == {"test_tool", "query_database", "alpha"}
+        assert second == {"test_tool", "query_database", "beta"}
+        assert "alpha" not in bridges[1].tool_name_mapping
@@ -0,0 +1,54 @@
+# tests/test_config_loader.py
+import os
+
+import pytest
+
+from config_loader import get_app_config, reload_app_config
+
+CONFIG_TEMPLATE = """
+api_settings:
+  url: "{url}"
+  key: test-key
+default_image:
+  path: "./image/1.png"
+"""
+
+def write_config(path, url, mtime=None):
+    path.write_text(CONFIG_TEMPLATE.format(url=url), encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.yaml"
+    write_config(path, "https://a.example.com", mtime=1_000_000_000)
+    return path
+
+def test_config_is_loaded_once(config_path, capsys):
+    first = get_app_config(str(config_path))
+    capsys.readouterr()
+    second = get_app_config(str(config_path))
+
+    assert first is second
+    assert capsys.readouterr().out == ""
+
+def test_config_reloads_when_file_changes(config_path):
+    first = get_app_config(str(config_path))
+    write_config(config_path, "https://b.example.com", mtime=2_000_000_000)
+    second = get_app_config(str(config_path))
+
+    assert second is not first
+    assert first.api_url == "https://a.example.com"
+    assert second.api_url == "https://b.example.com"
+
+def test_invalid_reload_keeps_previous_config(config_path):
+    first = get_app_config(str(config_path))
+    config_path.write_text("api_settings: {}\n", encoding="utf-8")
+    os.utime(config_path, ns=(3_000_000_000, 3_000_000_000))
+
+    assert get_app_config(str(config_path)) is first
+    assert reload_app_config(str(config_path)) is first
+
+def test_forced_reload(config_path):
+    first = get_app_config(str(config_path))
+    assert reload_app_config(str(config_path)) is not first
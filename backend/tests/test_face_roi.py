@@ -0,0 +1,91 @@
+# tests/test_face_roi.py
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import face_roi
+import skin_metrics
+from face_roi import FaceBox, analyze_face, crop_to_face, detect_face, face_region_masks
+from to_jpg import normalize_to_jpeg
+
+SKIN_TONE = (224, 172, 140)
+BACKGROUND = (60, 90, 150)
+
+def portrait(size=(600, 400), face=(300, 80, 460, 280)):
+    """蓝色背景上的一个肤色椭圆"""
+    image = Image.new("RGB", size, BACKGROUND)
+    ImageDraw.Draw(image).ellipse(face, fill=SKIN_TONE)
+    return image
+
+def test_skin_detector_finds_the_face():
+    face = detect_face(portrait(), detector="skin")
+
+    assert face is not None
+    assert abs(face.left - 300) <= 10 and abs(face.right - 460) <= 10
+    assert abs(face.top - 80) <= 15 and face.bottom <= 290
+
+def test_no_face_returns_original_image():
+    image = Image.new("RGB", (200, 100), BACKGROUND)
+    cropped, face = crop_to_face(image, detector="skin")
+    assert face is None
+    assert cropped is image
+
+def test_crop_is_clamped_to_image_and_face_is_in_crop_coordinates():
+    image = portrait(face=(0, 80, 160, 280))
+    cropped, face = crop_to_face(image, padding=0.3, detector="skin")
+
+    assert cropped.width < image.width
+    assert face.left == 0  # 左侧超出原图的部分被截掉，没有填充
+    assert 0 < face.right <= cropped.width and 0 < face.bottom <= cropped.height
+
+def test_region_masks_are_cached_and_read_only():
+    masks = face_region_masks(128, 0.3)
+
+    assert face_region_masks(128, 0.3) is masks
+    assert set(masks) == set(face_roi.FACE_REGION_BOXES)
+    with pytest.raises(ValueError):
+        masks["nose"][0, 0] = True
+    with pytest.raises(TypeError):
+        masks["nose"] = None
+
+def test_face_masks_slice_the_square_for_clamped_crops():
+    face = FaceBox(-20, 10, 80, 110)  # 人脸贴着左边界，正方形左侧被截掉
+    rgb = np.full((150, 110, 3), np.array(SKIN_TONE) / 255.0, dtype=np.float32)
+
+    masks = face_roi.face_masks(rgb, face, padding=0.3)
+
+    assert all(mask.shape == (150, 110) for mask in masks.values())
+    assert masks["right_cheek"].any() and masks["forehead"].any()
+
+def test_analyze_face_only_uses_face_pixels():
+    buffer = io.BytesIO()
+    portrait().save(buffer, format="PNG")
+
+    result = analyze_face(buffer.getvalue(), max_long_edge=300, detector="skin")
+
+    assert result["face_detected"] is True
+    assert set(result["regions"]) == set(face_roi.FACE_REGION_BOXES)
+    # 背景被裁掉，皮肤像素占比明显高于整幅图片
+    whole_image = skin_metrics.analyze_image(buffer.getvalue(), 300)
+    assert result["skin_ratio"] > 2 * whole_image["skin_ratio"]
+
+def test_normalize_to_jpeg_crops_to_face(monkeypatch):
+    monkeypatch.setattr(face_roi, "cv2", None)
+    buffer = io.BytesIO()
+    portrait().save(buffer, format="JPEG", quality=95)
+
+    full = normalize_to_jpeg(buffer.getvalue(), quality=90)
+    cropped = normalize_to_jpeg(buffer.getvalue(), quality=90, crop_face=True)
+
+    with Image.open(cropped) as img:
+        assert img.width < 400 and img.height < 400
+    assert len(cropped.getvalue()) < len(full.getvalue())
+
+def test_normalize_to_jpeg_keeps_close_ups_unchanged(monkeypatch):
+    monkeypatch.setattr(face_roi, "cv2", None)
+    buffer = io.BytesIO()
+    portrait(size=(200, 240), face=(10, 10, 190, 230)).save(buffer, format="JPEG")
+
+    assert normalize_to_jpeg(buffer.getvalue(), crop_face=True).getvalue() == buffer.getvalue()
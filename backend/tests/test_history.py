@@ -0,0 +1,87 @@
+# tests/test_history.py
+from mcp_llm_bridge.history import HistoryManager, estimate_tokens
+
+
+def make_turn(index, with_tool=False):
+    messages = [{"role": "user", "content": f"question {index} " + "x" * 400}]
+    if with_tool:
+        tool_calls = [{"id": f"call_{index}", "type": "function"}]
+        messages.append({"role": "assistant", "content": "", "tool_calls": tool_calls})
+        messages.append({"role": "tool", "content": "r" * 400, "tool_call_id": f"call_{index}"})
+    messages.append({"role": "assistant", "content": f"answer {index}", "tool_calls": None})
+    return messages
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("皮肤分析") == 4
+
+def test_no_budget_keeps_everything():
+    history = HistoryManager(token_budget=None)
+    messages = make_turn(1) + make_turn(2)
+    assert history.compact("system", messages) == messages
+
+def test_compaction_drops_oldest_turns_and_keeps_tool_pairs():
+    history = HistoryManager(token_budget=400)
+    messages = make_turn(1, with_tool=True) + make_turn(2, with_tool=True) + make_turn(3)
+
+    compacted = history.compact("system", messages)
+
+    assert compacted[-len(make_turn(3)):] == messages[-len(make_turn(3)):]
+    assert len(compacted) < len(messages)
+    # A tool result never survives without the assistant message that requested it
+    for i, message in enumerate(compacted):
+        if message["role"] == "tool":
+            assert compacted[i - 1]["role"] in ("assistant", "tool")
+    assert compacted[0]["role"] != "tool"
+
+def test_latest_turn_is_always_kept():
+    history = HistoryManager(token_budget=10)
+    messages = make_turn(1) + make_turn(2, with_tool=True)
+    assert history.compact("system", messages) == make_turn(2, with_tool=True)
+
+def test_tool_output_cap():
+    history = HistoryManager(max_tool_output_chars=10)
+    assert history.cap_tool_output("short") == "short"
+    capped = history.cap_tool_output("a" * 25)
+    assert capped.startswith("a" * 10)
+    assert "truncated 15 characters" in capped
+
+def test_request_metrics():
+    history = HistoryManager()
+    metrics = history.record([{"role": "user", "content": "hello"}], dropped_messages=2)
+    assert metrics.messages == 1
+    assert metrics.bytes > 0
+    assert metrics.dropped_messages == 2
+    history.record([{"role": "user", "content": "hello again"}])
+    assert history.total_requests == 2
+    assert history.total_bytes > metrics.bytes
+
+def test_messages_are_measured_once_when_added(monkeypatch):
+    import mcp_llm_bridge.history as history_module
+
+    calls = []
+    measure = history_module.message_size
+    monkeypatch.setattr(history_module, "message_size",
+                        lambda message: calls.append(message) or measure(message))
+    history = HistoryManager(token_budget=10_000)
+    messages = [history.add(message) for message in make_turn(1, with_tool=True) + make_turn(2)]
+    assert len(calls) == len(messages)
+
+    for _ in range(3):
+        assert history.compact("system", messages) == messages
+        history.record([{"role": "system", "content": "system"}, *messages])
+    # Only the system prompt is measured again, once
+    assert len(calls) == len(messages) + 1
+    assert history.history_tokens == sum(measure(message)[1] for message in messages)
+
+def test_running_total_follows_dropped_messages():
+    history = HistoryManager(token_budget=400)
+    messages = [history.add(message) for message in make_turn(1) + make_turn(2) + make_turn(3)]
+
+    compacted = history.compact("system", messages)
+    for message in messages[:len(messages) - len(compacted)]:
+        history.forget(message)
+
+    assert history.history_tokens == sum(history.size(message)[1] for message in compacted)
+    assert history.compact("system", compacted) is compacted
@@ -0,0 +1,211 @@
+# tests/test_job_queue.py
+import asyncio
+import os
+import socket
+import threading
+
+import httpx
+import pytest
+
+from job_queue import (
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobQueue,
+    JobQueueFull,
+    JobStore,
+    webhook_error,
+    worker_id,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    yield store
+    store.close()
+
+async def wait_for_status(store, job_id, status, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while store.get(job_id)["status"] != status:
+        assert asyncio.get_running_loop().time() < deadline, store.get(job_id)
+        await asyncio.sleep(0.01)
+    return store.get(job_id)
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_the_background_and_record_results(store):
+    async def handler(payload):
+        if payload["fail"]:
+            raise RuntimeError("皮肤分析API调用失败")
+        return {"echo": payload["value"]}
+
+    queue = JobQueue(store, handler, workers=2)
+    await queue.start()
+    try:
+        ok = await queue.submit({"value": 1, "fail": False})
+        broken = await queue.submit({"value": 2, "fail": True})
+
+        assert (await wait_for_status(store, ok, SUCCEEDED))["result"] == {"echo": 1}
+        assert (await wait_for_status(store, broken, FAILED))["error"] == "皮肤分析API调用失败"
+    finally:
+        await queue.stop()
+
+@pytest.mark.asyncio
+async def test_submit_applies_backpressure_when_queue_is_full(store):
+    release = asyncio.Event()
+
+    async def handler(payload):
+        await release.wait()
+        return None
+
+    queue = JobQueue(store, handler, workers=1, max_pending=1)
+    await queue.start()
+    try:
+        running = await queue.submit({})
+        await wait_for_status(store, running, RUNNING)
+        await queue.submit({})
+        with pytest.raises(JobQueueFull):
+            await queue.submit({})
+        release.set()
+        await wait_for_status(store, running, SUCCEEDED)
+    finally:
+        await queue.stop()
+
+@pytest.mark.asyncio
+async def test_restart_resumes_queued_and_interrupted_jobs(store):
+    # 进程号超出 pid_max，模拟已经退出的工作进程
+    dead_worker = f"{socket.gethostname()}:99999999"
+    queued = store.create({"value": "queued"})
+    exhausted = store.create({"value": "exhausted"})
+    for _ in range(2):
+        store.claim(exhausted, dead_worker)
+        store.recover(max_attempts=10)
+    assert store.claim(exhausted, dead_worker)
+    interrupted = store.create({"value": "interrupted"})
+    assert store.claim(interrupted, dead_worker)
+
+    async def handler(payload):
+        return payload["value"]
+
+    queue = JobQueue(store, handler, max_attempts=3)
+    await queue.start()
+    try:
+        assert (await wait_for_status(store, queued, SUCCEEDED))["result"] == "queued"
+        resumed = await wait_for_status(store, interrupted, SUCCEEDED)
+        assert resumed["attempts"] == 2
+        assert store.get(exhausted)["status"] == FAILED
+    finally:
+        await queue.stop()
+
+@pytest.mark.asyncio
+async def test_jobs_time_out(store):
+    async def handler(payload):
+        await asyncio.sleep(10)
+
+    queue = JobQueue(store, handler, job_timeout=0.05)
+    await queue.start()
+    try:
+        job_id = await queue.submit({})
+        assert "超时" in (await wait_for_status(store, job_id, FAILED))["error"]
+    finally:
+        await queue.stop()
+
+def test_jobs_of_a_restarted_process_with_the_same_pid_are_recovered(store):
+    # 容器重启后主机名和进程号不变，只有启动标识不同
+    previous_boot = f"{socket.gethostname()}:{os.getpid()}:previous-boot"
+    legacy = store.create({})
+    assert store.claim(legacy, f"{socket.gethostname()}:{os.getpid()}")
+    restarted = store.create({})
+    assert store.claim(restarted, previous_boot)
+    running = store.create({})
+    assert store.claim(running, worker_id())
+
+    assert store.recover(max_attempts=3) == 2
+    statuses = [store.get(job)["status"] for job in (legacy, restarted, running)]
+    assert statuses == [QUEUED, QUEUED, RUNNING]
+
+def test_stopping_the_app_queue_releases_running_jobs(store, monkeypatch, tmp_path):
+    import app as app_module
+
+    started = threading.Event()
+
+    async def run_full_analysis(payload):
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(app_module, 'run_full_analysis', run_full_analysis)
+    monkeypatch.setattr(app_module, 'JOB_DB_PATH', str(tmp_path / "app-jobs.db"))
+    monkeypatch.setattr(app_module, '_job_queue_task', None)
+    job_queue = app_module.start_job_queue()
+    loop = app_module.get_async_loop()
+    job_id = asyncio.run_coroutine_threadsafe(job_queue.submit({}), loop).result()
+    assert started.wait(2)
+
+    app_module.stop_job_queue()
+
+    reopened = JobStore(str(tmp_path / "app-jobs.db"))
+    try:
+        job = reopened.get(job_id)
+        assert (job["status"], job["owner"]) == (QUEUED, None)
+    finally:
+        reopened.close()
+
+def test_uploads_of_pending_jobs_survive_the_janitor(monkeypatch, tmp_path):
+    import io
+
+    import app as app_module
+    from uploads import UploadStore
+
+    monkeypatch.setattr(app_module, 'JOB_DB_PATH', str(tmp_path / "app-jobs.db"))
+    uploads = UploadStore(str(tmp_path / "uploads"), max_age_seconds=0, max_total_bytes=0,
+                          min_age_seconds=0, pinned=app_module.job_uploads)
+    queued, running, finished = (uploads.save(io.BytesIO(b"\xff\xd8\xff" + bytes([i]) * 100))
+                                 for i in range(3))
+    store = JobStore(app_module.JOB_DB_PATH)
+    try:
+        store.create({'image_path': queued.source})
+        job_id = store.create({'image_path': running.source})
+        assert store.claim(job_id, worker_id())
+        job_id = store.create({'image_path': finished.source})
+        store.finish(job_id, {})
+
+        assert store.active_payload_values('image_path') == {queued.source, running.source}
+        uploads.cleanup()
+    finally:
+        store.close()
+
+    assert os.path.exists(queued.source) and os.path.exists(running.source)
+    assert not os.path.exists(finished.source)
+
+@pytest.mark.parametrize("url, allowed_hosts, rejected", [
+    ("http://93.184.216.34/hook", None, False),
+    ("ftp://93.184.216.34/hook", None, True),
+    ("http://127.0.0.1:8080/hook", None, True),
+    ("http://10.0.0.5/hook", None, True),
+    ("http://169.254.169.254/latest/meta-data/", None, True),
+    ("http://[::ffff:192.168.1.1]/hook", None, True),
+    ("http://localhost/hook", None, True),
+    ("http://localhost/hook", {"localhost"}, False),
+    ("http://93.184.216.34/hook", {"hooks.example.com"}, True),
+])
+def test_webhook_targets_are_restricted(url, allowed_hosts, rejected):
+    assert (webhook_error(url, allowed_hosts) is not None) == rejected
+
+@pytest.mark.asyncio
+async def test_webhooks_to_private_addresses_are_not_sent(store, monkeypatch):
+    posted = []
+    monkeypatch.setattr(httpx.AsyncClient, "post", lambda self, url, **kwargs: posted.append(url))
+
+    async def handler(payload):
+        return None
+
+    queue = JobQueue(store, handler)
+    await queue.start()
+    try:
+        job_id = await queue.submit({}, webhook_url="http://127.0.0.1:8080/hook")
+        await wait_for_status(store, job_id, SUCCEEDED)
+        await asyncio.sleep(0.05)
+    finally:
+        await queue.stop()
+    assert posted == []
@@ -0,0 +1,114 @@
+# tests/test_llm_client.py
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from mcp_llm_bridge.config import LLMConfig
+from mcp_llm_bridge.llm_client import LLMClient, close_shared_http_clients
+
+
+@pytest.fixture
+def llm_config():
+    return LLMConfig(
+        api_key="test-key",
+        model="gpt-4",
+        base_url=None
+    )
+
+def make_completion(content="Final response", finish_reason="stop"):
+    message = MagicMock()
+    message.content = content
+    message.tool_calls = None
+    choice = MagicMock()
+    choice.message = message
+    choice.finish_reason = finish_reason
+    completion = MagicMock()
+    completion.choices = [choice]
+    return completion
+
+@pytest.mark.asyncio
+async def test_clients_share_http_pool(llm_config):
+    first = LLMClient(llm_config)
+    second = LLMClient(llm_config)
+    try:
+        assert first.client is not second.client
+        assert first._http_client is second._http_client
+
+        other = LLMClient(LLMConfig(api_key="test-key", model="gpt-4", max_connections=5))
+        assert other.client is not None
+        assert other._http_client is not first._http_client
+    finally:
+        await close_shared_http_clients()
+
+@pytest.mark.asyncio
+async def test_invoke_awaits_async_completion(llm_config):
+    client = LLMClient(llm_config)
+    try:
+        create = AsyncMock(return_value=make_completion())
+        client.client.chat.completions.create = create
+
+        response = await client.invoke_with_prompt("Hello")
+
+        create.assert_awaited_once()
+        assert response.content == "Final response"
+        assert client.messages[-1]["role"] == "assistant"
+    finally:
+        await close_shared_http_clients()
+
+def make_chunk(content=None, tool_calls=None, finish_reason=None):
+    delta = MagicMock()
+    delta.content = content
+    delta.tool_calls = tool_calls
+    choice = MagicMock()
+    choice.delta = delta
+    choice.finish_reason = finish_reason
+    chunk = MagicMock()
+    chunk.choices = [choice]
+    return chunk
+
+def make_tool_call_fragment(index, id=None, name=None, arguments=None):
+    fragment = MagicMock()
+    fragment.index = index
+    fragment.id = id
+    fragment.function = MagicMock()
+    fragment.function.name = name
+    fragment.function.arguments = arguments
+    return fragment
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+@pytest.mark.asyncio
+async def test_stream_accumulates_content_and_tool_calls(llm_config):
+    client = LLMClient(llm_config)
+    chunks = [
+        make_chunk(content="Let me "),
+        make_chunk(content="search."),
+        make_chunk(tool_calls=[
+            make_tool_call_fragment(0, id="call_1", name="web_search", arguments='{"qu')
+        ]),
+        make_chunk(tool_calls=[
+            make_tool_call_fragment(1, id="call_2", name="web_search",
+                                    arguments='{"query": "pores"}')
+        ]),
+        make_chunk(tool_calls=[make_tool_call_fragment(0, arguments='ery": "acne"}')]),
+        make_chunk(finish_reason="tool_calls"),
+    ]
+    try:
+        create = AsyncMock(return_value=async_iter(chunks))
+        client.client.chat.completions.create = create
+
+        stream = client.invoke_stream_with_prompt("Hello")
+        deltas = [delta async for delta in stream]
+
+        assert deltas == ["Let me ", "search."]
+        assert create.call_args.kwargs["stream"] is True
+        response = stream.response
+        assert response.is_tool_call
+        assert response.content == "Let me search."
+        assert [call.id for call in response.tool_calls] == ["call_1", "call_2"]
+        assert response.tool_calls[0].function.arguments == '{"query": "acne"}'
+        assert client.messages[-1]["tool_calls"] == response.tool_calls
+    finally:
+        await close_shared_http_clients()
@@ -0,0 +1,59 @@
+# tests/test_result_cache.py
+import time
+
+from result_cache import MemoryCache, SQLiteCache, TieredCache, make_cache_key
+
+
+def test_cache_key_normalises_query():
+    assert (make_cache_key("  Acne   Treatment ", max_results=5)
+            == make_cache_key("acne treatment", max_results=5))
+    assert make_cache_key("acne", max_results=5) != make_cache_key("acne", max_results=3)
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None  # least recently used
+    assert cache.get("a") == "1"
+
+    expired = MemoryCache(ttl_seconds=-1)
+    expired.set("a", "1")
+    assert expired.get("a") is None
+
+def test_sqlite_cache_persists(tmp_path):
+    db_path = str(tmp_path / "search_cache.db")
+    cache = SQLiteCache(db_path, ttl_seconds=60)
+    cache.set("a", "1")
+    cache.close()
+
+    reopened = SQLiteCache(db_path, ttl_seconds=60)
+    assert reopened.get("a") == "1"
+    assert len(reopened) == 1
+    reopened.close()
+
+def test_tiered_cache_and_stats(tmp_path):
+    persistent = SQLiteCache(str(tmp_path / "search_cache.db"))
+    persistent.set("key", "value")
+    cache = TieredCache(MemoryCache(), persistent)
+
+    assert cache.get("missing") is None
+    assert cache.get("key") == "value"
+    assert cache.memory.get("key") == "value"  # promoted to the memory tier
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    persistent.close()
+
+def test_sqlite_cache_size_cap(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "nested" / "cache.db"), ttl_seconds=60, max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.set(key, key)
+        time.sleep(0.001)
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
+    cache.close()
@@ -0,0 +1,83 @@
+# tests/test_session_pool.py
+import sys
+
+import pytest
+from mcp import StdioServerParameters
+
+from mcp_llm_bridge.mcp_client import MCPClient
+from mcp_llm_bridge.session_pool import MCPSessionPool, PooledSession
+
+ECHO_SERVER = '''
+from mcp.server.fastmcp import FastMCP
+mcp = FastMCP("echo")
+
+@mcp.tool()
+async def echo(text: str) -> str:
+    """Echo the text back"""
+    return text
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
+'''
+
+@pytest.fixture
+def echo_server_params(tmp_path):
+    script = tmp_path / "echo_server.py"
+    script.write_text(ECHO_SERVER)
+    return StdioServerParameters(command=sys.executable, args=[str(script)], env=None)
+
+@pytest.mark.asyncio
+async def test_pool_reuses_sessions(echo_server_params):
+    pool = MCPSessionPool(echo_server_params, size=1)
+    try:
+        sessions = []
+        for text in ["first", "second"]:
+            client = MCPClient(echo_server_params, pool=pool)
+            await client.connect()
+            sessions.append(client.session)
+            result = await client.call_tool("echo", {"text": text})
+            assert result.content[0].text == text
+            await client.__aexit__(None, None, None)
+            assert client.session is None
+
+        assert sessions[0] is sessions[1]
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_pool_restarts_dead_sessions(echo_server_params):
+    pool = MCPSessionPool(echo_server_params, size=1)
+    try:
+        async with pool.lease() as session:
+            dead = session
+        await dead.close()
+        assert not dead.alive
+
+        async with pool.lease() as session:
+            assert session is not dead
+            assert session.alive
+            result = await session.session.call_tool("echo", arguments={"text": "back"})
+            assert result.content[0].text == "back"
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_failed_start_stops_the_sessions_that_started(echo_server_params, monkeypatch):
+    started, closed = [], []
+
+    async def start(self):
+        if started:
+            raise RuntimeError("spawn failed")
+        started.append(self)
+
+    async def close(self):
+        closed.append(self)
+
+    monkeypatch.setattr(PooledSession, "start", start)
+    monkeypatch.setattr(PooledSession, "close", close)
+    pool = MCPSessionPool(echo_server_params, size=3)
+
+    with pytest.raises(RuntimeError, match="spawn failed"):
+        await pool.start()
+    assert len(started) == 1 and closed == started
+    assert pool._sessions == []
@@ -0,0 +1,214 @@
+# tests/test_skin_core_llm.py
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+import requests
+
+import skin_core_llm
+from config_loader import AppConfig
+from skin_core_llm import SkinAnalysisClient, analyze_skin_with_api
+
+
+@pytest.fixture(autouse=True)
+def fresh_analysis_cache(monkeypatch):
+    monkeypatch.setattr(skin_core_llm, "_analysis_cache", None)
+
+@pytest.fixture
+def app_cfg():
+    return AppConfig({
+        "api_settings": {
+            "url": "https://skin.example.com/analyze",
+            "key": "test-key",
+            "max_retries": 2,
+            "retry_backoff_seconds": 0,
+        },
+        "default_image": {"path": "./image/1.png"},
+    })
+
+def make_response(status_code, payload=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+    return response
+
+def test_sync_client_reuses_session_and_retries(app_cfg):
+    client = SkinAnalysisClient(app_cfg)
+    session = client.session
+    assert client.session is session
+
+    session.post = MagicMock(side_effect=[
+        make_response(503),
+        requests.exceptions.Timeout(),
+        make_response(200, {"result": {"acne": {"value": 1}}}),
+    ])
+    assert client.analyze(b"jpeg") == {"acne": {"value": 1}}
+    assert session.post.call_count == 3
+    headers = session.post.call_args.kwargs["headers"]
+    assert headers == {"ailabapi-api-key": "test-key"}
+
+def test_sync_client_does_not_retry_client_errors(app_cfg):
+    client = SkinAnalysisClient(app_cfg)
+    client.session.post = MagicMock(return_value=make_response(400))
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.analyze(b"jpeg")
+    assert client.session.post.call_count == 1
+
+@pytest.mark.asyncio
+async def test_async_client_retries_server_errors(app_cfg):
+    statuses = [500, 502, 200]
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        status = statuses.pop(0)
+        return httpx.Response(status, json={"result": {"mole": {"value": 0}}})
+
+    client = SkinAnalysisClient(app_cfg)
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        assert await client.analyze_async(b"jpeg") == {"mole": {"value": 0}}
+        assert len(requests_seen) == 3
+        assert requests_seen[0].headers["ailabapi-api-key"] == "test-key"
+    finally:
+        await client.aclose()
+
+@pytest.mark.asyncio
+async def test_async_client_gives_up_after_max_retries(app_cfg):
+    client = SkinAnalysisClient(app_cfg)
+    client._async_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(500))
+    )
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.analyze_async(b"jpeg")
+    finally:
+        await client.aclose()
+
+def test_analyze_uploads_in_memory_jpeg_without_temp_files(app_cfg, tmp_path):
+    from PIL import Image
+
+    path = tmp_path / "photo.png"
+    Image.new("RGBA", (8, 8), (255, 0, 0, 128)).save(path)
+
+    client = SkinAnalysisClient(app_cfg)
+    response = make_response(200, {"result": {"acne": {"value": 0}}})
+    client.session.post = MagicMock(return_value=response)
+
+    result = analyze_skin_with_api(str(path), client=client)
+
+    assert '"acne"' in result
+    field, (filename, upload, content_type) = client.session.post.call_args.kwargs["files"][0]
+    assert upload.getvalue()[:2] == b"\xff\xd8"
+    assert list(tmp_path.iterdir()) == [path]
+
+def test_identical_images_hit_the_analysis_cache(app_cfg, tmp_path):
+    from PIL import Image
+
+    first = tmp_path / "first.png"
+    second = tmp_path / "second.png"
+    for path in (first, second):
+        Image.new("RGB", (8, 8), (200, 150, 120)).save(path)
+
+    client = SkinAnalysisClient(app_cfg)
+    response = make_response(200, {"result": {"acne": {"value": 1}}})
+    client.session.post = MagicMock(return_value=response)
+
+    assert (analyze_skin_with_api(str(first), client=client)
+            == analyze_skin_with_api(str(second), client=client))
+    assert client.session.post.call_count == 1
+    assert skin_core_llm.get_analysis_cache(app_cfg).stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_async_analysis_shares_the_cache(app_cfg, tmp_path):
+    from PIL import Image
+
+    path = tmp_path / "photo.png"
+    Image.new("RGB", (8, 8), (200, 150, 120)).save(path)
+
+    client = SkinAnalysisClient(app_cfg)
+    response = make_response(200, {"result": {"acne": {"value": 1}}})
+    client.session.post = MagicMock(return_value=response)
+    cached = analyze_skin_with_api(str(path), client=client)
+
+    client._async_client = MagicMock()
+    assert await skin_core_llm.analyze_skin_with_api_async(str(path), client=client) == cached
+    client._async_client.post.assert_not_called()
+
+def test_content_digest_hit_skips_image_conversion(app_cfg, monkeypatch):
+    import io
+
+    from PIL import Image
+
+    client = SkinAnalysisClient(app_cfg)
+    response = make_response(200, {"result": {"acne": {"value": 1}}})
+    client.session.post = MagicMock(return_value=response)
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (200, 150, 120)).save(buffer, format="PNG")
+
+    first = analyze_skin_with_api(buffer.getvalue(), client=client, content_digest="abc")
+
+    prepare = MagicMock()
+    monkeypatch.setattr(skin_core_llm, "_prepare_image", prepare)
+    assert analyze_skin_with_api(buffer.getvalue(), client=client, content_digest="abc") == first
+    prepare.assert_not_called()
+    assert client.session.post.call_count == 1
+
+def test_analyze_many_runs_concurrently_and_isolates_failures(app_cfg, monkeypatch):
+    import threading
+    import time
+
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fetch_analysis(image=None, client=None, content_digest=None):
+        with lock:
+            active.append(image)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(image)
+        if image == "broken.png":
+            raise skin_core_llm.ImageConversionError("图片转换失败或文件不存在")
+        return {"image": image}
+
+    monkeypatch.setattr(skin_core_llm, "fetch_analysis", fetch_analysis)
+    images = ["a.png", "broken.png", "c.png", "d.png"]
+
+    report = skin_core_llm.analyze_many(images, client=SkinAnalysisClient(app_cfg),
+                                        max_concurrency=2)
+
+    assert [item["success"] for item in report["items"]] == [True, False, True, True]
+    assert report["items"][2]["result"] == {"image": "c.png"}
+    assert report["items"][1]["error"] == "图片转换失败或文件不存在"
+    assert (report["succeeded"], report["failed"]) == (3, 1)
+    assert max(peak) == 2
+    assert report["elapsed_seconds"] < report["total_item_seconds"]
+
+@pytest.mark.asyncio
+async def test_analyze_many_async_reports_http_errors(app_cfg):
+    import io
+
+    from PIL import Image
+
+    images = []
+    for colour in ((200, 150, 120), (180, 140, 110)):
+        buffer = io.BytesIO()
+        Image.new("RGB", (8, 8), colour).save(buffer, format="JPEG")
+        images.append(buffer.getvalue())
+
+    def handler(request):
+        return httpx.Response(400, json={"error": "bad image"})
+
+    client = SkinAnalysisClient(app_cfg)
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        report = await skin_core_llm.analyze_many_async(images, client=client)
+    finally:
+        await client.aclose()
+
+    assert report["failed"] == 2
+    assert report["items"][0]["error"] == "HTTP 错误: 400"
@@ -0,0 +1,68 @@
+# tests/test_skin_metrics.py
+import colorsys
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import skin_metrics
+from skin_metrics import analyze_array, analyze_image, local_std, rgb_to_hsv, rgb_to_lab
+
+SKIN_TONE = (224, 172, 140)
+
+def face_like(size=96, tone=SKIN_TONE):
+    rng = np.random.default_rng(0)
+    rgb = np.empty((size, size, 3), dtype=np.float32)
+    rgb[:] = np.array(tone, dtype=np.float32) / 255.0
+    rgb += rng.normal(0, 0.01, rgb.shape).astype(np.float32)
+    return np.clip(rgb, 0, 1)
+
+def test_hsv_matches_colorsys():
+    rng = np.random.default_rng(1)
+    rgb = rng.random((4, 5, 3), dtype=np.float32)
+    hue, saturation, value = rgb_to_hsv(rgb)
+    for y in range(4):
+        for x in range(5):
+            expected = colorsys.rgb_to_hsv(*rgb[y, x])
+            assert (hue[y, x], saturation[y, x], value[y, x]) == pytest.approx(expected, abs=1e-5)
+
+def test_lab_reference_colours():
+    rgb = np.array([[[1.0, 1.0, 1.0], [0.0, 0.0, 0.0], [1.0, 0.0, 0.0]]], dtype=np.float32)
+    lightness, a, b = rgb_to_lab(rgb)
+    assert lightness[0] == pytest.approx([100.0, 0.0, 53.24], abs=0.1)
+    assert a[0, 0] == pytest.approx(0.0, abs=0.1)
+    assert a[0, 2] == pytest.approx(80.09, abs=0.2)
+
+def test_local_std_matches_brute_force():
+    rng = np.random.default_rng(2)
+    channel = rng.random((12, 10)).astype(np.float32) * 100
+    window = 3
+    padded = np.pad(channel, 1, mode='reflect')
+    expected = np.array([[padded[y:y + window, x:x + window].std() for x in range(10)]
+                         for y in range(12)])
+    assert local_std(channel, window) == pytest.approx(expected, abs=1e-3)
+
+def test_highlights_and_redness_raise_oil_and_sensitivity():
+    matte = face_like()
+    shiny = matte.copy()
+    for y in range(10, 90, 8):
+        shiny[y:y + 3, 10:90:6] = 0.97
+    red = face_like(tone=(235, 140, 130))
+
+    baseline = analyze_array(matte)
+    assert analyze_array(shiny)['oil_level'] > baseline['oil_level']
+    assert analyze_array(red)['sensitivity_level'] > baseline['sensitivity_level']
+
+def test_analyze_image_from_bytes_reports_regions_and_histograms():
+    buffer = io.BytesIO()
+    Image.fromarray((face_like(200) * 255).astype(np.uint8)).save(buffer, format="PNG")
+
+    result = analyze_image(buffer.getvalue(), max_long_edge=64)
+
+    assert result['skin_type'] in ("干性皮肤", "油性皮肤", "中性皮肤", "混合型皮肤", "敏感性皮肤")
+    assert set(result['regions']) == set(skin_metrics.REGION_BOXES)
+    keys = ('moisture_level', 'oil_level', 'pigmentation_level', 'sensitivity_level')
+    assert all(0 <= result[key] <= 100 for key in keys)
+    assert sum(result['histograms']['hue']) == pytest.approx(1.0, abs=1e-3)
+    assert result['skin_ratio'] > 0.9
@@ -0,0 +1,82 @@
+# tests/test_to_jpg.py
+from io import BytesIO
+
+from PIL import Image
+
+from to_jpg import normalize_to_jpeg
+
+
+def encode(mode, fmt, color):
+    buffer = BytesIO()
+    Image.new(mode, (8, 8), color).save(buffer, fmt)
+    return buffer.getvalue()
+
+def test_png_with_alpha_is_flattened_on_white():
+    png = encode("RGBA", "PNG", (255, 0, 0, 0))
+    output = normalize_to_jpeg(png)
+
+    with Image.open(output) as img:
+        assert img.format == "JPEG"
+        assert img.mode == "RGB"
+        r, g, b = img.getpixel((4, 4))
+        assert min(r, g, b) > 240  # fully transparent pixels become white
+
+def test_jpeg_bytes_pass_through_unchanged():
+    jpeg = encode("RGB", "JPEG", (10, 20, 30))
+    assert normalize_to_jpeg(jpeg).getvalue() == jpeg
+
+def test_file_objects_and_paths(tmp_path):
+    webp = encode("RGB", "WEBP", (0, 128, 0))
+    stream = BytesIO(b"prefix" + webp)
+    stream.seek(len(b"prefix"))
+    from_stream = normalize_to_jpeg(stream)
+
+    path = tmp_path / "photo.webp"
+    path.write_bytes(webp)
+    from_path = normalize_to_jpeg(str(path))
+
+    assert from_stream.getvalue()[:2] == b"\xff\xd8"
+    assert from_stream.getvalue() == from_path.getvalue()
+    assert list(tmp_path.iterdir()) == [path]  # no temporary files
+
+def test_invalid_input_returns_none():
+    assert normalize_to_jpeg(b"not an image") is None
+    assert normalize_to_jpeg("/nonexistent/photo.png") is None
+
+def test_large_jpeg_is_downscaled_with_draft():
+    jpeg = encode("RGB", "JPEG", (10, 20, 30))
+    large = BytesIO()
+    Image.new("RGB", (4000, 3000), (10, 20, 30)).save(large, "JPEG")
+
+    output = normalize_to_jpeg(large.getvalue(), max_long_edge=1000, quality=85,
+                               progressive=True, optimize=True, draft=True)
+    with Image.open(output) as img:
+        assert max(img.size) == 1000
+        assert img.size == (1000, 750)
+        assert img.info.get("progressive") == 1
+
+    # Small JPEGs are still passed through untouched
+    assert normalize_to_jpeg(jpeg, max_long_edge=1000).getvalue() == jpeg
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise for display
+    buffer = BytesIO()
+    Image.new("RGB", (40, 20)).save(buffer, "JPEG", exif=exif)
+
+    with Image.open(normalize_to_jpeg(buffer.getvalue(), fix_orientation=True)) as img:
+        assert img.size == (20, 40)
+    assert normalize_to_jpeg(buffer.getvalue()).getvalue() == buffer.getvalue()
+
+def test_reencoded_jpeg_falls_back_to_original_when_larger(monkeypatch):
+    import face_roi
+
+    noisy = Image.effect_noise((64, 64), 80).convert("RGB")
+    buffer = BytesIO()
+    noisy.save(buffer, "JPEG", quality=20)
+    jpeg = buffer.getvalue()
+    # 只裁掉一行像素，高质量重新编码后比原图大得多
+    monkeypatch.setattr(face_roi, "crop_to_face",
+                        lambda img, padding: (img.crop((0, 0, img.width, img.height - 1)), None))
+
+    assert normalize_to_jpeg(jpeg, quality=95, crop_face=True).getvalue() == jpeg
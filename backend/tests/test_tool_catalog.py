@@ -0,0 +1,80 @@
+# tests/test_tool_catalog.py
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import mcp.types as types
+import pytest
+from mcp import StdioServerParameters
+
+from mcp_llm_bridge.bridge import MCPLLMBridge
+from mcp_llm_bridge.config import BridgeConfig, LLMConfig, server_params_key
+from mcp_llm_bridge.tool_catalog import ToolCatalogCache, tool_catalog_cache, tools_changed_handler
+
+
+def make_tool(name, description="A test tool"):
+    tool = MagicMock()
+    tool.name = name
+    tool.description = description
+    tool.inputSchema = {"type": "object", "properties": {"arg1": {"type": "string"}}}
+    return tool
+
+@pytest.fixture(autouse=True)
+def clear_tool_catalog():
+    tool_catalog_cache.clear()
+    yield
+    tool_catalog_cache.clear()
+
+@pytest.fixture
+def mock_config():
+    return BridgeConfig(
+        mcp_server_params=StdioServerParameters(command="python", args=["web_search.py"], env=None),
+        llm_config=LLMConfig(api_key="test-key", model="gpt-4", base_url=None)
+    )
+
+def test_catalogues_are_shared_by_digest():
+    cache = ToolCatalogCache()
+    first = cache.put("server-a", [make_tool("web-search")])
+    second = cache.put("server-b", [make_tool("web-search")])
+    third = cache.put("server-c", [make_tool("web-search", "Different description")])
+
+    assert first is second
+    assert third is not first
+    assert first.tool_name_mapping == {"web_search": "web-search"}
+    assert cache.get("server-a") is first
+
+def test_invalidate():
+    cache = ToolCatalogCache()
+    cache.put("server-a", [make_tool("web_search")])
+    cache.invalidate("server-a")
+    assert cache.get("server-a") is None
+
+@pytest.mark.asyncio
+async def test_bridges_reuse_cached_catalogue(mock_config):
+    with patch('mcp_llm_bridge.bridge.MCPClient') as MockMCPClient:
+        mock_mcp_instance = AsyncMock()
+        mock_mcp_instance.get_available_tools.return_value = [make_tool("web_search")]
+        MockMCPClient.return_value = mock_mcp_instance
+
+        first = MCPLLMBridge(mock_config)
+        assert await first.initialize()
+        second = MCPLLMBridge(mock_config)
+        assert await second.initialize()
+
+        mock_mcp_instance.get_available_tools.assert_called_once()
+        assert second.llm_client.tools == first.llm_client.tools
+        assert second.tool_name_mapping == {"web_search": "web_search"}
+
+@pytest.mark.asyncio
+async def test_list_changed_notification_invalidates_catalogue(mock_config):
+    key = server_params_key(mock_config.mcp_server_params)
+    tool_catalog_cache.put(key, [make_tool("web_search")])
+    handler = tools_changed_handler(key)
+
+    await handler(types.ServerNotification(
+        types.ResourceListChangedNotification(method="notifications/resources/list_changed")
+    ))
+    assert tool_catalog_cache.get(key) is not None
+
+    await handler(types.ServerNotification(
+        types.ToolListChangedNotification(method="notifications/tools/list_changed")
+    ))
+    assert tool_catalog_cache.get(key) is None
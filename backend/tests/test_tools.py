@@ -0,0 +1,265 @@
+# tests/test_tools.py
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from mcp_llm_bridge.tools import (
+    DatabaseQueryTool,
+    ReadOnlyConnectionPool,
+    close_query_tools,
+    encode_cursor,
+    get_query_tool,
+    query_fingerprint,
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "products.db")
+    conn = sqlite3.connect(path)
+    # supplier_cost exists in the file but not in the tool's registered schema
+    conn.execute("CREATE TABLE products "
+                 "(id INTEGER PRIMARY KEY, title TEXT, price REAL, supplier_cost REAL)")
+    conn.executemany("INSERT INTO products (title, price) VALUES (?, ?)",
+                     [(f"item {i}", i * 1.5) for i in range(10)])
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.mark.asyncio
+async def test_queries_reuse_one_connection_per_thread(db_path):
+    tool = DatabaseQueryTool(db_path, max_workers=1)
+    try:
+        first = await tool.execute({"query": "SELECT title FROM products WHERE id = 1"})
+        second = await tool.execute({"query": "SELECT COUNT(*) AS n FROM products"})
+        assert first == {"columns": ["title"], "rows": [["item 0"]], "row_count": 1,
+                         "next_cursor": None}
+        assert second["rows"] == [[10]]
+        assert tool.pool.size == 1  # both ran on the single worker thread's connection
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(tool.pool.connection()))
+        thread.start()
+        thread.join()
+        assert tool.pool.connection() is tool.pool.connection()
+        assert other[0] is not tool.pool.connection()
+        assert tool.pool.size == 3
+    finally:
+        tool.close()
+    assert tool.pool.size == 0
+
+@pytest.mark.asyncio
+async def test_pool_is_read_only_and_uses_wal(db_path):
+    pool = ReadOnlyConnectionPool(db_path)
+    tool = DatabaseQueryTool(db_path, pool=pool)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            pool.connection().execute("DELETE FROM products")
+        assert pool.connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert pool.connection().execute("PRAGMA cache_size").fetchone()[0] == -pool.cache_size_kib
+    finally:
+        tool.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 10
+    conn.close()
+
+def test_shared_tool_per_database(db_path):
+    try:
+        assert get_query_tool(db_path) is get_query_tool(db_path)
+    finally:
+        close_query_tools()
+
+@pytest.mark.asyncio
+async def test_pages_follow_the_continuation_token(db_path):
+    tool = DatabaseQueryTool(db_path, max_rows=4, fetch_size=3)
+    query = "SELECT id FROM products ORDER BY id"
+    try:
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = await tool.execute({"query": query, "cursor": cursor})
+            ids += [row[0] for row in page["rows"]]
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert ids == list(range(1, 11))
+        assert pages == 3
+
+        with pytest.raises(ValueError):
+            await tool.execute({"query": "SELECT title FROM products",
+                                "cursor": encode_cursor(query, 4)})
+        with pytest.raises(ValueError):
+            await tool.execute({"query": query, "cursor": "not-a-cursor"})
+    finally:
+        tool.close()
+
+@pytest.mark.asyncio
+async def test_byte_cap_limits_the_page(db_path):
+    tool = DatabaseQueryTool(db_path, max_rows=100, max_bytes=30)
+    try:
+        page = await tool.execute({"query": "SELECT title FROM products ORDER BY id"})
+        # each "item N" is about 8 bytes, so 3 rows fit under a 30 byte cap
+        assert page["rows"] == [["item 0"], ["item 1"], ["item 2"]]
+        assert page["next_cursor"] is not None
+
+        tiny = DatabaseQueryTool(db_path, pool=tool.pool, max_bytes=1)
+        page = await tiny.execute({"query": "SELECT title FROM products ORDER BY id"})
+        assert page["row_count"] == 1  # an oversized row is still returned so paging makes progress
+    finally:
+        tool.close()
+
+@pytest.mark.asyncio
+async def test_values_of_a_row_wider_than_the_page_are_truncated(db_path):
+    tool = DatabaseQueryTool(db_path, max_bytes=1024)
+    try:
+        page = await tool.execute({
+            "query": "SELECT id, title || printf('%.5000c', 'x'), zeroblob(100000) FROM products "
+                     "WHERE id = 1"
+        })
+        row_id, text, blob = page["rows"][0]
+        assert row_id == 1
+        assert text.startswith("item 0xxx")
+        assert text.endswith("[truncated, 5006 characters in total]")
+        assert blob == "[BLOB of 100000 bytes, truncated]"
+        assert len(text) + len(blob) <= 1024
+    finally:
+        tool.close()
+
+ENDLESS = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT MAX(x) FROM c"
+
+@pytest.mark.asyncio
+async def test_slow_query_times_out_without_blocking_the_loop(db_path):
+    tool = DatabaseQueryTool(db_path, timeout=0.3)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        with pytest.raises(TimeoutError):
+            await tool.execute({"query": ENDLESS})
+        assert ticks >= 10  # the event loop kept running while the query did
+    finally:
+        task.cancel()
+        tool.close()
+
+@pytest.mark.asyncio
+async def test_cancelling_the_caller_interrupts_the_query(db_path):
+    tool = DatabaseQueryTool(db_path, max_workers=1, timeout=None)
+    try:
+        task = asyncio.create_task(tool.execute({"query": ENDLESS}))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The only worker thread is free again straight away
+        page = await asyncio.wait_for(tool.execute({"query": "SELECT COUNT(*) FROM products"}),
+                                      timeout=2)
+        assert page["rows"] == [[10]]
+    finally:
+        tool.close()
+
+@pytest.mark.asyncio
+async def test_full_scans_of_large_tables_are_rejected(db_path):
+    tool = DatabaseQueryTool(db_path, max_scan_rows=5)
+    try:
+        with pytest.raises(ValueError, match="scan all"):
+            await tool.execute({"query": "SELECT p.title FROM products p WHERE p.price > 3"})
+        page = await tool.execute({"query": "SELECT title FROM products WHERE id = 3"})
+        assert page["rows"] == [["item 2"]]
+    finally:
+        tool.close()
+
+def test_fingerprint_ignores_literals_whitespace_and_case():
+    assert query_fingerprint("SELECT title FROM products WHERE id = 3") == \
+        query_fingerprint("select  title\nfrom products -- lookup\nwhere id = 42;")
+    assert query_fingerprint("SELECT * FROM products WHERE price > 1.5e3") == \
+        query_fingerprint("SELECT * FROM products WHERE price > 2")
+    # 'name' may be an identifier, so single-quoted strings are kept
+    assert query_fingerprint("SELECT * FROM 'products'") != \
+        query_fingerprint("SELECT * FROM 'other'")
+    assert query_fingerprint('SELECT "col 1" FROM t') != query_fingerprint('SELECT "col 2" FROM t')
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query, reason", [
+    ("SELECT p.supplier_cost FROM products AS p", "invalid column"),
+    ('SELECT x FROM (SELECT "supplier_cost" AS x FROM products)', "invalid column"),
+    ("SELECT * FROM products", "invalid column"),
+    ("SELECT colour FROM products", "no such column"),
+    ("DELETE FROM products", "read-only"),
+    ("CREATE TABLE t (x)", "read-only"),
+    ("PRAGMA journal_mode = DELETE", "read-only"),
+    ("SELECT * FROM missing_table", "no such table"),
+    ("SELECT 1; SELECT 2", "Invalid query"),
+    ("EXPLAIN QUERY PLAN SELECT id FROM products", "EXPLAIN statements are not supported"),
+])
+async def test_invalid_queries_are_rejected_before_running(db_path, query, reason):
+    tool = DatabaseQueryTool(db_path)
+    try:
+        with pytest.raises(ValueError, match=reason):
+            await tool.execute({"query": query})
+        assert not tool.validate_query(query)
+    finally:
+        tool.close()
+
+@pytest.mark.asyncio
+async def test_validation_verdicts_are_cached_by_fingerprint(db_path, monkeypatch):
+    tool = DatabaseQueryTool(db_path)
+    calls = []
+    authorize = tool._authorize
+    monkeypatch.setattr(tool, "_authorize", lambda *args: calls.append(args[1]) or authorize(*args))
+    try:
+        for product_id in (1, 2, 3):
+            query = f"SELECT title FROM products p WHERE p.id = {product_id}"
+            page = await tool.execute({"query": query})
+            assert page["row_count"] == 1
+        assert await tool.execute({"query": "PRAGMA table_info(products)"})
+        assert len(calls) == 2
+    finally:
+        tool.close()
+
+@pytest.mark.asyncio
+async def test_quoted_table_names_do_not_share_a_verdict(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE other (supplier_cost REAL)")
+    conn.commit()
+    conn.close()
+    tool = DatabaseQueryTool(db_path)
+    try:
+        assert await tool.execute({"query": "SELECT supplier_cost FROM 'other'"})
+        with pytest.raises(ValueError, match="invalid column"):
+            await tool.execute({"query": "SELECT supplier_cost FROM 'products'"})
+    finally:
+        tool.close()
+
+
+class FailingConnection:
+    """Connection whose statements fail with a fixed error, as in a locked or interrupted compile"""
+    def __init__(self, message):
+        self.message = message
+
+    def set_authorizer(self, authorizer):
+        pass
+
+    def execute(self, sql):
+        raise sqlite3.OperationalError(self.message)
+
+def test_transient_validation_errors_are_not_cached(db_path):
+    tool = DatabaseQueryTool(db_path)
+    query = "SELECT title FROM products WHERE id = 1"
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+            tool.query_error(FailingConnection("interrupted"), query)
+        error = tool.query_error(FailingConnection("database schema is locked"), query)
+        assert error.startswith("Invalid query")
+
+        assert tool.query_error(tool.pool.connection(), query) is None
+    finally:
+        tool.close()
@@ -0,0 +1,128 @@
+# tests/test_uploads.py
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from uploads import (
+    IncomingUpload,
+    UnsupportedImageError,
+    UploadStore,
+    receive_upload,
+    sniff_image_type,
+)
+
+
+def encode(format):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (200, 150, 120)).save(buffer, format=format)
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("format, expected",
+                         [("JPEG", "jpg"), ("PNG", "png"), ("WEBP", "webp"), ("GIF", None)])
+def test_sniff_image_type_reads_magic_bytes(format, expected):
+    assert sniff_image_type(encode(format)[:16]) == expected
+
+def test_receive_upload_hashes_while_writing_to_disk(tmp_path):
+    data = encode("PNG") + b"\0" * 1000
+
+    upload = receive_upload(io.BytesIO(data), str(tmp_path), chunk_size=64)
+
+    assert upload.image_type == "png"
+    assert upload.size == len(data)
+    assert upload.digest == hashlib.blake2b(data, digest_size=20).hexdigest()
+    assert upload.source.endswith(".png")
+    assert open(upload.source, "rb").read() == data
+
+def test_receive_upload_in_memory(tmp_path):
+    data = encode("JPEG")
+
+    upload = receive_upload(io.BytesIO(data), chunk_size=64)
+
+    assert upload.source == data
+    assert list(tmp_path.iterdir()) == []
+
+def test_receive_upload_rejects_non_images_from_the_first_chunk(tmp_path):
+    stream = io.BytesIO(b"<?php echo 'not an image'; ?>" + b"x" * 1000)
+
+    with pytest.raises(UnsupportedImageError):
+        receive_upload(stream, str(tmp_path), chunk_size=64)
+
+    assert stream.tell() == 64
+    assert list(tmp_path.iterdir()) == []
+
+def test_store_shards_and_deduplicates_by_content(tmp_path):
+    store = UploadStore(str(tmp_path))
+    data = encode("PNG")
+
+    first = store.save(io.BytesIO(data))
+    second = store.save(io.BytesIO(data))
+    other = store.save(io.BytesIO(encode("JPEG")))
+
+    assert first.source == second.source != other.source
+    relative = os.path.relpath(first.source, tmp_path)
+    assert relative == os.path.join(first.digest[:2], first.digest[2:4], f"{first.digest}.png")
+    assert store.cleanup()['files'] == 2
+
+def test_cleanup_enforces_max_age_and_total_size(tmp_path):
+    store = UploadStore(str(tmp_path), max_age_seconds=3600, max_total_bytes=2500,
+                        min_age_seconds=0)
+    legacy = tmp_path / "legacy.jpg"
+    legacy.write_bytes(b"\xff\xd8\xff" + b"\0" * 100)
+    now = time.time()
+    os.utime(legacy, (now - 7200, now - 7200))
+
+    uploads = []
+    for i in range(3):
+        upload = store.save(io.BytesIO(b"\xff\xd8\xff" + bytes([i]) * 1000))
+        os.utime(upload.source, (now - 100 + i, now - 100 + i))
+        uploads.append(upload)
+
+    stats = store.cleanup(now)
+
+    assert not legacy.exists()
+    assert not os.path.exists(uploads[0].source)
+    assert os.path.exists(uploads[1].source) and os.path.exists(uploads[2].source)
+    assert stats['removed_files'] == 2
+    assert stats['total_bytes'] <= 2500
+    assert not os.path.exists(os.path.dirname(uploads[0].source))
+
+def test_cleanup_removes_stale_incoming_files(tmp_path):
+    store = UploadStore(str(tmp_path), min_age_seconds=60)
+    folder = store.incoming().folder
+    stale = os.path.join(folder, "stale.jpg")
+    fresh = os.path.join(folder, "fresh.png")
+    open(stale, "wb").write(encode("JPEG"))
+    open(fresh, "wb").write(encode("PNG"))
+    now = time.time()
+    os.utime(stale, (now - 120, now - 120))
+
+    stats = store.cleanup(now)
+
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+    assert stats['removed_files'] == 1
+
+def test_incoming_upload_processes_chunks_as_they_arrive(tmp_path):
+    data = encode("PNG") + b"\0" * 1000
+    incoming = IncomingUpload(str(tmp_path))
+
+    for start in range(0, len(data), 5):
+        incoming.write(data[start:start + 5])
+    assert incoming.image_type == "png"
+    assert incoming.size == len(data)
+
+    upload = incoming.finish()
+    incoming.close()
+    assert upload.digest == hashlib.blake2b(data, digest_size=20).hexdigest()
+    assert open(upload.source, "rb").read() == data
+
+def test_unfinished_incoming_uploads_are_removed_on_close(tmp_path):
+    incoming = IncomingUpload(str(tmp_path))
+    incoming.write(encode("JPEG"))
+    incoming.close()
+
+    assert list(tmp_path.iterdir()) == []
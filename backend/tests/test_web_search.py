@@ -0,0 +1,76 @@
+# tests/test_web_search.py
+import asyncio
+
+import httpx
+import pytest
+
+from web_search import TavilySearcher
+
+
+def make_searcher(handler, **kwargs):
+    searcher = TavilySearcher("test-key", **kwargs)
+    searcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return searcher
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_queries_share_one_request():
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"results": ["acne"]})
+
+    searcher = make_searcher(handler)
+    results = await asyncio.gather(
+        *(searcher.search("key", "acne", max_results=5) for _ in range(3))
+    )
+
+    assert results == [{"results": ["acne"]}] * 3
+    assert len(requests) == 1
+    assert searcher._in_flight == {}
+    await searcher.aclose()
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    running = 0
+    max_running = 0
+
+    async def handler(request):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return httpx.Response(200, json={})
+
+    searcher = make_searcher(handler, max_concurrency=2)
+    await asyncio.gather(*(searcher.search(f"key{i}", f"query {i}") for i in range(6)))
+
+    assert max_running == 2
+    await searcher.aclose()
+
+@pytest.mark.asyncio
+async def test_retries_after_rate_limit():
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"results": []}),
+    ]
+
+    async def handler(request):
+        return responses.pop(0)
+
+    searcher = make_searcher(handler, max_retries=2)
+    assert await searcher.search("key", "pores") == {"results": []}
+    assert responses == []
+    await searcher.aclose()
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries():
+    async def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    searcher = make_searcher(handler, max_retries=1)
+    with pytest.raises(httpx.HTTPStatusError):
+        await searcher.search("key", "pores")
+    await searcher.aclose()